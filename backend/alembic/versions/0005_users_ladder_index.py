@@ -0,0 +1,34 @@
+"""users ladder index
+
+Revision ID: 0005_users_ladder_index
+Revises: 0004_units_barracks
+Create Date: 2025-01-01 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0005_users_ladder_index"
+down_revision: Union[str, None] = "0004_units_barracks"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Attacks, decay and registration all write to users; build the index
+    # without blocking them.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_users_ladder",
+            "users",
+            [sa.text("prestige DESC"), "id"],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_users_ladder", table_name="users", postgresql_concurrently=True)
@@ -0,0 +1,45 @@
+"""leaderboard snapshot
+
+Revision ID: 0006_leaderboard_snapshot
+Revises: 0005_users_ladder_index
+Create Date: 2025-01-01 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "0006_leaderboard_snapshot"
+down_revision: Union[str, None] = "0005_users_ladder_index"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "leaderboard_snapshot",
+        sa.Column("rank", sa.Integer(), primary_key=True, autoincrement=False),
+        sa.Column(
+            "user_id",
+            postgresql.UUID(as_uuid=True),
+            sa.ForeignKey("users.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("email", sa.String(length=255), nullable=False),
+        sa.Column("prestige", sa.Integer(), nullable=False),
+        sa.Column("snapshot_at", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index(
+        "ix_leaderboard_snapshot_user_id",
+        "leaderboard_snapshot",
+        ["user_id"],
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_leaderboard_snapshot_user_id", table_name="leaderboard_snapshot")
+    op.drop_table("leaderboard_snapshot")
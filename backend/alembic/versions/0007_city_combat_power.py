@@ -0,0 +1,66 @@
+"""city combat power
+
+Revision ID: 0007_city_combat_power
+Revises: 0006_leaderboard_snapshot
+Create Date: 2025-01-01 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0007_city_combat_power"
+down_revision: Union[str, None] = "0006_leaderboard_snapshot"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Frozen copy of the bonus tables in app/routes/stats.py at this revision.
+ATTACK_BONUS = {1: 3, 2: 7, 3: 12}
+WALL_BONUS = {1: 4, 2: 9, 3: 15}
+TOWER_BONUS = {1: 2, 2: 5, 3: 9}
+
+
+def _level_case(bonus: dict[int, int]) -> str:
+    whens = " ".join(f"WHEN {level} THEN {value}" for level, value in bonus.items())
+    return f"CASE level {whens} ELSE 0 END"
+
+
+def upgrade() -> None:
+    op.add_column(
+        "cities",
+        sa.Column("attack_power", sa.Integer(), server_default=sa.text("0"), nullable=False),
+    )
+    op.add_column(
+        "cities",
+        sa.Column("defense_power", sa.Integer(), server_default=sa.text("0"), nullable=False),
+    )
+    op.execute(
+        f"""
+        UPDATE cities
+        SET attack_power = power.attack,
+            defense_power = power.attack + power.defense_bonus
+        FROM (
+            SELECT
+                city_id,
+                SUM(CASE WHEN type = 'barracks' THEN {_level_case(ATTACK_BONUS)} ELSE 0 END)
+                    AS attack,
+                SUM(
+                    CASE
+                        WHEN type = 'wall' THEN {_level_case(WALL_BONUS)}
+                        WHEN type = 'tower' THEN {_level_case(TOWER_BONUS)}
+                        ELSE 0
+                    END
+                ) AS defense_bonus
+            FROM buildings
+            GROUP BY city_id
+        ) AS power
+        WHERE power.city_id = cities.id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("cities", "defense_power")
+    op.drop_column("cities", "attack_power")
@@ -0,0 +1,36 @@
+"""system tick checkpoint
+
+Revision ID: 0008_system_tick_checkpoint
+Revises: 0007_city_combat_power
+Create Date: 2025-01-01 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "0008_system_tick_checkpoint"
+down_revision: Union[str, None] = "0007_city_combat_power"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "system_ticks",
+        sa.Column("checkpoint_user_id", postgresql.UUID(as_uuid=True), nullable=True),
+    )
+    op.add_column(
+        "system_ticks",
+        sa.Column("completed_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    # Ticks written before checkpointing only existed once their work was done.
+    op.execute("UPDATE system_ticks SET completed_at = executed_at")
+
+
+def downgrade() -> None:
+    op.drop_column("system_ticks", "completed_at")
+    op.drop_column("system_ticks", "checkpoint_user_id")
@@ -0,0 +1,28 @@
+"""system tick partitions
+
+Revision ID: 0009_system_tick_partitions
+Revises: 0008_system_tick_checkpoint
+Create Date: 2025-01-01 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0009_system_tick_partitions"
+down_revision: Union[str, None] = "0008_system_tick_checkpoint"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "system_ticks",
+        sa.Column("partitions", sa.Integer(), server_default=sa.text("1"), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("system_ticks", "partitions")
@@ -0,0 +1,36 @@
+"""pvp idempotency created_at index
+
+Revision ID: 0010_pvp_idempotency_created_at
+Revises: 0009_system_tick_partitions
+Create Date: 2025-01-01 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0010_pvp_idempotency_created_at"
+down_revision: Union[str, None] = "0009_system_tick_partitions"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # pvp_idempotency takes a write per attack; build the index without blocking them.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_pvp_idempotency_created_at",
+            "pvp_idempotency",
+            ["created_at"],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_pvp_idempotency_created_at",
+            table_name="pvp_idempotency",
+            postgresql_concurrently=True,
+        )
@@ -0,0 +1,179 @@
+"""partition attack_logs by month
+
+The existing table is not copied. It becomes the partition attack_logs_legacy,
+from the month of its oldest row through the current month, and
+attack_logs_pYYYY_MM partitions start at the next month. The maintenance job
+reads partition bounds, so it archives attack_logs_legacy as a whole once its
+last month falls out of retention.
+
+The slow parts run first, outside the migration transaction and without
+blocking inserts: the indexes the partition needs are built CONCURRENTLY and a
+CHECK constraint on the range is validated. The transaction then only renames
+tables and attaches the partition; it takes an ACCESS EXCLUSIVE lock on
+attack_logs for milliseconds and gives up after lock_timeout instead of
+queueing attacks behind it. No maintenance window is needed for the upgrade;
+the downgrade copies every row and does need one.
+
+Revision ID: 0011_partition_attack_logs
+Revises: 0010_pvp_idempotency_created_at
+Create Date: 2025-01-01 00:00:00.000000
+
+"""
+from datetime import date, datetime, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "0011_partition_attack_logs"
+down_revision: Union[str, None] = "0010_pvp_idempotency_created_at"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = (
+    "id, attacker_id, defender_id, result, prestige_delta_attacker, "
+    "prestige_delta_defender, created_at, attacker_prestige_before, "
+    "defender_prestige_before, expected_win, attacker_attack_power, "
+    "defender_defense_power, season_id"
+)
+
+# New monthly UTC partitions are created up to this many months ahead;
+# app.jobs.attack_log_partitions keeps creating them.
+MONTHS_AHEAD = 2
+LOCK_TIMEOUT = "5s"
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def utc_midnight(day: date) -> str:
+    return f"{day.isoformat()} 00:00:00+00"
+
+
+def attack_log_columns() -> list:
+    # Constraint names are spelled out so the copy keeps the original names.
+    return [
+        sa.Column("id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column(
+            "attacker_id",
+            postgresql.UUID(as_uuid=True),
+            sa.ForeignKey("users.id", name="attack_logs_attacker_id_fkey"),
+            nullable=False,
+        ),
+        sa.Column(
+            "defender_id",
+            postgresql.UUID(as_uuid=True),
+            sa.ForeignKey("users.id", name="attack_logs_defender_id_fkey"),
+            nullable=False,
+        ),
+        sa.Column("result", sa.String(length=10), nullable=False),
+        sa.Column("prestige_delta_attacker", sa.Integer(), nullable=False),
+        sa.Column("prestige_delta_defender", sa.Integer(), nullable=False),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.Column("attacker_prestige_before", sa.Integer()),
+        sa.Column("defender_prestige_before", sa.Integer()),
+        sa.Column("expected_win", sa.Float()),
+        sa.Column("attacker_attack_power", sa.Integer()),
+        sa.Column("defender_defense_power", sa.Integer()),
+        sa.Column(
+            "season_id",
+            postgresql.UUID(as_uuid=True),
+            sa.ForeignKey("seasons.id", name="attack_logs_season_id_fkey"),
+        ),
+    ]
+
+
+def upgrade() -> None:
+    this_month = datetime.now(timezone.utc).date().replace(day=1)
+    boundary = add_months(this_month, 1)
+    oldest = op.get_bind().execute(sa.text("SELECT min(created_at) FROM attack_logs")).scalar()
+    first_month = oldest.astimezone(timezone.utc).date().replace(day=1) if oldest else this_month
+    legacy = "attack_logs_legacy"
+    lower, upper = utc_midnight(first_month), utc_midnight(boundary)
+
+    with op.get_context().autocommit_block():
+        # The partition needs the parent's primary key and indexes; building
+        # them here means ATTACH PARTITION adopts them instead of building them
+        # under its lock.
+        op.execute(
+            "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS attack_logs_id_created_at_key "
+            "ON attack_logs (id, created_at)"
+        )
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS attack_logs_attacker_id_created_at_idx "
+            "ON attack_logs (attacker_id, created_at)"
+        )
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS attack_logs_defender_id_created_at_idx "
+            "ON attack_logs (defender_id, created_at)"
+        )
+        # A validated CHECK matching the range lets ATTACH PARTITION skip its
+        # scan. VALIDATE only takes SHARE UPDATE EXCLUSIVE, so inserts go on.
+        op.execute("ALTER TABLE attack_logs DROP CONSTRAINT IF EXISTS attack_logs_partition_range")
+        op.execute(
+            "ALTER TABLE attack_logs ADD CONSTRAINT attack_logs_partition_range "
+            f"CHECK (created_at >= '{lower}' AND created_at < '{upper}') NOT VALID"
+        )
+        op.execute("ALTER TABLE attack_logs VALIDATE CONSTRAINT attack_logs_partition_range")
+
+    op.execute(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'")
+    op.rename_table("attack_logs", legacy)
+    # Columns are already NOT NULL, so promoting the index does not scan.
+    op.execute(f"ALTER TABLE {legacy} DROP CONSTRAINT attack_logs_pkey")
+    op.execute(
+        f"ALTER TABLE {legacy} ADD CONSTRAINT {legacy}_pkey "
+        "PRIMARY KEY USING INDEX attack_logs_id_created_at_key"
+    )
+
+    # The partition key has to be part of the primary key.
+    op.create_table(
+        "attack_logs",
+        *attack_log_columns(),
+        sa.PrimaryKeyConstraint("id", "created_at", name="attack_logs_pkey"),
+        postgresql_partition_by="RANGE (created_at)",
+    )
+    op.create_index(
+        "ix_attack_logs_attacker_id_created_at", "attack_logs", ["attacker_id", "created_at"]
+    )
+    op.create_index(
+        "ix_attack_logs_defender_id_created_at", "attack_logs", ["defender_id", "created_at"]
+    )
+    op.execute(
+        f"ALTER TABLE attack_logs ATTACH PARTITION {legacy} "
+        f"FOR VALUES FROM ('{lower}') TO ('{upper}')"
+    )
+    op.execute(f"ALTER TABLE {legacy} DROP CONSTRAINT attack_logs_partition_range")
+
+    for offset in range(1, MONTHS_AHEAD + 1):
+        month = add_months(this_month, offset)
+        op.execute(
+            f"CREATE TABLE attack_logs_p{month.year:04d}_{month.month:02d} "
+            f"PARTITION OF attack_logs FOR VALUES FROM ('{utc_midnight(month)}') "
+            f"TO ('{utc_midnight(add_months(month, 1))}')"
+        )
+    op.execute("CREATE TABLE attack_logs_default PARTITION OF attack_logs DEFAULT")
+
+
+def downgrade() -> None:
+    # Copies every row into a plain table while holding attack_logs; run it in
+    # a maintenance window.
+    op.rename_table("attack_logs", "attack_logs_partitioned")
+    op.execute("ALTER INDEX attack_logs_pkey RENAME TO attack_logs_partitioned_pkey")
+
+    columns = attack_log_columns()
+    columns[0] = sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True, nullable=False)
+    op.create_table("attack_logs", *columns)
+    op.execute(
+        f"INSERT INTO attack_logs ({COLUMNS}) SELECT {COLUMNS} FROM attack_logs_partitioned"
+    )
+    # Drops every partition, including attack_logs_default.
+    op.drop_table("attack_logs_partitioned")
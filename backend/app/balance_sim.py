@@ -0,0 +1,361 @@
+"""Offline Monte Carlo balance simulator for PvP prestige and soft-decay.
+
+Run from backend/:  python -m app.balance_sim --users 100000 --seasons 4 --replicas 8
+"""
+import argparse
+import json
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from app.decay import DEFAULT_PARAMS, DecayParams, decay_kernel
+from app.pvp_constants import (
+    DAILY_ATTACK_LIMIT,
+    PRESTIGE_GAIN_CAP,
+    PRESTIGE_LOSS_CAP,
+    SEASON_BASE_PRESTIGE,
+    SEASON_LENGTH_DAYS,
+)
+from app.pvp_formulas import (
+    daily_caps_kernel,
+    expected_win_kernel,
+    prestige_delta_kernel,
+    roll_power_kernel,
+)
+
+# Only day differences matter to the decay kernel; any fixed start works.
+SIM_START = date(2025, 1, 5)
+
+
+class Archetype(NamedTuple):
+    name: str
+    share: float
+    activity: float  # chance to play PvP on a given day
+    attacks_per_day: float  # mean attacks on an active day
+    power: float  # median attack and defense power
+
+
+# The casual / regular / grinder scenarios from docs/BALANCE_CONSTANTS.md.
+DEFAULT_ARCHETYPES = (
+    Archetype("casual", 0.6, 0.35, 4.0, 80.0),
+    Archetype("regular", 0.3, 0.7, 10.0, 120.0),
+    Archetype("grinder", 0.1, 0.95, 20.0, 180.0),
+)
+
+
+class SimConfig(NamedTuple):
+    users: int = 10_000
+    seasons: int = 2
+    season_days: int = SEASON_LENGTH_DAYS
+    archetypes: Tuple[Archetype, ...] = DEFAULT_ARCHETYPES
+    power_sigma: float = 0.35
+    decay: DecayParams = DEFAULT_PARAMS
+
+
+# Daily KPIs from docs/BALANCE_TELEMETRY.md. The *_sum series are totals used
+# to derive ratios; the cap shares are relative to PvP active users.
+DAILY_KPIS = (
+    "pvp_active_pct",
+    "battles",
+    "avg_battles_per_pvp_user",
+    "attack_cap_pct",
+    "avg_gain_per_pvp_user",
+    "avg_loss_per_pvp_user",
+    "gain_cap_pct",
+    "loss_cap_pct",
+    "above_threshold_pct",
+    "avg_nightly_decay",
+    "gain_sum",
+    "decay_sum",
+    "inactivity_mult_pct",
+    "avg_inactive_days_affected",
+    "top10_range",
+    "top100_range",
+    "median_prestige",
+    "rank_mobility",
+)
+
+
+class Population(NamedTuple):
+    archetype: np.ndarray
+    activity: np.ndarray
+    attacks_per_day: np.ndarray
+    attack_power: np.ndarray
+    defense_power: np.ndarray
+
+
+def make_population(config: SimConfig, rng: np.random.Generator) -> Population:
+    shares = np.array([archetype.share for archetype in config.archetypes])
+    archetype = rng.choice(len(config.archetypes), size=config.users, p=shares / shares.sum())
+
+    def per_user(field: str) -> np.ndarray:
+        return np.array([getattr(a, field) for a in config.archetypes])[archetype]
+
+    median_power = per_user("power")
+    return Population(
+        archetype=archetype,
+        activity=per_user("activity"),
+        attacks_per_day=per_user("attacks_per_day"),
+        attack_power=np.rint(
+            median_power * rng.lognormal(0.0, config.power_sigma, config.users)
+        ).astype(np.int64),
+        defense_power=np.rint(
+            median_power * rng.lognormal(0.0, config.power_sigma, config.users)
+        ).astype(np.int64),
+    )
+
+
+def ladder_ranks(prestige: np.ndarray) -> np.ndarray:
+    """0-based rank of each user, prestige desc with the index as tie-breaker."""
+    order = np.lexsort((np.arange(prestige.size), -prestige))
+    ranks = np.empty_like(order)
+    ranks[order] = np.arange(order.size)
+    return ranks
+
+
+def share(mask: np.ndarray, of: Optional[np.ndarray] = None) -> float:
+    total = mask.size if of is None else np.count_nonzero(of)
+    selected = np.count_nonzero(mask if of is None else mask & of)
+    return 100.0 * selected / total if total else 0.0
+
+
+def mean_or_zero(values: np.ndarray) -> float:
+    return float(values.mean()) if values.size else 0.0
+
+
+def simulate_day(
+    prestige: np.ndarray,
+    last_pvp_day: np.ndarray,
+    population: Population,
+    day: date,
+    params: DecayParams,
+    rng: np.random.Generator,
+) -> Dict[str, float]:
+    """Play one server day and its nightly decay, updating prestige in place.
+
+    Attacks run in DAILY_ATTACK_LIMIT rounds; in round r every user with more
+    than r planned attacks hits a uniformly random other user. All attacks of
+    a round read prestige from the start of the round, the way concurrent
+    requests would. Defenders never change prestige (defender_delta is 0), so
+    this only affects expected_win. Same-target cooldowns are not modelled:
+    with uniform targets a repeat within 30 minutes is negligible.
+    """
+    users = prestige.size
+    rank_before = ladder_ranks(prestige)
+
+    active = rng.random(users) < population.activity
+    planned = np.where(
+        active,
+        np.clip(rng.poisson(population.attacks_per_day), 1, DAILY_ATTACK_LIMIT),
+        0,
+    )
+    attacks_used = np.zeros(users, dtype=np.int64)
+    gain = np.zeros(users, dtype=np.int64)
+    loss = np.zeros(users, dtype=np.int64)
+
+    for attack_round in range(DAILY_ATTACK_LIMIT):
+        attackers = np.flatnonzero(planned > attack_round)
+        if attackers.size == 0:
+            break
+        defenders = rng.integers(0, users - 1, size=attackers.size)
+        defenders += defenders >= attackers
+
+        won = roll_power_kernel(population.attack_power[attackers], rng) >= roll_power_kernel(
+            population.defense_power[defenders], rng
+        )
+        expected_win = expected_win_kernel(prestige[attackers], prestige[defenders])
+        raw_delta = prestige_delta_kernel(expected_win, won)
+        delta = daily_caps_kernel(raw_delta, gain[attackers], loss[attackers])
+
+        prestige[attackers] += delta
+        gain[attackers] += np.maximum(delta, 0)
+        loss[attackers] += np.maximum(-delta, 0)
+        attacks_used[attackers] += 1
+
+    pvp_users = attacks_used > 0
+    last_pvp_day[pvp_users] = np.datetime64(day, "D")
+
+    above_threshold = prestige > params.threshold
+    batch = decay_kernel(prestige, last_pvp_day, day + timedelta(days=1), params)
+    prestige -= batch.decay
+    decayed = batch.decay > 0
+    affected = decayed & (batch.inactive_days >= params.grace_days)
+
+    ranks_after = ladder_ranks(prestige)
+    ladder = np.sort(prestige)[::-1]
+    top10 = ladder[: min(10, users)]
+    top100 = ladder[: min(100, users)]
+
+    return {
+        "pvp_active_pct": share(pvp_users),
+        "battles": float(attacks_used.sum()),
+        "avg_battles_per_pvp_user": mean_or_zero(attacks_used[pvp_users]),
+        "attack_cap_pct": share(attacks_used >= DAILY_ATTACK_LIMIT, of=pvp_users),
+        "avg_gain_per_pvp_user": mean_or_zero(gain[pvp_users]),
+        "avg_loss_per_pvp_user": mean_or_zero(loss[pvp_users]),
+        "gain_cap_pct": share(gain >= PRESTIGE_GAIN_CAP, of=pvp_users),
+        "loss_cap_pct": share(loss >= PRESTIGE_LOSS_CAP, of=pvp_users),
+        "above_threshold_pct": share(above_threshold),
+        "avg_nightly_decay": mean_or_zero(batch.decay[decayed]),
+        "gain_sum": float(gain.sum()),
+        "decay_sum": float(batch.decay.sum()),
+        "inactivity_mult_pct": share(affected),
+        "avg_inactive_days_affected": mean_or_zero(batch.inactive_days[affected]),
+        "top10_range": float(top10[0] - top10[-1]),
+        "top100_range": float(top100[0] - top100[-1]),
+        "median_prestige": float(np.median(prestige)),
+        "rank_mobility": mean_or_zero(np.abs(ranks_after - rank_before)[pvp_users]),
+    }
+
+
+def run_replica(config: SimConfig, seed: np.random.SeedSequence) -> Dict[str, np.ndarray]:
+    """Simulate every season for one population; returns a series per KPI."""
+    rng = np.random.default_rng(seed)
+    population = make_population(config, rng)
+    prestige = np.full(config.users, SEASON_BASE_PRESTIGE, dtype=np.int64)
+    last_pvp_day = np.full(config.users, np.datetime64("NaT", "D"))
+
+    days = config.seasons * config.season_days
+    series = {name: np.zeros(days) for name in DAILY_KPIS}
+    for index in range(days):
+        if index % config.season_days == 0:
+            # Only prestige resets between seasons.
+            prestige[:] = SEASON_BASE_PRESTIGE
+        kpis = simulate_day(
+            prestige,
+            last_pvp_day,
+            population,
+            SIM_START + timedelta(days=index),
+            config.decay,
+            rng,
+        )
+        for name, value in kpis.items():
+            series[name][index] = value
+    return series
+
+
+def run_simulation(
+    config: SimConfig, replicas: int = 1, workers: int = 1, seed: int = 0
+) -> Dict[str, np.ndarray]:
+    """Run independent replicas, in worker processes when workers > 1.
+
+    Returns each KPI as an array of shape (replicas, days). Replica seeds are
+    spawned from seed, so results do not depend on the worker count.
+    """
+    seeds = np.random.SeedSequence(seed).spawn(replicas)
+    if workers > 1 and replicas > 1:
+        with ProcessPoolExecutor(
+            max_workers=min(workers, replicas),
+            mp_context=multiprocessing.get_context("spawn"),
+        ) as executor:
+            runs = list(executor.map(run_replica, [config] * replicas, seeds))
+    else:
+        runs = [run_replica(config, replica_seed) for replica_seed in seeds]
+    return {name: np.stack([run[name] for run in runs]) for name in DAILY_KPIS}
+
+
+def summarize(series: Dict[str, np.ndarray], config: SimConfig) -> dict:
+    """Average the daily KPIs and evaluate the tuning triggers."""
+    summary = {
+        name: round(float(values.mean()), 3)
+        for name, values in series.items()
+        if name not in ("gain_sum", "decay_sum")
+    }
+    gain_sum = float(series["gain_sum"].sum())
+    summary["decay_to_gain_pct"] = (
+        round(100.0 * float(series["decay_sum"].sum()) / gain_sum, 3) if gain_sum else 0.0
+    )
+
+    # Top10 range trend inside a season. Every season starts with everyone at
+    # SEASON_BASE_PRESTIGE, so the range climbs from zero in the first week
+    # whatever the constants. Compare the range at the end of each week from
+    # the first one on, plus the last day of the season. With the default
+    # population more than ten players hit the daily gain cap every day, so the
+    # top10 climb in lockstep and the range (and its growth) stays at 0.
+    week = 7
+    days = sorted(set(range(week - 1, config.season_days, week)) | {config.season_days - 1})
+    top10 = series["top10_range"].reshape(
+        series["top10_range"].shape[0], config.seasons, config.season_days
+    )
+    weekly = top10[:, :, days].mean(axis=(0, 1))
+    summary["top10_range_growth_pct"] = (
+        round(100.0 * float(weekly[-1] - weekly[0]) / float(weekly[0]), 3)
+        if len(days) > 1 and weekly[0]
+        else 0.0
+    )
+    top10_grows_weekly = len(days) > 1 and bool((np.diff(weekly) > 0).all())
+
+    triggers = []
+    if summary["attack_cap_pct"] > 20:
+        triggers.append("over 20% of PvP users hit the attack cap")
+    if summary["decay_to_gain_pct"] > 35:
+        triggers.append("nightly decay exceeds 35% of daily gains")
+    if top10_grows_weekly:
+        triggers.append("top10 range grows every week after the first")
+    summary["triggers"] = triggers
+    return summary
+
+
+def format_summary(summary: dict, config: SimConfig, replicas: int) -> str:
+    lines = [
+        (
+            f"Simulated {replicas} replica(s) x {config.users} users x "
+            f"{config.seasons} season(s) of {config.season_days} days."
+        ),
+        (
+            f"Decay: threshold={config.decay.threshold} rate={config.decay.rate} "
+            f"max={config.decay.max_decay} grace={config.decay.grace_days} "
+            f"inactivity_mult={config.decay.inactivity_mult}"
+        ),
+        "",
+        "kpi (daily mean)                 value",
+    ]
+    for name, value in summary.items():
+        if name != "triggers":
+            lines.append(f"{name:<30}{value:>10}")
+    lines += ["", "Tuning triggers: " + ("; ".join(summary["triggers"]) or "none")]
+    return "\n".join(lines)
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=SimConfig().users)
+    parser.add_argument("--seasons", type=int, default=SimConfig().seasons)
+    parser.add_argument("--season-days", type=int, default=SEASON_LENGTH_DAYS)
+    parser.add_argument("--replicas", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=1, help="Processes running replicas.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="Print the summary as JSON.")
+    defaults = DecayParams()
+    parser.add_argument("--threshold", type=int, default=defaults.threshold)
+    parser.add_argument("--rate", type=float, default=defaults.rate)
+    parser.add_argument("--max-decay", type=int, default=defaults.max_decay)
+    parser.add_argument("--grace-days", type=int, default=defaults.grace_days)
+    parser.add_argument("--inactivity-mult", type=float, default=defaults.inactivity_mult)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    config = SimConfig(
+        users=max(2, args.users),
+        seasons=max(1, args.seasons),
+        season_days=max(1, args.season_days),
+        decay=DecayParams(
+            threshold=args.threshold,
+            rate=args.rate,
+            max_decay=args.max_decay,
+            grace_days=args.grace_days,
+            inactivity_mult=args.inactivity_mult,
+        ),
+    )
+    replicas = max(1, args.replicas)
+    series = run_simulation(config, replicas, max(1, args.workers), args.seed)
+    summary = summarize(series, config)
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        print(format_summary(summary, config, replicas))
@@ -0,0 +1,75 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+from app.config import (
+    AUTH_USER_CACHE_SIZE,
+    AUTH_USER_CACHE_TTL_SEC,
+    RANK_TOP_CACHE_TTL_SEC,
+)
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire after ttl_seconds.
+
+    The cache is per process: with several uvicorn workers an invalidation only
+    clears the local copy and other workers serve their entry until it expires.
+    """
+
+    def __init__(self, ttl_seconds: float, maxsize: int = 128):
+        self.ttl_seconds = ttl_seconds
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if self.ttl_seconds <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl_seconds,
+            }
+
+
+rank_top_cache = TTLCache(ttl_seconds=RANK_TOP_CACHE_TTL_SEC, maxsize=1)
+
+# Holds only immutable user fields (see schemas.UserOut); never prestige.
+user_profile_cache = TTLCache(
+    ttl_seconds=AUTH_USER_CACHE_TTL_SEC, maxsize=AUTH_USER_CACHE_SIZE
+)
+
+
+def invalidate_rank_cache() -> None:
+    rank_top_cache.invalidate()
@@ -3,3 +3,28 @@ import os
 JWT_SECRET = os.getenv("JWT_SECRET", "dev-secret-change-me")
 JWT_ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "1440"))
+LEADERBOARD_SNAPSHOT_INTERVAL_SEC = int(os.getenv("LEADERBOARD_SNAPSHOT_INTERVAL_SEC", "30"))
+RANK_TOP_CACHE_TTL_SEC = float(os.getenv("RANK_TOP_CACHE_TTL_SEC", "5"))
+AUTH_USER_CACHE_TTL_SEC = float(os.getenv("AUTH_USER_CACHE_TTL_SEC", "30"))
+AUTH_USER_CACHE_SIZE = int(os.getenv("AUTH_USER_CACHE_SIZE", "10000"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64"))
+PASSWORD_HASH_RETRY_AFTER_SEC = int(os.getenv("PASSWORD_HASH_RETRY_AFTER_SEC", "2"))
+NIGHTLY_DECAY_CHUNK_SIZE = int(os.getenv("NIGHTLY_DECAY_CHUNK_SIZE", "5000"))
+PVP_LIMITER_BACKEND = os.getenv("PVP_LIMITER_BACKEND", "memory")
+PVP_LIMITER_REDIS_URL = os.getenv("PVP_LIMITER_REDIS_URL", "redis://localhost:6379/0")
+PVP_LIMITER_MAX_ENTRIES = int(os.getenv("PVP_LIMITER_MAX_ENTRIES", "100000"))
+PVP_IDEMPOTENCY_RETENTION_HOURS = float(os.getenv("PVP_IDEMPOTENCY_RETENTION_HOURS", "48"))
+# Accepted keys are remembered as long as pvp_idempotency keeps their rows.
+PVP_LIMITER_KEY_TTL_SEC = int(
+    os.getenv("PVP_LIMITER_KEY_TTL_SEC", str(int(PVP_IDEMPOTENCY_RETENTION_HOURS * 3600)))
+)
+IDEMPOTENCY_COMPACTION_BATCH_SIZE = int(os.getenv("IDEMPOTENCY_COMPACTION_BATCH_SIZE", "1000"))
+IDEMPOTENCY_COMPACTION_INTERVAL_SEC = int(os.getenv("IDEMPOTENCY_COMPACTION_INTERVAL_SEC", "300"))
+ATTACK_LOG_PARTITIONS_AHEAD = int(os.getenv("ATTACK_LOG_PARTITIONS_AHEAD", "2"))
+ATTACK_LOG_RETAIN_SEASONS = int(os.getenv("ATTACK_LOG_RETAIN_SEASONS", "6"))
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "true").lower() == "true"
+# Shared directory where each uvicorn worker writes its metrics for /metrics.
+# Leave empty when running a single worker.
+METRICS_MULTIPROC_DIR = os.getenv("METRICS_MULTIPROC_DIR", "")
+METRICS_FLUSH_INTERVAL_SEC = float(os.getenv("METRICS_FLUSH_INTERVAL_SEC", "5"))
@@ -0,0 +1,113 @@
+from datetime import date, datetime, timedelta
+from typing import NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.pvp_constants import (
+    DAILY_DECAY_MAX,
+    DAILY_DECAY_RATE,
+    DECAY_THRESHOLD,
+    INACTIVITY_GRACE,
+    INACTIVITY_MULT,
+    SERVER_TZ,
+)
+
+NEVER_ACTIVE_DAYS = 999
+INACTIVE_DECAY_RATE = DAILY_DECAY_RATE * INACTIVITY_MULT
+
+
+class DecayParams(NamedTuple):
+    """Decay constants; override fields to evaluate a balance change."""
+
+    threshold: int = DECAY_THRESHOLD
+    rate: float = DAILY_DECAY_RATE
+    max_decay: int = DAILY_DECAY_MAX
+    grace_days: int = INACTIVITY_GRACE
+    inactivity_mult: float = INACTIVITY_MULT
+
+
+DEFAULT_PARAMS = DecayParams()
+
+
+class DecayBatch(NamedTuple):
+    decay: np.ndarray
+    inactive_days: np.ndarray
+    rate: np.ndarray
+
+
+def calculate_inactive_days(now: datetime, last_pvp_at: Optional[datetime]) -> int:
+    if last_pvp_at is None:
+        return NEVER_ACTIVE_DAYS
+    return (now.date() - last_pvp_at.astimezone(SERVER_TZ).date()).days
+
+
+def compute_decay(prestige: int, inactive_days: int) -> Tuple[int, float]:
+    """Scalar formula for one user, kept as the reference for decay_kernel."""
+    excess = max(0, prestige - DECAY_THRESHOLD)
+    rate = DAILY_DECAY_RATE
+    if inactive_days >= INACTIVITY_GRACE:
+        rate *= INACTIVITY_MULT
+    return round(min(DAILY_DECAY_MAX, excess * rate)), rate
+
+
+def local_pvp_days(last_pvp_at: Sequence[Optional[datetime]]) -> np.ndarray:
+    """Server-local calendar day of each last attack; NaT where there was none."""
+    return np.array(
+        [
+            np.datetime64(value.astimezone(SERVER_TZ).date(), "D")
+            if value is not None
+            else np.datetime64("NaT", "D")
+            for value in last_pvp_at
+        ],
+        dtype="datetime64[D]",
+    )
+
+
+def decay_kernel(
+    prestige: np.ndarray,
+    last_pvp_day: np.ndarray,
+    today: date,
+    params: DecayParams = DEFAULT_PARAMS,
+) -> DecayBatch:
+    """Vectorized compute_decay over a batch of users.
+
+    last_pvp_day holds server-local days (see local_pvp_days), NaT meaning never.
+    np.rint rounds half to even, like round() in compute_decay.
+    """
+    prestige = np.asarray(prestige, dtype=np.int64)
+    last_pvp_day = np.asarray(last_pvp_day, dtype="datetime64[D]")
+
+    never = np.isnat(last_pvp_day)
+    elapsed = (np.datetime64(today, "D") - last_pvp_day).astype(np.int64)
+    inactive_days = np.where(never, NEVER_ACTIVE_DAYS, elapsed)
+
+    rate = np.where(
+        inactive_days >= params.grace_days,
+        params.rate * params.inactivity_mult,
+        params.rate,
+    )
+    excess = np.maximum(prestige - params.threshold, 0)
+    decay = np.rint(np.minimum(params.max_decay, excess * rate)).astype(np.int64)
+    return DecayBatch(decay=decay, inactive_days=inactive_days, rate=rate)
+
+
+def project_nights(
+    prestige: np.ndarray,
+    last_pvp_day: np.ndarray,
+    first_night: date,
+    nights: int,
+    params: DecayParams = DEFAULT_PARAMS,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Apply decay_kernel for consecutive nights, assuming nobody attacks.
+
+    Returns final prestige plus per-night decay totals and decayed-user counts.
+    """
+    current = np.array(prestige, dtype=np.int64)
+    decay_totals = np.zeros(nights, dtype=np.int64)
+    decayed_users = np.zeros(nights, dtype=np.int64)
+    for night in range(nights):
+        batch = decay_kernel(current, last_pvp_day, first_night + timedelta(days=night), params)
+        current -= batch.decay
+        decay_totals[night] = batch.decay.sum()
+        decayed_users[night] = np.count_nonzero(batch.decay)
+    return current, decay_totals, decayed_users
@@ -0,0 +1,190 @@
+import argparse
+import re
+from datetime import date, datetime, time, timezone
+from typing import List, Optional, Tuple
+
+from sqlalchemy import desc, select, text
+from sqlalchemy.orm import Session
+
+from app import models
+from app.config import ATTACK_LOG_PARTITIONS_AHEAD, ATTACK_LOG_RETAIN_SEASONS
+from app.db import SessionLocal
+
+PARENT = "attack_logs"
+PARTITION_NAME = re.compile(r"^attack_logs_p(\d{4})_(\d{2})$")
+PARTITION_BOUND = re.compile(r"FROM \('([^']+)'\) TO \('([^']+)'\)")
+# DETACH/CREATE take a short exclusive lock on attack_logs; give up rather than
+# queue live attack inserts behind it.
+LOCK_TIMEOUT = "5s"
+
+
+def month_start(value: date) -> date:
+    return value.replace(day=1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARENT}_p{month.year:04d}_{month.month:02d}"
+
+
+def utc_midnight(day: date) -> str:
+    return datetime.combine(day, time(0, 0), tzinfo=timezone.utc).isoformat()
+
+
+def partition_bounds(db: Session) -> List[Tuple[str, datetime, datetime]]:
+    """(name, lower, upper) of every range partition, oldest first.
+
+    Read from the catalog rather than the name, since attack_logs_legacy (the
+    table migration 0011 attached) spans many months.
+    """
+    rows = db.execute(
+        text(
+            "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) "
+            "FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = CAST(:parent AS regclass)"
+        ),
+        {"parent": PARENT},
+    ).all()
+    bounds = []
+    for name, bound in rows:
+        match = PARTITION_BOUND.search(bound)
+        if match:  # attack_logs_default has no range
+            lower, upper = (datetime.fromisoformat(value) for value in match.groups())
+            bounds.append((name, lower, upper))
+    return sorted(bounds, key=lambda entry: entry[1])
+
+
+def list_partitions(db: Session) -> List[date]:
+    """Months that currently have an attached attack_logs_pYYYY_MM partition."""
+    months = []
+    for name, _, _ in partition_bounds(db):
+        match = PARTITION_NAME.match(name)
+        if match:
+            months.append(date(int(match.group(1)), int(match.group(2)), 1))
+    return months
+
+
+def archive_name(name: str) -> str:
+    match = PARTITION_NAME.match(name)
+    if match:
+        return f"{PARENT}_archive_{match.group(1)}_{match.group(2)}"
+    return f"{PARENT}_archive_{name[len(PARENT) + 1:]}"
+
+
+def ensure_partitions(
+    db: Session, today: date, months_ahead: int = ATTACK_LOG_PARTITIONS_AHEAD
+) -> List[str]:
+    """Create the current month and months_ahead future partitions if missing.
+
+    Creating them early keeps attack_logs_default empty; Postgres refuses to add
+    a partition whose range already has rows in the default partition.
+    """
+    existing = partition_bounds(db)
+    created = []
+    db.execute(text(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'"))
+    for offset in range(months_ahead + 1):
+        month = add_months(month_start(today), offset)
+        lower = datetime.combine(month, time(0, 0), tzinfo=timezone.utc)
+        upper = datetime.combine(add_months(month, 1), time(0, 0), tzinfo=timezone.utc)
+        if any(start < upper and lower < end for _, start, end in existing):
+            continue
+        name = partition_name(month)
+        db.execute(
+            text(
+                f"CREATE TABLE {name} PARTITION OF {PARENT} "
+                f"FOR VALUES FROM ('{utc_midnight(month)}') "
+                f"TO ('{utc_midnight(add_months(month, 1))}')"
+            )
+        )
+        created.append(name)
+    db.commit()
+    return created
+
+
+def retention_cutoff(db: Session, retain_seasons: int) -> Optional[datetime]:
+    """Start of the oldest retained season, or None while fewer seasons exist."""
+    if retain_seasons <= 0:
+        return None
+    return db.execute(
+        select(models.Season.starts_at)
+        .order_by(desc(models.Season.number))
+        .offset(retain_seasons - 1)
+        .limit(1)
+    ).scalar_one_or_none()
+
+
+def prune_partitions(
+    db: Session,
+    retain_seasons: int = ATTACK_LOG_RETAIN_SEASONS,
+    drop: bool = False,
+) -> List[str]:
+    """Detach partitions that end before the oldest of the last retain_seasons seasons.
+
+    Partitions are picked by their upper bound. Detached partitions are renamed
+    to attack_logs_archive_YYYY_MM (attack_logs_archive_legacy for the
+    pre-partitioning history) so they can be dumped and dropped later, or
+    dropped right away with drop=True.
+    """
+    cutoff = retention_cutoff(db, retain_seasons)
+    if cutoff is None:
+        return []
+
+    pruned = []
+    for name, _, upper in partition_bounds(db):
+        if upper > cutoff:
+            continue
+        db.execute(text(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'"))
+        db.execute(text(f"ALTER TABLE {PARENT} DETACH PARTITION {name}"))
+        if drop:
+            db.execute(text(f"DROP TABLE {name}"))
+        else:
+            archive = archive_name(name)
+            db.execute(text(f"ALTER TABLE {name} RENAME TO {archive}"))
+            name = archive
+        db.commit()
+        pruned.append(name)
+    return pruned
+
+
+def run_attack_log_partitions(
+    months_ahead: int = ATTACK_LOG_PARTITIONS_AHEAD,
+    retain_seasons: int = ATTACK_LOG_RETAIN_SEASONS,
+    drop: bool = False,
+) -> Tuple[List[str], List[str]]:
+    db = SessionLocal()
+    try:
+        created = ensure_partitions(db, datetime.now(timezone.utc).date(), months_ahead)
+        pruned = prune_partitions(db, retain_seasons, drop)
+        return created, pruned
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain monthly attack_logs partitions.")
+    parser.add_argument(
+        "--months-ahead",
+        type=int,
+        default=ATTACK_LOG_PARTITIONS_AHEAD,
+        help="Future monthly partitions to keep created.",
+    )
+    parser.add_argument(
+        "--retain-seasons",
+        type=int,
+        default=ATTACK_LOG_RETAIN_SEASONS,
+        help="Keep partitions overlapping the last N seasons (0 keeps everything).",
+    )
+    parser.add_argument(
+        "--drop",
+        action="store_true",
+        help="Drop pruned partitions instead of keeping them as archive tables.",
+    )
+    args = parser.parse_args()
+
+    created, pruned = run_attack_log_partitions(args.months_ahead, args.retain_seasons, args.drop)
+    print(f"Created partitions: {', '.join(created) or 'none'}")
+    print(f"{'Dropped' if args.drop else 'Archived'} partitions: {', '.join(pruned) or 'none'}")
@@ -0,0 +1,153 @@
+import heapq
+from datetime import date, datetime
+from typing import List, NamedTuple, Tuple
+
+import numpy as np
+from sqlalchemy import Date, cast, func, literal, select
+from sqlalchemy.orm import Session
+
+from app import models
+from app.config import NIGHTLY_DECAY_CHUNK_SIZE
+from app.db import SessionLocal
+from app.decay import DEFAULT_PARAMS, DecayParams, project_nights
+from app.pvp_constants import SERVER_TZ
+
+HISTOGRAM_BUCKET = 100
+EPOCH = date(1970, 1, 1)
+# datetime64 stores NaT as the smallest int64.
+NAT_DAY = np.iinfo(np.int64).min
+
+
+class DecayProjection(NamedTuple):
+    users: int
+    nights: int
+    decay_per_night: np.ndarray
+    decayed_per_night: np.ndarray
+    histogram_before: np.ndarray
+    histogram_after: np.ndarray
+    top: List[Tuple[int, int, str]]
+
+
+def add_histogram(histogram: np.ndarray, prestige: np.ndarray) -> np.ndarray:
+    counts = np.bincount(np.maximum(prestige, 0) // HISTOGRAM_BUCKET)
+    if counts.size > histogram.size:
+        histogram = np.pad(histogram, (0, counts.size - histogram.size))
+    histogram[: counts.size] += counts
+    return histogram
+
+
+def project_decay(
+    db: Session,
+    first_night: date,
+    nights: int,
+    params: DecayParams = DEFAULT_PARAMS,
+    top_n: int = 10,
+    chunk_size: int = NIGHTLY_DECAY_CHUNK_SIZE,
+) -> DecayProjection:
+    """Project N nights of decay over the live ladder without writing anything.
+
+    Users are streamed through a server-side cursor in chunks; only the
+    aggregates and a top_n heap are kept in memory.
+    """
+    # Server-local day as days since the epoch, so chunks convert without datetimes.
+    local_day = cast(func.timezone(SERVER_TZ.key, models.User.last_pvp_at), Date)
+    epoch_day = local_day - literal(EPOCH, Date)
+    rows = db.execute(
+        select(models.User.prestige, epoch_day, models.User.id, models.User.email)
+        .execution_options(yield_per=chunk_size)
+    )
+
+    users = 0
+    decay_per_night = np.zeros(nights, dtype=np.int64)
+    decayed_per_night = np.zeros(nights, dtype=np.int64)
+    histogram_before = np.zeros(0, dtype=np.int64)
+    histogram_after = np.zeros(0, dtype=np.int64)
+    # Min-heap keyed like the ladder (prestige desc, id asc), so heap[0] is the weakest.
+    top: List[Tuple[int, Tuple[int, ...], str]] = []
+
+    for chunk in rows.partitions():
+        prestige = np.fromiter((row[0] for row in chunk), dtype=np.int64, count=len(chunk))
+        last_pvp_day = np.fromiter(
+            (NAT_DAY if row[1] is None else row[1] for row in chunk),
+            dtype=np.int64,
+            count=len(chunk),
+        ).view("datetime64[D]")
+        final, decay_totals, decayed_users = project_nights(
+            prestige, last_pvp_day, first_night, nights, params
+        )
+
+        users += len(chunk)
+        decay_per_night += decay_totals
+        decayed_per_night += decayed_users
+        histogram_before = add_histogram(histogram_before, prestige)
+        histogram_after = add_histogram(histogram_after, final)
+
+        if top_n > 0:
+            # Everything tied with the chunk's top_n-th value, so id tie-breaks stay exact.
+            cutoff = np.partition(final, -top_n)[-top_n] if final.size > top_n else final.min()
+            for index in np.flatnonzero(final >= cutoff).tolist():
+                row = chunk[index]
+                # Negated uuid bytes make the lower id win ties in the min-heap.
+                entry = (int(final[index]), tuple(-b for b in row[2].bytes), row[3])
+                if len(top) < top_n:
+                    heapq.heappush(top, entry)
+                elif entry > top[0]:
+                    heapq.heapreplace(top, entry)
+
+    ladder = [(prestige, email) for prestige, _, email in sorted(top, reverse=True)]
+    return DecayProjection(
+        users=users,
+        nights=nights,
+        decay_per_night=decay_per_night,
+        decayed_per_night=decayed_per_night,
+        histogram_before=histogram_before,
+        histogram_after=histogram_after,
+        top=[(rank, prestige, email) for rank, (prestige, email) in enumerate(ladder, 1)],
+    )
+
+
+def run_decay_projection(
+    nights: int, params: DecayParams = DEFAULT_PARAMS, top_n: int = 10
+) -> DecayProjection:
+    db = SessionLocal()
+    try:
+        db.connection(execution_options={"postgresql_readonly": True})
+        return project_decay(db, datetime.now(SERVER_TZ).date(), nights, params, top_n)
+    finally:
+        db.rollback()
+        db.close()
+
+
+def format_projection(projection: DecayProjection, params: DecayParams) -> str:
+    lines = [
+        f"Dry run: {projection.nights} night(s) over {projection.users} users, no writes.",
+        (
+            f"Params: threshold={params.threshold} rate={params.rate} "
+            f"max={params.max_decay} grace={params.grace_days} "
+            f"inactivity_mult={params.inactivity_mult}"
+        ),
+        "",
+        "night  decayed_users  total_decay",
+    ]
+    for night in range(projection.nights):
+        lines.append(
+            f"{night + 1:>5}  {projection.decayed_per_night[night]:>13}"
+            f"  {projection.decay_per_night[night]:>11}"
+        )
+    lines.append(f"total  {'':>13}  {int(projection.decay_per_night.sum()):>11}")
+
+    lines += ["", "prestige      before     after"]
+    size = max(projection.histogram_before.size, projection.histogram_after.size)
+    before = np.pad(projection.histogram_before, (0, size - projection.histogram_before.size))
+    after = np.pad(projection.histogram_after, (0, size - projection.histogram_after.size))
+    for bucket in range(size):
+        if before[bucket] == 0 and after[bucket] == 0:
+            continue
+        low = bucket * HISTOGRAM_BUCKET
+        label = f"{low}-{low + HISTOGRAM_BUCKET - 1}"
+        lines.append(f"{label:<12}{before[bucket]:>8}{after[bucket]:>10}")
+
+    lines += ["", "rank  prestige  email"]
+    for rank, prestige, email in projection.top:
+        lines.append(f"{rank:>4}  {prestige:>8}  {email}")
+    return "\n".join(lines)
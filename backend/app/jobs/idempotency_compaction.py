@@ -0,0 +1,106 @@
+import argparse
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import BigInteger, cast, column, delete, func, literal, select, table, tuple_
+from sqlalchemy.dialects.postgresql import REGCLASS
+from sqlalchemy.orm import Session
+
+from app import models
+from app.config import (
+    IDEMPOTENCY_COMPACTION_BATCH_SIZE,
+    IDEMPOTENCY_COMPACTION_INTERVAL_SEC,
+    PVP_IDEMPOTENCY_RETENTION_HOURS,
+)
+from app.db import SessionLocal
+
+
+def retention_cutoff(now: Optional[datetime] = None) -> datetime:
+    now = now or datetime.now(timezone.utc)
+    return now - timedelta(hours=PVP_IDEMPOTENCY_RETENTION_HOURS)
+
+
+def compact_idempotency(
+    db: Session,
+    cutoff: datetime,
+    batch_size: int = IDEMPOTENCY_COMPACTION_BATCH_SIZE,
+) -> int:
+    """Delete idempotency rows created before cutoff, one committed batch at a time.
+
+    Each batch is picked oldest first through ix_pvp_idempotency_created_at and
+    skips rows locked by in-flight attacks, so it never waits on the hot path.
+    """
+    key = tuple_(models.PvpIdempotency.attacker_id, models.PvpIdempotency.idempotency_key)
+    deleted = 0
+    while True:
+        expired = (
+            select(models.PvpIdempotency.attacker_id, models.PvpIdempotency.idempotency_key)
+            .where(models.PvpIdempotency.created_at < cutoff)
+            .order_by(models.PvpIdempotency.created_at)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        result = db.execute(delete(models.PvpIdempotency).where(key.in_(expired)))
+        db.commit()
+        deleted += result.rowcount
+        if result.rowcount < batch_size:
+            return deleted
+
+
+def idempotency_table_stats(db: Session) -> dict:
+    """Size of pvp_idempotency from the catalog, without scanning the table."""
+    relation = cast(literal(models.PvpIdempotency.__tablename__), REGCLASS)
+    pg_class = table("pg_class", column("oid"), column("reltuples"))
+    rows_estimate = (
+        select(cast(func.greatest(pg_class.c.reltuples, 0), BigInteger))
+        .where(pg_class.c.oid == relation)
+        .scalar_subquery()
+    )
+    oldest = select(func.min(models.PvpIdempotency.created_at)).scalar_subquery()
+    row = db.execute(
+        select(
+            rows_estimate.label("rows_estimate"),
+            func.pg_table_size(relation).label("table_bytes"),
+            func.pg_indexes_size(relation).label("index_bytes"),
+            func.pg_total_relation_size(relation).label("total_bytes"),
+            oldest.label("oldest_created_at"),
+        )
+    ).one()
+    return {**row._asdict(), "retention_hours": PVP_IDEMPOTENCY_RETENTION_HOURS}
+
+
+def run_idempotency_compaction(batch_size: int = IDEMPOTENCY_COMPACTION_BATCH_SIZE) -> int:
+    db = SessionLocal()
+    try:
+        return compact_idempotency(db, retention_cutoff(), batch_size)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Delete pvp_idempotency rows older than the retention window."
+    )
+    parser.add_argument(
+        "--interval",
+        type=int,
+        nargs="?",
+        const=IDEMPOTENCY_COMPACTION_INTERVAL_SEC,
+        default=None,
+        help="Keep compacting every N seconds instead of running once.",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=IDEMPOTENCY_COMPACTION_BATCH_SIZE,
+        help="Rows deleted per committed batch.",
+    )
+    args = parser.parse_args()
+
+    while True:
+        count = run_idempotency_compaction(args.batch_size)
+        print(f"Idempotency compaction deleted {count} rows.")
+        if args.interval is None:
+            break
+        time.sleep(args.interval)
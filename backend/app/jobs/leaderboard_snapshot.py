@@ -0,0 +1,67 @@
+import argparse
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy import delete, func, insert, literal, select
+from sqlalchemy.orm import Session
+
+from app import models
+from app.cache import invalidate_rank_cache
+from app.config import LEADERBOARD_SNAPSHOT_INTERVAL_SEC
+from app.db import SessionLocal
+
+# Serializes concurrent refreshes (interval job, nightly decay, season start).
+SNAPSHOT_LOCK_ID = 0x1EAD
+
+
+def refresh_leaderboard_snapshot(db: Session) -> int:
+    snapshot_at = datetime.now(timezone.utc)
+    db.execute(select(func.pg_advisory_xact_lock(SNAPSHOT_LOCK_ID)))
+    db.execute(delete(models.LeaderboardSnapshot))
+
+    ranked = select(
+        func.row_number().over(
+            order_by=(models.User.prestige.desc(), models.User.id.asc())
+        ),
+        models.User.id,
+        models.User.email,
+        models.User.prestige,
+        literal(snapshot_at, models.LeaderboardSnapshot.snapshot_at.type),
+    )
+    result = db.execute(
+        insert(models.LeaderboardSnapshot).from_select(
+            ["rank", "user_id", "email", "prestige", "snapshot_at"],
+            ranked,
+        )
+    )
+    db.commit()
+    invalidate_rank_cache()
+    return result.rowcount
+
+
+def run_leaderboard_snapshot() -> int:
+    db = SessionLocal()
+    try:
+        return refresh_leaderboard_snapshot(db)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Refresh the leaderboard snapshot.")
+    parser.add_argument(
+        "--interval",
+        type=int,
+        nargs="?",
+        const=LEADERBOARD_SNAPSHOT_INTERVAL_SEC,
+        default=None,
+        help="Keep refreshing every N seconds instead of running once.",
+    )
+    args = parser.parse_args()
+
+    while True:
+        count = run_leaderboard_snapshot()
+        print(f"Leaderboard snapshot refreshed with {count} users.")
+        if args.interval is None:
+            break
+        time.sleep(args.interval)
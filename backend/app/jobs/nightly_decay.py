@@ -1,77 +1,329 @@
-from datetime import datetime
-from typing import Optional
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+from typing import List, Optional, Tuple
+from uuid import UUID
 
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy import Date, Integer, case, cast, func, insert, literal, select, update
+from sqlalchemy.dialects.postgresql import DOUBLE_PRECISION
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
 
 from app import models
+from app.config import NIGHTLY_DECAY_CHUNK_SIZE
 from app.db import SessionLocal
+from app.decay import INACTIVE_DECAY_RATE, NEVER_ACTIVE_DAYS, DecayParams
+from app.jobs.decay_projection import format_projection, run_decay_projection
+from app.jobs.leaderboard_snapshot import refresh_leaderboard_snapshot
 from app.pvp_constants import (
     DAILY_DECAY_MAX,
     DAILY_DECAY_RATE,
     DECAY_THRESHOLD,
     INACTIVITY_GRACE,
-    INACTIVITY_MULT,
     SERVER_TZ,
 )
 
+TICK_NAME = "nightly_decay"
+UUID_SPACE = 1 << 128
 
-def calculate_inactive_days(now: datetime, last_pvp_at: Optional[datetime]) -> int:
-    if last_pvp_at is None:
-        return 999
-    return (now.date() - last_pvp_at.astimezone(SERVER_TZ).date()).days
 
+def apply_decay(
+    db: Session,
+    today: date,
+    after_id: Optional[UUID] = None,
+    through_id: Optional[UUID] = None,
+) -> int:
+    """Decay users above the threshold and log it, in one statement.
 
-def run_nightly_decay() -> int:
+    after_id/through_id bound the users.id range (exclusive, inclusive).
+
+    Rates are float8 and rounded with round(float8), which rounds half to even
+    like np.rint, so the result matches app.decay.decay_kernel exactly.
+    """
+    user = models.User
+    filters = [user.prestige > DECAY_THRESHOLD]
+    if after_id is not None:
+        filters.append(user.id > after_id)
+    if through_id is not None:
+        filters.append(user.id <= through_id)
+    inactive_days = case(
+        (user.last_pvp_at.is_(None), NEVER_ACTIVE_DAYS),
+        else_=literal(today, Date) - cast(func.timezone(SERVER_TZ.key, user.last_pvp_at), Date),
+    )
+    candidates = (
+        select(
+            user.id.label("user_id"),
+            (user.prestige - DECAY_THRESHOLD).label("excess"),
+            inactive_days.label("inactive_days"),
+        )
+        .where(*filters)
+        .cte("candidates")
+    )
+    rate = case(
+        (
+            candidates.c.inactive_days >= INACTIVITY_GRACE,
+            literal(INACTIVE_DECAY_RATE, DOUBLE_PRECISION),
+        ),
+        else_=literal(DAILY_DECAY_RATE, DOUBLE_PRECISION),
+    )
+    rated = select(
+        candidates.c.user_id,
+        candidates.c.excess,
+        candidates.c.inactive_days,
+        rate.label("rate_used"),
+    ).cte("rated")
+    decay = cast(
+        func.round(
+            func.least(
+                literal(DAILY_DECAY_MAX, DOUBLE_PRECISION),
+                cast(rated.c.excess, DOUBLE_PRECISION) * rated.c.rate_used,
+            )
+        ),
+        Integer,
+    )
+    decays = (
+        select(
+            rated.c.user_id,
+            rated.c.inactive_days,
+            rated.c.rate_used,
+            decay.label("decay_amount"),
+        )
+        .cte("decays")
+    )
+    decayed_users = (
+        update(user)
+        .where(user.id == decays.c.user_id, decays.c.decay_amount > 0)
+        .values(prestige=user.prestige - decays.c.decay_amount)
+        .returning(
+            user.id.label("user_id"),
+            user.prestige.label("prestige_after"),
+            decays.c.decay_amount,
+            decays.c.inactive_days,
+            decays.c.rate_used,
+        )
+        .cte("decayed_users")
+    )
+    log_rows = select(
+        func.gen_random_uuid(),
+        decayed_users.c.user_id,
+        literal(today, Date),
+        decayed_users.c.prestige_after + decayed_users.c.decay_amount,
+        decayed_users.c.prestige_after,
+        decayed_users.c.decay_amount,
+        decayed_users.c.inactive_days,
+        decayed_users.c.rate_used,
+    )
+    result = db.execute(
+        insert(models.PrestigeDecayLog).from_select(
+            [
+                "id",
+                "user_id",
+                "day",
+                "prestige_before",
+                "prestige_after",
+                "decay_amount",
+                "inactive_days",
+                "rate_used",
+            ],
+            log_rows,
+        )
+    )
+    return result.rowcount
+
+
+def partition_bounds(partitions: int) -> List[Tuple[Optional[UUID], Optional[UUID]]]:
+    """Split the uuid space into equal (start_after, through_id) ranges."""
+    bounds = []
+    for index in range(partitions):
+        low = index * UUID_SPACE // partitions
+        high = (index + 1) * UUID_SPACE // partitions - 1
+        start_after = UUID(int=low - 1) if index > 0 else None
+        through_id = UUID(int=high) if index < partitions - 1 else None
+        bounds.append((start_after, through_id))
+    return bounds
+
+
+def partition_tick_name(index: int, partitions: int) -> str:
+    return f"{TICK_NAME}:{index + 1}/{partitions}"
+
+
+def lock_tick(
+    db: Session,
+    today: date,
+    tick_name: str = TICK_NAME,
+    start_after: Optional[UUID] = None,
+    partitions: int = 1,
+) -> models.SystemTick:
+    db.execute(
+        pg_insert(models.SystemTick)
+        .values(
+            tick_name=tick_name,
+            tick_day=today,
+            checkpoint_user_id=start_after,
+            partitions=partitions,
+        )
+        .on_conflict_do_nothing()
+    )
+    # Concurrent runs queue here and continue from each other's checkpoint.
+    return db.execute(
+        select(models.SystemTick)
+        .where(
+            models.SystemTick.tick_name == tick_name,
+            models.SystemTick.tick_day == today,
+        )
+        .with_for_update()
+    ).scalar_one()
+
+
+def decay_chunk(
+    db: Session,
+    tick: models.SystemTick,
+    today: date,
+    chunk_size: int,
+    through_id: Optional[UUID] = None,
+) -> Tuple[int, bool]:
+    """Decay the next keyset chunk after the tick checkpoint; returns (decayed, done)."""
+    chunk = select(models.User.id)
+    if tick.checkpoint_user_id is not None:
+        chunk = chunk.where(models.User.id > tick.checkpoint_user_id)
+    if through_id is not None:
+        chunk = chunk.where(models.User.id <= through_id)
+    chunk = chunk.order_by(models.User.id).limit(chunk_size).subquery()
+    # Postgres has no max(uuid); take the last id of the chunk instead.
+    chunk_end = db.scalar(select(chunk.c.id).order_by(chunk.c.id.desc()).limit(1))
+    if chunk_end is None:
+        tick.completed_at = func.now()
+        return 0, True
+
+    decayed = apply_decay(db, today, tick.checkpoint_user_id, chunk_end)
+    tick.checkpoint_user_id = chunk_end
+    return decayed, False
+
+
+def decay_range(
+    today: date,
+    tick_name: str,
+    start_after: Optional[UUID],
+    through_id: Optional[UUID],
+    chunk_size: int,
+) -> int:
+    """Drain one id range chunk by chunk, checkpointing on its own tick row."""
     db = SessionLocal()
     try:
-        now = datetime.now(SERVER_TZ)
-        today = now.date()
+        decayed = 0
+        while True:
+            tick = lock_tick(db, today, tick_name, start_after)
+            if tick.completed_at is not None:
+                db.rollback()
+                return decayed
 
-        tick = models.SystemTick(tick_name="nightly_decay", tick_day=today)
-        db.add(tick)
-        try:
+            # Each chunk commits with its checkpoint, so user row locks are
+            # held for one chunk only and a crashed run resumes where it stopped.
+            chunk_decayed, done = decay_chunk(db, tick, today, chunk_size, through_id)
             db.commit()
-        except IntegrityError:
+            decayed += chunk_decayed
+            if done:
+                return decayed
+    finally:
+        db.close()
+
+
+def run_nightly_decay(
+    chunk_size: int = NIGHTLY_DECAY_CHUNK_SIZE,
+    workers: int = 1,
+    today: Optional[date] = None,
+) -> int:
+    """Decay every user once for today (server time), or for the given day."""
+    db = SessionLocal()
+    try:
+        if today is None:
+            today = datetime.now(SERVER_TZ).date()
+
+        tick = lock_tick(db, today, partitions=workers)
+        if tick.completed_at is not None:
             db.rollback()
             return 0
+        # The first run of the day fixes the partitioning; reruns reuse it so
+        # a resumed day never mixes checkpoints from different layouts.
+        partitions = tick.partitions
+        db.commit()
 
-        decayed = 0
-        users = db.query(models.User).yield_per(1000)
-        for user in users:
-            excess = max(0, user.prestige - DECAY_THRESHOLD)
-            if excess == 0:
-                continue
-
-            inactive_days = calculate_inactive_days(now, user.last_pvp_at)
-            rate = DAILY_DECAY_RATE
-            if inactive_days >= INACTIVITY_GRACE:
-                rate *= INACTIVITY_MULT
-
-            decay = round(min(DAILY_DECAY_MAX, excess * rate))
-            if decay <= 0:
-                continue
-
-            prestige_before = user.prestige
-            user.prestige = prestige_before - decay
-            db.add(
-                models.PrestigeDecayLog(
-                    user_id=user.id,
-                    day=today,
-                    prestige_before=prestige_before,
-                    prestige_after=user.prestige,
-                    decay_amount=decay,
-                    inactive_days=inactive_days,
-                    rate_used=rate,
-                )
-            )
-            decayed += 1
+        if partitions == 1:
+            decayed = decay_range(today, TICK_NAME, None, None, chunk_size)
+        else:
+            with ProcessPoolExecutor(
+                max_workers=partitions,
+                mp_context=multiprocessing.get_context("spawn"),
+            ) as executor:
+                futures = [
+                    executor.submit(
+                        decay_range,
+                        today,
+                        partition_tick_name(index, partitions),
+                        start_after,
+                        through_id,
+                        chunk_size,
+                    )
+                    for index, (start_after, through_id) in enumerate(
+                        partition_bounds(partitions)
+                    )
+                ]
+                decayed = sum(future.result() for future in futures)
 
-        db.commit()
+            tick = lock_tick(db, today)
+            tick.completed_at = func.now()
+            db.commit()
+
+        refresh_leaderboard_snapshot(db)
         return decayed
     finally:
         db.close()
 
 
 if __name__ == "__main__":
-    count = run_nightly_decay()
+    parser = argparse.ArgumentParser(description="Apply the nightly prestige decay.")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Split users into N id ranges and decay them in parallel processes.",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=NIGHTLY_DECAY_CHUNK_SIZE,
+        help="Users per committed chunk.",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Project decay over the live ladder in a read-only transaction.",
+    )
+    parser.add_argument("--days", type=int, default=1, help="Nights to project (--dry-run).")
+    parser.add_argument("--top", type=int, default=10, help="Ladder size to report (--dry-run).")
+    defaults = DecayParams()
+    parser.add_argument("--threshold", type=int, default=defaults.threshold)
+    parser.add_argument("--rate", type=float, default=defaults.rate)
+    parser.add_argument("--max-decay", type=int, default=defaults.max_decay)
+    parser.add_argument("--grace-days", type=int, default=defaults.grace_days)
+    parser.add_argument("--inactivity-mult", type=float, default=defaults.inactivity_mult)
+    args = parser.parse_args()
+
+    params = DecayParams(
+        threshold=args.threshold,
+        rate=args.rate,
+        max_decay=args.max_decay,
+        grace_days=args.grace_days,
+        inactivity_mult=args.inactivity_mult,
+    )
+    if args.dry_run:
+        projection = run_decay_projection(max(1, args.days), params, args.top)
+        print(format_projection(projection, params))
+        raise SystemExit(0)
+    if params != defaults:
+        # The live job always applies the constants in pvp_constants.py.
+        parser.error("decay constant overrides require --dry-run")
+
+    count = run_nightly_decay(chunk_size=args.chunk_size, workers=max(1, args.workers))
     print(f"Nightly decay applied to {count} users.")
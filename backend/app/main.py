@@ -1,9 +1,28 @@
+import asyncio
+import contextlib
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.routes import army, auth, city, stats, pvp, rank, season
+from app.config import METRICS_MULTIPROC_DIR
+from app.prometheus import HttpMetricsMiddleware, flush_periodically
+from app.query_metrics import QueryMetricsMiddleware
+from app.routes import army, auth, city, metrics, stats, pvp, rank, season
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app: FastAPI):
+    if not METRICS_MULTIPROC_DIR:
+        yield
+        return
+    flusher = asyncio.create_task(flush_periodically(METRICS_MULTIPROC_DIR))
+    yield
+    flusher.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await flusher
+
 
-app = FastAPI(title="CityPvPPrestige API")
+app = FastAPI(title="CityPvPPrestige API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -11,7 +30,10 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-Next-Cursor"],
 )
+app.add_middleware(QueryMetricsMiddleware)
+app.add_middleware(HttpMetricsMiddleware)
 
 app.include_router(auth.router)
 app.include_router(city.router)
@@ -20,6 +42,7 @@ app.include_router(pvp.router)
 app.include_router(army.router)
 app.include_router(rank.router)
 app.include_router(season.router)
+app.include_router(metrics.router)
 
 
 @app.get("/")
@@ -31,6 +31,8 @@ class User(Base):
     last_pvp_at = Column(DateTime(timezone=True), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
+    __table_args__ = (Index("ix_users_ladder", prestige.desc(), id),)
+
 
 class City(Base):
     __tablename__ = "cities"
@@ -42,6 +44,9 @@ class City(Base):
     pop = Column(Integer, server_default=text("0"), nullable=False)
     power = Column(Integer, server_default=text("0"), nullable=False)
     prestige = Column(Integer, server_default=text("1000"), nullable=False)
+    # Maintained incrementally by /city/build; see routes.stats.building_power.
+    attack_power = Column(Integer, server_default=text("0"), nullable=False)
+    defense_power = Column(Integer, server_default=text("0"), nullable=False)
     last_collected_at = Column(DateTime(timezone=True), nullable=True)
 
 
@@ -72,7 +77,16 @@ class AttackLog(Base):
     attacker_attack_power = Column(Integer, nullable=True)
     defender_defense_power = Column(Integer, nullable=True)
     season_id = Column(UUID(as_uuid=True), ForeignKey("seasons.id"), nullable=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    # Partition key (monthly ranges, see app.jobs.attack_log_partitions); part of the PK.
+    created_at = Column(
+        DateTime(timezone=True), server_default=func.now(), primary_key=True, nullable=False
+    )
+
+    __table_args__ = (
+        Index("ix_attack_logs_attacker_id_created_at", attacker_id, created_at),
+        Index("ix_attack_logs_defender_id_created_at", defender_id, created_at),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
 
 
 class Season(Base):
@@ -132,6 +146,9 @@ class SystemTick(Base):
     tick_name = Column(String(50), primary_key=True)
     tick_day = Column(Date, primary_key=True)
     executed_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    checkpoint_user_id = Column(UUID(as_uuid=True), nullable=True)
+    completed_at = Column(DateTime(timezone=True), nullable=True)
+    partitions = Column(Integer, server_default=text("1"), nullable=False)
 
     __table_args__ = (UniqueConstraint("tick_name", "tick_day", name="uq_system_ticks"),)
 
@@ -146,6 +163,8 @@ class PvpIdempotency(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
+    __table_args__ = (Index("ix_pvp_idempotency_created_at", "created_at"),)
+
 
 class UnitType(Base):
     __tablename__ = "unit_types"
@@ -204,3 +223,17 @@ class TrainingJob(Base):
         Index("ix_training_jobs_user_id", "user_id"),
         Index("ix_training_jobs_status", "status"),
     )
+
+
+class LeaderboardSnapshot(Base):
+    __tablename__ = "leaderboard_snapshot"
+
+    rank = Column(Integer, primary_key=True, autoincrement=False)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    email = Column(String(255), nullable=False)
+    prestige = Column(Integer, nullable=False)
+    snapshot_at = Column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (
+        Index("ix_leaderboard_snapshot_user_id", "user_id", unique=True),
+    )
@@ -0,0 +1,314 @@
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from typing import Iterable, Optional
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import METRICS_FLUSH_INTERVAL_SEC, METRICS_MULTIPROC_DIR
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+UNMATCHED_ROUTE = "unmatched"
+
+
+class Metric:
+    """One metric family, sharded per thread so updates never take a lock.
+
+    Each thread writes only to its own dict of label values; a scrape adds the
+    shards up. Shards of threads that have exited are folded into one dict so
+    threadpool churn does not grow the list.
+    """
+
+    kind = "untyped"
+    # Gauges describe the present, so workers that have exited are left out.
+    live_only = False
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards: list[tuple[threading.Thread, dict]] = []
+        self._retired: dict = {}
+        self._shards_lock = threading.Lock()
+
+    def _shard(self) -> dict:
+        try:
+            return self._local.values
+        except AttributeError:
+            values = self._local.values = {}
+            with self._shards_lock:
+                self._shards.append((threading.current_thread(), values))
+            return values
+
+    @staticmethod
+    def _add(total, value):
+        return total + value
+
+    def collect(self) -> dict:
+        """Label values summed over every thread, keyed by label tuple."""
+        totals: dict = {}
+        with self._shards_lock:
+            live = []
+            for thread, values in self._shards:
+                if thread.is_alive():
+                    live.append((thread, values))
+                else:
+                    merge_values(self, self._retired, values.copy())
+            self._shards = live
+            merge_values(self, totals, self._retired)
+            shards = [values.copy() for _, values in live]
+        for values in shards:
+            merge_values(self, totals, values)
+        return totals
+
+
+def merge_values(metric: Metric, totals: dict, values: dict) -> None:
+    for labels, value in values.items():
+        if isinstance(value, list):
+            value = list(value)
+        totals[labels] = metric._add(totals[labels], value) if labels in totals else value
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        values = self._shard()
+        values[labels] = values.get(labels, 0.0) + amount
+
+
+class Gauge(Counter):
+    kind = "gauge"
+    live_only = True
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(Metric):
+    """Bucket counts per label tuple, stored as [per-bucket counts..., +Inf, sum]."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def _new_value(self):
+        return [0] * (len(self.buckets) + 1) + [0.0]
+
+    @staticmethod
+    def _add(total, value):
+        return [a + b for a, b in zip(total, value)]
+
+    def observe(self, value: float, *labels: str) -> None:
+        values = self._shard()
+        counts = values.get(labels)
+        if counts is None:
+            counts = values[labels] = self._new_value()
+        counts[bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: list[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def snapshot(self) -> dict:
+        """This worker's values in a JSON-friendly shape."""
+        return {
+            metric.name: [[list(labels), value] for labels, value in metric.collect().items()]
+            for metric in self.metrics
+        }
+
+    def flush(self, directory: str) -> None:
+        """Write this worker's snapshot to <directory>/<pid>.json, atomically."""
+        payload = json.dumps({"pid": os.getpid(), "metrics": self.snapshot()})
+        handle, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".json")
+        try:
+            with os.fdopen(handle, "w") as tmp:
+                tmp.write(payload)
+            os.replace(tmp_path, os.path.join(directory, f"{os.getpid()}.json"))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def merged(self, directory: Optional[str]) -> dict[str, dict]:
+        """Values of this worker plus every other worker's last flush."""
+        totals = {metric.name: metric.collect() for metric in self.metrics}
+        if not directory:
+            return totals
+        by_name = {metric.name: metric for metric in self.metrics}
+        for pid, snapshot in read_worker_snapshots(directory):
+            if pid == os.getpid():
+                continue
+            alive = pid_alive(pid)
+            for name, rows in snapshot.items():
+                metric = by_name.get(name)
+                if metric is None or (metric.live_only and not alive):
+                    continue
+                merge_values(metric, totals[name], {tuple(labels): value for labels, value in rows})
+        return totals
+
+    def render(self, directory: Optional[str] = None) -> str:
+        totals = self.merged(directory)
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for labels, value in sorted(totals[metric.name].items()):
+                pairs = list(zip(metric.labelnames, labels))
+                if isinstance(metric, Histogram):
+                    lines.extend(histogram_lines(metric, pairs, value))
+                else:
+                    lines.append(f"{metric.name}{format_labels(pairs)} {format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def histogram_lines(metric: Histogram, pairs: list, counts: list) -> list[str]:
+    lines = []
+    cumulative = 0
+    for bound, count in zip(metric.buckets + (float("inf"),), counts):
+        cumulative += count
+        le = format_labels(pairs + [("le", format_value(bound))])
+        lines.append(f"{metric.name}_bucket{le} {cumulative}")
+    lines.append(f"{metric.name}_sum{format_labels(pairs)} {format_value(counts[-1])}")
+    lines.append(f"{metric.name}_count{format_labels(pairs)} {cumulative}")
+    return lines
+
+
+def escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_labels(pairs: list) -> str:
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{escape_label(str(value))}"' for name, value in pairs) + "}"
+
+
+def format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def read_worker_snapshots(directory: str) -> list[tuple[int, dict]]:
+    snapshots = []
+    for entry in os.scandir(directory):
+        if entry.name.startswith(".") or not entry.name.endswith(".json"):
+            continue
+        try:
+            with open(entry.path) as handle:
+                payload = json.load(handle)
+        except (OSError, ValueError):
+            logger.warning("Skipping unreadable metrics file %s", entry.path)
+            continue
+        snapshots.append((payload["pid"], payload["metrics"]))
+    return snapshots
+
+
+def pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+async def flush_periodically(directory: str, interval: float = METRICS_FLUSH_INTERVAL_SEC) -> None:
+    """Write this worker's snapshot every interval seconds, and once more on cancel."""
+    os.makedirs(directory, exist_ok=True)
+    try:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(registry.flush, directory)
+            except OSError:
+                logger.exception("Metrics flush failed")
+    finally:
+        registry.flush(directory)
+
+
+def render_metrics() -> str:
+    return registry.render(METRICS_MULTIPROC_DIR or None)
+
+
+registry = Registry()
+
+http_request_duration = registry.register(
+    Histogram(
+        "http_request_duration_seconds",
+        "Time from request start to the last response byte.",
+        ("method", "route", "status"),
+    )
+)
+http_requests_in_flight = registry.register(
+    Gauge("http_requests_in_flight", "Requests currently being served.", ("method",))
+)
+pvp_attacks_accepted = registry.register(
+    Counter("pvp_attacks_accepted_total", "Attacks resolved and committed.")
+)
+pvp_attacks_rejected = registry.register(
+    Counter("pvp_attacks_rejected_total", "Attacks turned away, by reason.", ("reason",))
+)
+pvp_cap_hits = registry.register(
+    Counter(
+        "pvp_cap_hits_total",
+        "Accepted attacks that used up a daily cap (attacks, gain or loss).",
+        ("cap",),
+    )
+)
+
+
+class HttpMetricsMiddleware:
+    """Request latency per route template and status, and requests in flight."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = "500"
+        started = time.perf_counter()
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        http_requests_in_flight.inc(method)
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            http_requests_in_flight.dec(method)
+            route = getattr(scope.get("route"), "path", UNMATCHED_ROUTE)
+            http_request_duration.observe(time.perf_counter() - started, method, route, status)
@@ -14,6 +14,8 @@ EXPECTED_WIN_BASE = 0.35
 EXPECTED_WIN_DIVISOR = 2000
 EXPECTED_WIN_MIN = 0.15
 EXPECTED_WIN_MAX = 0.85
+ATTACK_ROLL_MIN = 0.9
+ATTACK_ROLL_MAX = 1.1
 
 DECAY_THRESHOLD = 1200
 DAILY_DECAY_RATE = 0.06
@@ -21,6 +23,9 @@ DAILY_DECAY_MAX = 60
 INACTIVITY_GRACE = 2
 INACTIVITY_MULT = 1.5
 
+SEASON_BASE_PRESTIGE = 1000
+SEASON_LENGTH_DAYS = 14
+
 PVP_MIN_ARMY_UNITS = 10
 
 # Keep in sync with docs/BALANCE_CONSTANTS.md
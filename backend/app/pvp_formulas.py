@@ -0,0 +1,81 @@
+import random
+
+import numpy as np
+
+from app.pvp_constants import (
+    ATTACK_ROLL_MAX,
+    ATTACK_ROLL_MIN,
+    BASE_GAIN,
+    BASE_LOSS,
+    EXPECTED_WIN_BASE,
+    EXPECTED_WIN_DIVISOR,
+    EXPECTED_WIN_MAX,
+    EXPECTED_WIN_MIN,
+    PRESTIGE_GAIN_CAP,
+    PRESTIGE_LOSS_CAP,
+)
+
+
+def clamp(value: float, min_value: float, max_value: float) -> float:
+    return max(min_value, min(max_value, value))
+
+
+def compute_expected_win(attacker_prestige: int, defender_prestige: int) -> float:
+    delta = defender_prestige - attacker_prestige
+    expected = EXPECTED_WIN_BASE + (delta / EXPECTED_WIN_DIVISOR)
+    return clamp(expected, EXPECTED_WIN_MIN, EXPECTED_WIN_MAX)
+
+
+def compute_prestige_delta(expected_win: float, result: str) -> int:
+    if result == "win":
+        return round(BASE_GAIN * (1 + (1 - expected_win)))
+    return -round(BASE_LOSS * (1 + expected_win))
+
+
+def roll_power(power: int) -> float:
+    """Effective power for one battle: power scaled by a uniform ±10% roll."""
+    return power * random.uniform(ATTACK_ROLL_MIN, ATTACK_ROLL_MAX)
+
+
+def apply_daily_caps(raw_delta: int, prestige_gain: int, prestige_loss: int) -> int:
+    """Clamp raw_delta to what is left of today's gain or loss cap."""
+    if raw_delta > 0:
+        return min(raw_delta, max(0, PRESTIGE_GAIN_CAP - prestige_gain))
+    if raw_delta < 0:
+        return -min(-raw_delta, max(0, PRESTIGE_LOSS_CAP - prestige_loss))
+    return 0
+
+
+# Vectorized twins of the functions above, for offline simulation. They apply
+# the same operations in the same order, so results match element for element;
+# np.rint rounds half to even like round().
+
+
+def expected_win_kernel(attacker_prestige: np.ndarray, defender_prestige: np.ndarray) -> np.ndarray:
+    delta = np.asarray(defender_prestige, dtype=np.int64) - np.asarray(
+        attacker_prestige, dtype=np.int64
+    )
+    expected = EXPECTED_WIN_BASE + (delta / EXPECTED_WIN_DIVISOR)
+    return np.maximum(EXPECTED_WIN_MIN, np.minimum(EXPECTED_WIN_MAX, expected))
+
+
+def prestige_delta_kernel(expected_win: np.ndarray, won: np.ndarray) -> np.ndarray:
+    gain = np.rint(BASE_GAIN * (1 + (1 - expected_win)))
+    loss = -np.rint(BASE_LOSS * (1 + expected_win))
+    return np.where(won, gain, loss).astype(np.int64)
+
+
+def roll_power_kernel(power: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    return power * rng.uniform(ATTACK_ROLL_MIN, ATTACK_ROLL_MAX, size=np.shape(power))
+
+
+def daily_caps_kernel(
+    raw_delta: np.ndarray, prestige_gain: np.ndarray, prestige_loss: np.ndarray
+) -> np.ndarray:
+    gain_left = np.maximum(0, PRESTIGE_GAIN_CAP - prestige_gain)
+    loss_left = np.maximum(0, PRESTIGE_LOSS_CAP - prestige_loss)
+    return np.where(
+        raw_delta > 0,
+        np.minimum(raw_delta, gain_left),
+        -np.minimum(-raw_delta, loss_left),
+    ).astype(np.int64)
@@ -0,0 +1,307 @@
+import logging
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from typing import Any, Awaitable, Callable, NamedTuple, Optional
+from uuid import UUID
+
+from app.config import (
+    PVP_LIMITER_BACKEND,
+    PVP_LIMITER_KEY_TTL_SEC,
+    PVP_LIMITER_MAX_ENTRIES,
+    PVP_LIMITER_REDIS_URL,
+)
+from app.pvp_constants import DAILY_ATTACK_LIMIT, SERVER_TZ
+
+logger = logging.getLogger(__name__)
+
+
+class LimiterState(NamedTuple):
+    global_until: Optional[datetime]
+    target_until: Optional[datetime]
+    attacks_used: int
+    key_accepted: bool
+
+
+class PvpLimiter:
+    """Fast-path rejection of attacks that Postgres would answer with 429.
+
+    The limiter only learns from attacks that were committed, so it can never
+    reject an attack the database would accept; Postgres stays the source of
+    truth and repeats every check. Keys of accepted attacks are remembered so
+    an idempotent replay skips the fast path and gets its stored response.
+    A limiter may not know a key (another worker recorded it, it expired or
+    was evicted), so a rejection is only returned once key_known confirms the
+    database has never seen the key either.
+    """
+
+    name = "off"
+
+    def __init__(self) -> None:
+        self.checks = 0
+        self.rejected = 0
+        self.replays = 0
+        self.errors = 0
+
+    async def check(
+        self,
+        attacker_id: UUID,
+        defender_id: UUID,
+        idempotency_key: str,
+        now: datetime,
+        ignore_cooldowns: bool = False,
+        key_known: Optional[Callable[[], Awaitable[bool]]] = None,
+    ) -> Optional[str]:
+        """Return the 429 detail the attack would get, or None to let it through."""
+        self.checks += 1
+        try:
+            state = await self._load(attacker_id, defender_id, idempotency_key, now.date())
+        except Exception:
+            # Fail open: the database performs the same checks.
+            self.errors += 1
+            logger.exception("PvP limiter lookup failed")
+            return None
+        if state is None:
+            return None
+        if state.key_accepted:
+            self.replays += 1
+            return None
+
+        reason = None
+        if not ignore_cooldowns and state.global_until and now < state.global_until:
+            reason = "Global attack cooldown"
+        elif state.attacks_used >= DAILY_ATTACK_LIMIT:
+            reason = "Daily attack limit reached"
+        elif not ignore_cooldowns and state.target_until and now < state.target_until:
+            reason = "Target on cooldown"
+        if reason and key_known is not None and await key_known():
+            # A replay this limiter never saw; the database answers it.
+            self.replays += 1
+            return None
+        if reason:
+            self.rejected += 1
+        return reason
+
+    async def record(self, attacker_id: UUID, idempotency_key: str, response: dict) -> None:
+        """Remember a committed attack, using the windows from its response."""
+        limits = response["limits"]
+        cooldowns = response["cooldowns"]
+        reset_at = datetime.fromisoformat(limits["reset_at"])
+        try:
+            await self._store(
+                attacker_id,
+                UUID(str(response["defender_id"])),
+                idempotency_key,
+                day=reset_at.date() - timedelta(days=1),
+                attacks_used=limits["attacks_used"],
+                reset_at=reset_at,
+                global_until=datetime.fromisoformat(cooldowns["global_available_at"]),
+                target_until=datetime.fromisoformat(cooldowns["same_target_available_at"]),
+            )
+        except Exception:
+            self.errors += 1
+            logger.exception("PvP limiter update failed")
+
+    async def _load(
+        self, attacker_id: UUID, defender_id: UUID, idempotency_key: str, day: date
+    ) -> Optional[LimiterState]:
+        return None
+
+    async def _store(
+        self,
+        attacker_id: UUID,
+        defender_id: UUID,
+        idempotency_key: str,
+        day: date,
+        attacks_used: int,
+        reset_at: datetime,
+        global_until: datetime,
+        target_until: datetime,
+    ) -> None:
+        return None
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.name,
+            "checks": self.checks,
+            "rejected": self.rejected,
+            "replays": self.replays,
+            "errors": self.errors,
+        }
+
+
+class MemoryPvpLimiter(PvpLimiter):
+    """Per-process limiter; each worker only knows the attacks it committed."""
+
+    name = "memory"
+
+    def __init__(self, max_entries: int = PVP_LIMITER_MAX_ENTRIES) -> None:
+        super().__init__()
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple, tuple[float, Any]] = OrderedDict()
+
+    def _get(self, key: tuple) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.time():
+            del self._entries[key]
+            return None
+        return entry[1]
+
+    def _put(self, key: tuple, value: Any, expires_at: float) -> None:
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def _load(
+        self, attacker_id: UUID, defender_id: UUID, idempotency_key: str, day: date
+    ) -> Optional[LimiterState]:
+        return LimiterState(
+            global_until=self._get(("global", attacker_id)),
+            target_until=self._get(("target", attacker_id, defender_id)),
+            attacks_used=self._get(("daily", attacker_id, day.toordinal())) or 0,
+            key_accepted=self._get(("key", attacker_id, idempotency_key)) is not None,
+        )
+
+    async def _store(
+        self,
+        attacker_id: UUID,
+        defender_id: UUID,
+        idempotency_key: str,
+        day: date,
+        attacks_used: int,
+        reset_at: datetime,
+        global_until: datetime,
+        target_until: datetime,
+    ) -> None:
+        # Never roll back a window or lower the count if an older attack is
+        # recorded late.
+        for key, until in (
+            (("global", attacker_id), global_until),
+            (("target", attacker_id, defender_id), target_until),
+        ):
+            current = self._get(key)
+            if current is None or current < until:
+                self._put(key, until, until.timestamp())
+        daily_key = ("daily", attacker_id, day.toordinal())
+        attacks_used = max(attacks_used, self._get(daily_key) or 0)
+        self._put(daily_key, attacks_used, reset_at.timestamp())
+        self._put(
+            ("key", attacker_id, idempotency_key), True, time.time() + PVP_LIMITER_KEY_TTL_SEC
+        )
+
+    def stats(self) -> dict:
+        return {**super().stats(), "size": len(self._entries)}
+
+
+class RedisPvpLimiter(PvpLimiter):
+    """Shared limiter for any server speaking the Redis protocol (6.2+).
+
+    Needs the optional redis package (redis.asyncio). Each check is one MGET
+    and each record one script call. Records from different workers can
+    arrive out of order, so the script only ever raises a stored window or
+    count, like the memory backend does.
+    """
+
+    name = "redis"
+    prefix = "pvp:limiter"
+    # KEYS: global, target, daily, accepted key.
+    # ARGV: global_until ms, target_until ms, attacks_used, reset_at ms, key ttl sec.
+    record_script = """
+    local function set_max(key, value, expires_at_ms)
+        local current = tonumber(redis.call('GET', key))
+        if current == nil or current < tonumber(value) then
+            redis.call('SET', key, value, 'PXAT', expires_at_ms)
+        end
+    end
+    set_max(KEYS[1], ARGV[1], ARGV[1])
+    set_max(KEYS[2], ARGV[2], ARGV[2])
+    set_max(KEYS[3], ARGV[3], ARGV[4])
+    redis.call('SET', KEYS[4], 1, 'EX', ARGV[5])
+    """
+
+    def __init__(self, url: str = PVP_LIMITER_REDIS_URL, client: Any = None) -> None:
+        super().__init__()
+        if client is None:
+            try:
+                from redis import asyncio as redis_asyncio
+            except ImportError as exc:
+                raise RuntimeError(
+                    "PVP_LIMITER_BACKEND=redis requires the redis package"
+                ) from exc
+            client = redis_asyncio.from_url(url, decode_responses=True)
+        self._client = client
+        self._record = client.register_script(self.record_script)
+
+    def _keys(
+        self, attacker_id: UUID, defender_id: UUID, idempotency_key: str, day: date
+    ) -> list[str]:
+        # The hash tag keeps one attacker's keys in one cluster slot, as the
+        # record script needs.
+        attacker = f"{self.prefix}:{{{attacker_id}}}"
+        return [
+            f"{attacker}:global",
+            f"{attacker}:target:{defender_id}",
+            f"{attacker}:daily:{day.isoformat()}",
+            f"{attacker}:key:{idempotency_key}",
+        ]
+
+    async def _load(
+        self, attacker_id: UUID, defender_id: UUID, idempotency_key: str, day: date
+    ) -> Optional[LimiterState]:
+        global_until, target_until, attacks_used, accepted = await self._client.mget(
+            self._keys(attacker_id, defender_id, idempotency_key, day)
+        )
+        return LimiterState(
+            global_until=_from_epoch_ms(global_until),
+            target_until=_from_epoch_ms(target_until),
+            attacks_used=int(attacks_used or 0),
+            key_accepted=accepted is not None,
+        )
+
+    async def _store(
+        self,
+        attacker_id: UUID,
+        defender_id: UUID,
+        idempotency_key: str,
+        day: date,
+        attacks_used: int,
+        reset_at: datetime,
+        global_until: datetime,
+        target_until: datetime,
+    ) -> None:
+        await self._record(
+            keys=self._keys(attacker_id, defender_id, idempotency_key, day),
+            args=[
+                _epoch_ms(global_until),
+                _epoch_ms(target_until),
+                attacks_used,
+                _epoch_ms(reset_at),
+                PVP_LIMITER_KEY_TTL_SEC,
+            ],
+        )
+
+
+def _epoch_ms(value: datetime) -> int:
+    return int(value.timestamp() * 1000)
+
+
+def _from_epoch_ms(value: Optional[str]) -> Optional[datetime]:
+    if value is None:
+        return None
+    return datetime.fromtimestamp(int(value) / 1000, SERVER_TZ)
+
+
+def create_limiter(backend: str = PVP_LIMITER_BACKEND) -> PvpLimiter:
+    if backend == "memory":
+        return MemoryPvpLimiter()
+    if backend == "redis":
+        return RedisPvpLimiter()
+    if backend == "off":
+        return PvpLimiter()
+    raise ValueError(f"Unknown PVP_LIMITER_BACKEND: {backend}")
+
+
+pvp_limiter = create_limiter()
@@ -0,0 +1,91 @@
+import threading
+import time
+from typing import Optional
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import SERVER_TIMING_ENABLED
+from app.db import QueryStats, request_query_stats
+
+
+def server_timing(stats: QueryStats, app_seconds: float) -> str:
+    return (
+        f'db;dur={stats.db_seconds * 1000:.3f};desc="{stats.statements} queries", '
+        f"db-slowest;dur={stats.slowest_seconds * 1000:.3f}, "
+        f"app;dur={app_seconds * 1000:.3f}"
+    )
+
+
+class RouteQueryMetrics:
+    """Statement counts and DB time per route template, for this worker."""
+
+    def __init__(self):
+        self._routes: dict[tuple[str, str], dict] = {}
+        self._lock = threading.Lock()
+
+    def record(self, method: str, route: str, stats: QueryStats) -> None:
+        with self._lock:
+            entry = self._routes.get((method, route))
+            if entry is None:
+                entry = self._routes[(method, route)] = {
+                    "method": method,
+                    "route": route,
+                    "requests": 0,
+                    "statements_total": 0,
+                    "statements_max": 0,
+                    "db_seconds_total": 0.0,
+                    "db_seconds_max": 0.0,
+                    "slowest_statement_seconds": 0.0,
+                    "slowest_statement": None,
+                }
+            entry["requests"] += 1
+            entry["statements_total"] += stats.statements
+            entry["statements_max"] = max(entry["statements_max"], stats.statements)
+            entry["db_seconds_total"] += stats.db_seconds
+            entry["db_seconds_max"] = max(entry["db_seconds_max"], stats.db_seconds)
+            if stats.slowest_seconds > entry["slowest_statement_seconds"]:
+                entry["slowest_statement_seconds"] = stats.slowest_seconds
+                entry["slowest_statement"] = stats.slowest_statement
+
+    def snapshot(self) -> list[dict]:
+        with self._lock:
+            routes = [dict(entry) for entry in self._routes.values()]
+        return sorted(routes, key=lambda entry: entry["db_seconds_total"], reverse=True)
+
+
+route_query_metrics = RouteQueryMetrics()
+
+
+class QueryMetricsMiddleware:
+    """Counts the statements each request runs and reports them in Server-Timing.
+
+    Written as a plain ASGI middleware so the route handler keeps running in
+    the request's own task and context.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = request_query_stats.set(stats)
+        started = time.perf_counter()
+
+        async def send_with_timing(message: Message) -> None:
+            if message["type"] == "http.response.start" and SERVER_TIMING_ENABLED:
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", server_timing(stats, time.perf_counter() - started))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            request_query_stats.reset(token)
+            route: Optional[str] = getattr(scope.get("route"), "path", None)
+            if route is not None:
+                route_query_metrics.record(scope["method"], route, stats)
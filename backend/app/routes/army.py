@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 from datetime import datetime, timedelta
+from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
@@ -8,7 +9,7 @@ from sqlalchemy.orm import Session
 from app import models, schemas
 from app.db import get_db
 from app.pvp_constants import SERVER_TZ
-from app.routes.auth import get_current_user
+from app.routes.auth import get_current_user_id
 
 router = APIRouter(tags=["army"])
 
@@ -48,7 +49,7 @@ def _set_job_done_if_ready(db: Session, job: models.TrainingJob) -> models.Train
 @router.get("/army", response_model=schemas.ArmyOut)
 def get_army(
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    current_user_id: UUID = Depends(get_current_user_id),
 ):
     unit_types = db.query(models.UnitType).order_by(models.UnitType.id).all()
 
@@ -57,7 +58,7 @@ def get_army(
         user_unit = (
             db.query(models.UserUnit)
             .filter(
-                models.UserUnit.user_id == current_user.id,
+                models.UserUnit.user_id == current_user_id,
                 models.UserUnit.unit_type_id == unit_type.id,
             )
             .first()
@@ -76,15 +77,15 @@ def get_army(
 def barracks_train(
     payload: schemas.BarracksTrainIn,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    current_user_id: UUID = Depends(get_current_user_id),
 ):
-    _get_barracks_or_404(db, current_user.id)
+    _get_barracks_or_404(db, current_user_id)
     unit_type = _get_unit_type_or_404(db, payload.unit_code)
 
     running = (
         db.query(models.TrainingJob)
         .filter(
-            models.TrainingJob.user_id == current_user.id,
+            models.TrainingJob.user_id == current_user_id,
             models.TrainingJob.status == "running",
         )
         .first()
@@ -98,7 +99,7 @@ def barracks_train(
     )
 
     job = models.TrainingJob(
-        user_id=current_user.id,
+        user_id=current_user_id,
         unit_type_id=unit_type.id,
         qty=payload.qty,
         started_at=started_at,
@@ -122,12 +123,12 @@ def barracks_train(
 @router.get("/barracks/queue", response_model=schemas.BarracksQueueOut)
 def barracks_queue(
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    current_user_id: UUID = Depends(get_current_user_id),
 ):
     job = (
         db.query(models.TrainingJob)
         .filter(
-            models.TrainingJob.user_id == current_user.id,
+            models.TrainingJob.user_id == current_user_id,
             models.TrainingJob.status.in_(["running", "done"]),
         )
         .order_by(models.TrainingJob.id.desc())
@@ -154,12 +155,12 @@ def barracks_queue(
 @router.post("/barracks/claim", response_model=schemas.BarracksClaimOut)
 def barracks_claim(
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    current_user_id: UUID = Depends(get_current_user_id),
 ):
     job = (
         db.query(models.TrainingJob)
         .filter(
-            models.TrainingJob.user_id == current_user.id,
+            models.TrainingJob.user_id == current_user_id,
             models.TrainingJob.status.in_(["running", "done"]),
         )
         .order_by(models.TrainingJob.id.desc())
@@ -181,7 +182,7 @@ def barracks_claim(
     user_unit = (
         db.query(models.UserUnit)
         .filter(
-            models.UserUnit.user_id == current_user.id,
+            models.UserUnit.user_id == current_user_id,
             models.UserUnit.unit_type_id == unit_type.id,
         )
         .first()
@@ -190,7 +191,7 @@ def barracks_claim(
     now = _now()
     if not user_unit:
         user_unit = models.UserUnit(
-            user_id=current_user.id,
+            user_id=current_user_id,
             unit_type_id=unit_type.id,
             qty=0,
             updated_at=now,
@@ -1,31 +1,45 @@
+from typing import Optional
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from jose import JWTError
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app import models, schemas
-from app.db import get_db
-from app.security import create_access_token, decode_token, hash_password, verify_password
+from app.cache import user_profile_cache
+from app.config import PASSWORD_HASH_RETRY_AFTER_SEC
+from app.db import get_async_db, get_db
+from app.security import (
+    PasswordHasherBusy,
+    create_access_token,
+    decode_token,
+    hash_password_async,
+    verify_password_async,
+)
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
 
-@router.post("/register", response_model=schemas.UserOut, status_code=status.HTTP_201_CREATED)
-def register(payload: schemas.UserCreate, db: Session = Depends(get_db)):
-    existing = db.query(models.User).filter(models.User.email == payload.email).first()
-    if existing:
-        raise HTTPException(status_code=400, detail="Email already registered")
+def find_user_by_email(db: Session, email: str) -> Optional[models.User]:
+    return db.query(models.User).filter(models.User.email == email).first()
 
-    user = models.User(
-        email=payload.email,
-        password_hash=hash_password(payload.password),
-    )
+
+def create_user(db: Session, email: str, password_hash: str) -> models.User:
+    user = models.User(email=email, password_hash=password_hash)
     db.add(user)
-    db.flush()
+    try:
+        db.flush()
+    except IntegrityError:
+        # Another registration took the email while this one was hashing.
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Email already registered")
 
     city = models.City(user_id=user.id)
     barracks = models.UserBuilding(user_id=user.id, building_type="barracks", level=1)
@@ -36,25 +50,63 @@ def register(payload: schemas.UserCreate, db: Session = Depends(get_db)):
     return user
 
 
+def hasher_busy() -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="Authentication is busy, retry shortly",
+        headers={"Retry-After": str(PASSWORD_HASH_RETRY_AFTER_SEC)},
+    )
+
+
+# Both handlers are async so that waiting on the bcrypt pool does not hold a
+# threadpool worker; database calls are pushed to the threadpool explicitly.
+@router.post("/register", response_model=schemas.UserOut, status_code=status.HTTP_201_CREATED)
+async def register(payload: schemas.UserCreate, db: Session = Depends(get_db)):
+    existing = await run_in_threadpool(find_user_by_email, db, payload.email)
+    if existing:
+        raise HTTPException(status_code=400, detail="Email already registered")
+
+    try:
+        password_hash = await hash_password_async(payload.password)
+    except PasswordHasherBusy:
+        raise hasher_busy()
+
+    return await run_in_threadpool(create_user, db, payload.email, password_hash)
+
+
 @router.post("/login", response_model=schemas.Token)
-def login(form: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(models.User).filter(models.User.email == form.username).first()
-    if not user or not verify_password(form.password, user.password_hash):
+async def login(form: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+    user = await run_in_threadpool(find_user_by_email, db, form.username)
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+
+    try:
+        valid = await verify_password_async(form.password, user.password_hash)
+    except PasswordHasherBusy:
+        raise hasher_busy()
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
     token = create_access_token(str(user.id))
     return {"access_token": token, "token_type": "bearer"}
 
 
-def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db),
-):
+async def get_current_user_id(token: str = Depends(oauth2_scheme)) -> UUID:
+    """Trust the signed subject claim without loading the user row.
+
+    Decoding never blocks, so this runs on the event loop; a sync dependency
+    would take a threadpool slot on every async route that uses it.
+    """
     try:
-        user_id = UUID(decode_token(token))
+        return UUID(decode_token(token))
     except (JWTError, ValueError):
         raise HTTPException(status_code=401, detail="Invalid token")
 
+
+def get_current_user(
+    user_id: UUID = Depends(get_current_user_id),
+    db: Session = Depends(get_db),
+):
     user = db.query(models.User).filter(models.User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
@@ -62,6 +114,32 @@ def get_current_user(
     return user
 
 
+async def get_current_user_async(
+    user_id: UUID = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_async_db),
+):
+    user = (
+        await db.execute(select(models.User).where(models.User.id == user_id))
+    ).scalar_one_or_none()
+    if not user:
+        raise HTTPException(status_code=401, detail="User not found")
+
+    return user
+
+
+def get_current_user_profile(
+    user_id: UUID = Depends(get_current_user_id),
+    db: Session = Depends(get_db),
+) -> schemas.UserOut:
+    profile = user_profile_cache.get(user_id)
+    if profile is not None:
+        return profile
+
+    profile = schemas.UserOut.model_validate(get_current_user(user_id, db))
+    user_profile_cache.set(user_id, profile)
+    return profile
+
+
 @router.get("/me", response_model=schemas.UserOut)
-def me(current_user: models.User = Depends(get_current_user)):
+def me(current_user: schemas.UserOut = Depends(get_current_user_profile)):
     return current_user
@@ -1,11 +1,15 @@
 from datetime import datetime, timezone
+from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app import models, schemas
-from app.db import get_db
-from app.routes.auth import get_current_user
+from app.db import get_async_db, get_db
+from app.routes.auth import get_current_user, get_current_user_async
+from app.routes.stats import building_power
 
 router = APIRouter(prefix="/city", tags=["city"])
 
@@ -37,6 +41,20 @@ def get_or_create_city(db: Session, user: models.User) -> models.City:
     return city
 
 
+async def get_or_create_city_async(db: AsyncSession, user: models.User) -> models.City:
+    city = (
+        await db.execute(select(models.City).where(models.City.user_id == user.id).limit(1))
+    ).scalar_one_or_none()
+    if city:
+        return city
+
+    city = models.City(user_id=user.id)
+    db.add(city)
+    await db.commit()
+    await db.refresh(city)
+    return city
+
+
 def aggregate_city_rates(buildings: list[models.Building]) -> tuple[int, int, int]:
     gold_rate = 0
     power_rate = 0
@@ -53,17 +71,28 @@ def aggregate_city_rates(buildings: list[models.Building]) -> tuple[int, int, in
     return gold_rate, power_rate, storage_bonus
 
 
+def adjust_combat_power(db: Session, city_id: UUID, attack_delta: int, defense_delta: int) -> None:
+    """Apply a building change to the cached city power in place."""
+    if not attack_delta and not defense_delta:
+        return
+    db.query(models.City).filter(models.City.id == city_id).update(
+        {
+            models.City.attack_power: models.City.attack_power + attack_delta,
+            models.City.defense_power: models.City.defense_power + defense_delta,
+        },
+        synchronize_session=False,
+    )
+
+
 @router.get("", response_model=schemas.CityOut)
-def get_city(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+async def get_city(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user_async),
 ):
-    city = get_or_create_city(db, current_user)
+    city = await get_or_create_city_async(db, current_user)
     buildings = (
-        db.query(models.Building)
-        .filter(models.Building.city_id == city.id)
-        .all()
-    )
+        await db.execute(select(models.Building).where(models.Building.city_id == city.id))
+    ).scalars().all()
 
     return schemas.CityOut(
         id=city.id,
@@ -175,6 +204,7 @@ def build(
         y=payload.y,
     )
     db.add(building)
+    adjust_combat_power(db, city.id, *building_power(building.type, building.level))
     db.commit()
 
     buildings = (
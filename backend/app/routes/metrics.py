@@ -0,0 +1,55 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+from sqlalchemy.orm import Session
+
+from app import schemas
+from app.cache import rank_top_cache, user_profile_cache
+from app.db import get_db, pool_stats
+from app.prometheus import CONTENT_TYPE, render_metrics
+from app.jobs.idempotency_compaction import idempotency_table_stats
+from app.pvp_limiter import pvp_limiter
+from app.query_metrics import route_query_metrics
+from app.security import password_hasher
+
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+
+@router.get("", response_class=PlainTextResponse)
+def prometheus_metrics():
+    """Prometheus text exposition, summed over every worker."""
+    return PlainTextResponse(render_metrics(), media_type=CONTENT_TYPE)
+
+
+@router.get("/rank-cache", response_model=schemas.CacheStatsOut)
+def rank_cache_stats():
+    return schemas.CacheStatsOut(**rank_top_cache.stats())
+
+
+@router.get("/user-cache", response_model=schemas.CacheStatsOut)
+def user_cache_stats():
+    return schemas.CacheStatsOut(**user_profile_cache.stats())
+
+
+@router.get("/password-hasher", response_model=schemas.PasswordHasherStatsOut)
+def password_hasher_stats():
+    return schemas.PasswordHasherStatsOut(**password_hasher.stats())
+
+
+@router.get("/db-pool", response_model=schemas.DbPoolsOut, response_model_by_alias=True)
+def db_pool_stats():
+    return schemas.DbPoolsOut.model_validate(pool_stats())
+
+
+@router.get("/pvp-limiter", response_model=schemas.PvpLimiterStatsOut)
+def pvp_limiter_stats():
+    return schemas.PvpLimiterStatsOut(**pvp_limiter.stats())
+
+
+@router.get("/idempotency", response_model=schemas.IdempotencyStatsOut)
+def idempotency_stats(db: Session = Depends(get_db)):
+    return schemas.IdempotencyStatsOut(**idempotency_table_stats(db))
+
+
+@router.get("/queries", response_model=list[schemas.RouteQueryStatsOut])
+def route_query_stats():
+    return [schemas.RouteQueryStatsOut(**entry) for entry in route_query_metrics.snapshot()]
@@ -1,146 +1,212 @@
-import random
-from datetime import date, datetime, time, timedelta
+import json
+from datetime import date, datetime, time, timedelta, timezone
 import os
-from typing import Optional
-from uuid import UUID
+from typing import Optional, Tuple, Union
+from uuid import UUID, uuid4
 
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from fastapi.responses import JSONResponse
-from sqlalchemy import func
-from sqlalchemy.exc import IntegrityError
-from sqlalchemy.orm import Session, aliased
+from sqlalchemy import func, insert, select, tuple_, union_all, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
 
 from app import models, schemas
-from app.db import get_db
+from app.cache import invalidate_rank_cache
+from app.db import get_async_db
+from app.prometheus import pvp_attacks_accepted, pvp_attacks_rejected, pvp_cap_hits
+from app.pvp_formulas import (
+    apply_daily_caps,
+    compute_expected_win,
+    compute_prestige_delta,
+    roll_power,
+)
+from app.pvp_limiter import pvp_limiter
 from app.pvp_constants import (
-    BASE_GAIN,
-    BASE_LOSS,
     COOLDOWN_MINUTES,
     DAILY_ATTACK_LIMIT,
-    EXPECTED_WIN_BASE,
-    EXPECTED_WIN_DIVISOR,
-    EXPECTED_WIN_MAX,
-    EXPECTED_WIN_MIN,
     GLOBAL_ATTACK_COOLDOWN_SEC,
     PRESTIGE_GAIN_CAP,
     PRESTIGE_LOSS_CAP,
     PVP_MIN_ARMY_UNITS,
     SERVER_TZ,
 )
-from app.routes.auth import get_current_user
+from app.routes.auth import get_current_user_id
 
 router = APIRouter(prefix="/pvp", tags=["pvp"])
 
-ATTACK_BONUS = {1: 3, 2: 7, 3: 12}
-WALL_BONUS = {1: 4, 2: 9, 3: 15}
-TOWER_BONUS = {1: 2, 2: 5, 3: 9}
-
-
-
-def get_or_create_city(db: Session, user: models.User) -> models.City:
-    city = db.query(models.City).filter(models.City.user_id == user.id).first()
-    if city:
-        return city
-
-    city = models.City(user_id=user.id)
-    db.add(city)
-    db.commit()
-    db.refresh(city)
-    return city
-
-
-def compute_stats(buildings: list[models.Building]) -> tuple[int, int]:
-    attack = 0
-    defense_bonus = 0
-
-    for building in buildings:
-        if building.type == "barracks":
-            attack += ATTACK_BONUS.get(building.level, 0)
-        elif building.type == "wall":
-            defense_bonus += WALL_BONUS.get(building.level, 0)
-        elif building.type == "tower":
-            defense_bonus += TOWER_BONUS.get(building.level, 0)
-
-    defense = attack + defense_bonus
-    return attack, defense
+LOG_DEFAULT_LIMIT = 20
+LOG_MAX_LIMIT = 100
+LOG_CURSOR_HEADER = "X-Next-Cursor"
+LOG_CURSOR_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
 
+# 409/429 details raised on the attack path, as pvp_attacks_rejected_total reasons.
+REJECTION_REASONS = {
+    "Global attack cooldown": "cooldown",
+    "Target on cooldown": "cooldown",
+    "Daily attack limit reached": "daily_limit",
+    "Request in progress": "idempotency_conflict",
+    "Idempotency conflict": "idempotency_conflict",
+}
 
-def clamp(value: float, min_value: float, max_value: float) -> float:
-    return max(min_value, min(max_value, value))
 
+def get_reset_at(now: datetime) -> datetime:
+    next_day = now.date() + timedelta(days=1)
+    return datetime.combine(next_day, time(0, 0, 0), tzinfo=SERVER_TZ)
 
-def compute_expected_win(attacker_prestige: int, defender_prestige: int) -> float:
-    delta = defender_prestige - attacker_prestige
-    expected = EXPECTED_WIN_BASE + (delta / EXPECTED_WIN_DIVISOR)
-    return clamp(expected, EXPECTED_WIN_MIN, EXPECTED_WIN_MAX)
 
+async def load_attack_context(db: AsyncSession, attacker_id: UUID, defender_id: UUID):
+    """Lock the attacker and read every gating input in one statement."""
+    defender = aliased(models.User)
+    defender_prestige = (
+        select(defender.prestige).where(defender.id == defender_id).scalar_subquery()
+    )
+    total_units = (
+        select(func.coalesce(func.sum(models.UserUnit.qty), 0))
+        .where(models.UserUnit.user_id == models.User.id)
+        .scalar_subquery()
+    )
+    attack_power = (
+        select(models.City.attack_power)
+        .where(models.City.user_id == models.User.id)
+        .limit(1)
+        .scalar_subquery()
+    )
+    defense_power = (
+        select(models.City.defense_power)
+        .where(models.City.user_id == defender_id)
+        .limit(1)
+        .scalar_subquery()
+    )
+    target_cooldown = (
+        select(models.PvpAttackCooldown.last_attack_at)
+        .where(
+            models.PvpAttackCooldown.attacker_id == models.User.id,
+            models.PvpAttackCooldown.defender_id == defender_id,
+        )
+        .scalar_subquery()
+    )
+    result = await db.execute(
+        select(
+            models.User.prestige.label("attacker_prestige"),
+            models.User.last_pvp_at,
+            defender_prestige.label("defender_prestige"),
+            total_units.label("total_units"),
+            target_cooldown.label("target_cooldown_at"),
+            func.coalesce(attack_power, 0).label("attack_power"),
+            func.coalesce(defense_power, 0).label("defense_power"),
+        )
+        .where(models.User.id == attacker_id)
+        .with_for_update(of=models.User)
+    )
+    return result.first()
 
-def compute_prestige_delta(expected_win: float, result: str) -> int:
-    if result == "win":
-        return round(BASE_GAIN * (1 + (1 - expected_win)))
-    return -round(BASE_LOSS * (1 + expected_win))
 
+async def claim_attack_slot(db: AsyncSession, attacker_id: UUID, idempotency_key: str, day: date):
+    """Claim the idempotency key and lock today's stats row in one statement.
 
-def get_or_create_daily_stats(
-    db: Session, user_id: UUID, day: date, lock: bool, create: bool
-) -> Optional[models.PvpDailyStats]:
-    query = db.query(models.PvpDailyStats).filter(
-        models.PvpDailyStats.user_id == user_id,
-        models.PvpDailyStats.day == day,
+    claimed is 0 when the key was already used. The stats upsert is a no-op
+    update so an existing row is returned and locked until commit.
+    """
+    claim = (
+        pg_insert(models.PvpIdempotency)
+        .values(attacker_id=attacker_id, idempotency_key=idempotency_key, status="pending")
+        .on_conflict_do_nothing()
+        .returning(models.PvpIdempotency.idempotency_key)
+        .cte("claim")
     )
-    if lock:
-        query = query.with_for_update()
-    stats = query.first()
-    if stats:
-        return stats
-
-    if not create:
-        return None
-
-    stats = models.PvpDailyStats(user_id=user_id, day=day)
-    db.add(stats)
-    db.flush()
-    return stats
+    stats_insert = pg_insert(models.PvpDailyStats).values(user_id=attacker_id, day=day)
+    daily_stats = (
+        stats_insert.on_conflict_do_update(
+            index_elements=[models.PvpDailyStats.user_id, models.PvpDailyStats.day],
+            set_={"attacks_used": models.PvpDailyStats.attacks_used},
+        )
+        .returning(
+            models.PvpDailyStats.attacks_used,
+            models.PvpDailyStats.prestige_gain,
+            models.PvpDailyStats.prestige_loss,
+        )
+        .cte("daily_stats")
+    )
+    result = await db.execute(
+        select(
+            select(func.count()).select_from(claim).scalar_subquery().label("claimed"),
+            daily_stats.c.attacks_used,
+            daily_stats.c.prestige_gain,
+            daily_stats.c.prestige_loss,
+        )
+    )
+    return result.first()
+
+
+def count_rejection(exc: HTTPException) -> None:
+    reason = REJECTION_REASONS.get(exc.detail)
+    if reason:
+        pvp_attacks_rejected.inc(reason)
+
+
+def count_attack(response: Union[dict, JSONResponse], replayed: bool) -> None:
+    """Count a committed resolve_attack outcome, including the caps it used up."""
+    if isinstance(response, JSONResponse):
+        pvp_attacks_rejected.inc("insufficient_army")
+        return
+    if replayed:
+        pvp_attacks_rejected.inc("idempotency_replay")
+        return
+    pvp_attacks_accepted.inc()
+    limits, delta = response["limits"], response["prestige"]["delta"]
+    if limits["attacks_left"] == 0:
+        pvp_cap_hits.inc("attacks")
+    if delta > 0 and limits["prestige_gain_left"] == 0:
+        pvp_cap_hits.inc("gain")
+    if delta < 0 and limits["prestige_loss_left"] == 0:
+        pvp_cap_hits.inc("loss")
+
+
+def check_test_headers(request: Request) -> bool:
+    """Reject X-Test-* headers outside APP_ENV=test; returns whether this is test env."""
+    is_test_env = os.getenv("APP_ENV") == "test"
+    has_test_headers = any(
+        key.lower().startswith("x-test-") for key in request.headers.keys()
+    )
+    if has_test_headers and not is_test_env:
+        raise HTTPException(
+            status_code=400, detail="Test headers are not allowed outside APP_ENV=test"
+        )
+    return is_test_env
 
 
-def get_reset_at(now: datetime) -> datetime:
-    next_day = now.date() + timedelta(days=1)
-    return datetime.combine(next_day, time(0, 0, 0), tzinfo=SERVER_TZ)
+def ignores_cooldowns(request: Request, is_test_env: bool) -> bool:
+    return is_test_env and request.headers.get("X-Test-Ignore-Cooldowns") == "true"
 
 
-@router.post("/attack", response_model=schemas.PvPAttackResponseOut)
-def attack(
-    payload: schemas.AttackRequest,
+async def resolve_attack(
+    db: AsyncSession,
     request: Request,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
-):
-    if payload.defender_id == current_user.id:
-        raise HTTPException(status_code=400, detail="Cannot attack yourself")
-
-    defender = db.query(models.User).filter(models.User.id == payload.defender_id).first()
-    if not defender:
+    attacker_id: UUID,
+    defender_id: UUID,
+    idempotency_key: str,
+    is_test_env: bool,
+    check_global_cooldown: bool = True,
+) -> Tuple[Union[dict, JSONResponse], bool]:
+    """Gate, resolve and write one attack inside the caller's transaction.
+
+    Returns (response, replayed); replayed is True when the key was already
+    completed and nothing was written. Rejections raise HTTPException, except
+    the army gate, which returns its JSONResponse. The caller commits.
+    check_global_cooldown=False skips only the global cooldown, for batch
+    items after an accepted one.
+    """
+    ignore_cooldowns = ignores_cooldowns(request, is_test_env)
+
+    context = await load_attack_context(db, attacker_id, defender_id)
+    if not context:
+        # The token is valid but its user is gone, as get_current_user reported.
+        raise HTTPException(status_code=401, detail="User not found")
+    if context.defender_prestige is None:
         raise HTTPException(status_code=404, detail="Defender not found")
 
-    idempotency_key = request.headers.get("Idempotency-Key")
-    if not idempotency_key:
-        raise HTTPException(status_code=400, detail="Missing Idempotency-Key")
-
-    attacker = (
-        db.query(models.User)
-        .filter(models.User.id == current_user.id)
-        .with_for_update()
-        .first()
-    )
-    if not attacker:
-        raise HTTPException(status_code=404, detail="Attacker not found")
-
-    total_units = (
-        db.query(func.coalesce(func.sum(models.UserUnit.qty), 0))
-        .filter(models.UserUnit.user_id == attacker.id)
-        .scalar()
-    )
-    if total_units < PVP_MIN_ARMY_UNITS:
+    if context.total_units < PVP_MIN_ARMY_UNITS:
         return JSONResponse(
             status_code=403,
             content={
@@ -151,93 +217,56 @@ def attack(
                     ),
                 }
             },
-        )
+        ), False
 
     now = datetime.now(SERVER_TZ)
     today = now.date()
 
-    is_test_env = os.getenv("APP_ENV") == "test"
-    has_test_headers = any(
-        key.lower().startswith("x-test-") for key in request.headers.keys()
-    )
-    if has_test_headers and not is_test_env:
-        raise HTTPException(
-            status_code=400, detail="Test headers are not allowed outside APP_ENV=test"
-        )
-
-    ignore_cooldowns = (
-        is_test_env and request.headers.get("X-Test-Ignore-Cooldowns") == "true"
-    )
-
-    idempotency = models.PvpIdempotency(
-        attacker_id=attacker.id,
-        idempotency_key=idempotency_key,
-        status="pending",
-    )
-    try:
-        db.add(idempotency)
-        db.flush()
-    except IntegrityError:
-        db.rollback()
+    slot = await claim_attack_slot(db, attacker_id, idempotency_key, today)
+    if not slot.claimed:
         existing = (
-            db.query(models.PvpIdempotency)
-            .filter(
-                models.PvpIdempotency.attacker_id == attacker.id,
-                models.PvpIdempotency.idempotency_key == idempotency_key,
+            await db.execute(
+                select(
+                    models.PvpIdempotency.status, models.PvpIdempotency.response_json
+                ).where(
+                    models.PvpIdempotency.attacker_id == attacker_id,
+                    models.PvpIdempotency.idempotency_key == idempotency_key,
+                )
             )
-            .first()
-        )
+        ).first()
         if existing and existing.response_json:
-            return existing.response_json
+            return existing.response_json, True
         if existing and existing.status == "pending":
             raise HTTPException(status_code=409, detail="Request in progress")
         raise HTTPException(status_code=409, detail="Idempotency conflict")
 
     if (
-        not ignore_cooldowns
-        and attacker.last_pvp_at
-        and (now - attacker.last_pvp_at) < timedelta(seconds=GLOBAL_ATTACK_COOLDOWN_SEC)
+        check_global_cooldown
+        and not ignore_cooldowns
+        and context.last_pvp_at
+        and (now - context.last_pvp_at) < timedelta(seconds=GLOBAL_ATTACK_COOLDOWN_SEC)
     ):
         raise HTTPException(status_code=429, detail="Global attack cooldown")
 
-    daily_stats = get_or_create_daily_stats(db, attacker.id, today, lock=True, create=True)
-    if daily_stats.attacks_used >= DAILY_ATTACK_LIMIT:
+    if slot.attacks_used >= DAILY_ATTACK_LIMIT:
         raise HTTPException(status_code=429, detail="Daily attack limit reached")
 
-    cooldown = db.query(models.PvpAttackCooldown).filter(
-        models.PvpAttackCooldown.attacker_id == attacker.id,
-        models.PvpAttackCooldown.defender_id == defender.id,
-    ).first()
     if (
         not ignore_cooldowns
-        and cooldown
-        and now - cooldown.last_attack_at < timedelta(minutes=COOLDOWN_MINUTES)
+        and context.target_cooldown_at
+        and now - context.target_cooldown_at < timedelta(minutes=COOLDOWN_MINUTES)
     ):
         raise HTTPException(status_code=429, detail="Target on cooldown")
 
-    attacker_city = get_or_create_city(db, attacker)
-    defender_city = get_or_create_city(db, defender)
-
-    attacker_buildings = (
-        db.query(models.Building)
-        .filter(models.Building.city_id == attacker_city.id)
-        .all()
-    )
-    defender_buildings = (
-        db.query(models.Building)
-        .filter(models.Building.city_id == defender_city.id)
-        .all()
-    )
+    attack_power = context.attack_power
+    defense_power = context.defense_power
 
-    attack_power, _ = compute_stats(attacker_buildings)
-    _, defense_power = compute_stats(defender_buildings)
-
-    attack_effective = attack_power * random.uniform(0.9, 1.1)
-    defense_effective = defense_power * random.uniform(0.9, 1.1)
+    attack_effective = roll_power(attack_power)
+    defense_effective = roll_power(defense_power)
 
     result = "win" if attack_effective >= defense_effective else "loss"
 
-    expected_win = compute_expected_win(attacker.prestige, defender.prestige)
+    expected_win = compute_expected_win(context.attacker_prestige, context.defender_prestige)
     raw_delta = compute_prestige_delta(expected_win, result)
 
     if is_test_env:
@@ -253,58 +282,20 @@ def attack(
         elif forced_result in {"win", "loss"}:
             raw_delta = compute_prestige_delta(expected_win, result)
 
-    remaining_gain = max(0, PRESTIGE_GAIN_CAP - daily_stats.prestige_gain)
-    remaining_loss = max(0, PRESTIGE_LOSS_CAP - daily_stats.prestige_loss)
-
-    if raw_delta > 0:
-        attacker_delta = min(raw_delta, remaining_gain)
-    elif raw_delta < 0:
-        attacker_delta = -min(abs(raw_delta), remaining_loss)
-    else:
-        attacker_delta = 0
+    attacker_delta = apply_daily_caps(raw_delta, slot.prestige_gain, slot.prestige_loss)
 
     defender_delta = 0
 
-    attacker.prestige += attacker_delta
-    attacker.last_pvp_at = now
+    prestige_before = context.attacker_prestige
+    prestige_after = prestige_before + attacker_delta
 
-    log = models.AttackLog(
-        attacker_id=attacker.id,
-        defender_id=defender.id,
-        result=result,
-        prestige_delta_attacker=attacker_delta,
-        prestige_delta_defender=defender_delta,
-        attacker_prestige_before=attacker.prestige - attacker_delta,
-        defender_prestige_before=defender.prestige,
-        expected_win=expected_win,
-        attacker_attack_power=attack_power,
-        defender_defense_power=defense_power,
-    )
-    db.add(log)
-    db.flush()
-
-    daily_stats.attacks_used += 1
-    if attacker_delta > 0:
-        daily_stats.prestige_gain += attacker_delta
-    elif attacker_delta < 0:
-        daily_stats.prestige_loss += abs(attacker_delta)
-
-    daily_stats.updated_at = now
-
-    if cooldown:
-        cooldown.last_attack_at = now
-    else:
-        db.add(
-            models.PvpAttackCooldown(
-                attacker_id=attacker.id,
-                defender_id=defender.id,
-                last_attack_at=now,
-            )
-        )
+    attacks_used = slot.attacks_used + 1
+    prestige_gain = slot.prestige_gain + max(attacker_delta, 0)
+    prestige_loss = slot.prestige_loss + max(-attacker_delta, 0)
 
-    attacks_left = max(0, DAILY_ATTACK_LIMIT - daily_stats.attacks_used)
-    gain_left = max(0, PRESTIGE_GAIN_CAP - daily_stats.prestige_gain)
-    loss_left = max(0, PRESTIGE_LOSS_CAP - daily_stats.prestige_loss)
+    attacks_left = max(0, DAILY_ATTACK_LIMIT - attacks_used)
+    gain_left = max(0, PRESTIGE_GAIN_CAP - prestige_gain)
+    loss_left = max(0, PRESTIGE_LOSS_CAP - prestige_loss)
 
     message_codes = []
     if attacks_left <= 2:
@@ -318,24 +309,25 @@ def attack(
     if loss_left == 0:
         message_codes.append("LOSS_CAP_REACHED")
 
+    battle_id = uuid4()
     response_payload = schemas.PvPAttackResponseOut(
-        battle_id=log.id,
-        attacker_id=attacker.id,
-        defender_id=defender.id,
+        battle_id=battle_id,
+        attacker_id=attacker_id,
+        defender_id=defender_id,
         result=result,
         expected_win=expected_win,
         prestige=schemas.PvPPrestigeOut(
             delta=attacker_delta,
-            attacker_before=attacker.prestige - attacker_delta,
-            attacker_after=attacker.prestige,
+            attacker_before=prestige_before,
+            attacker_after=prestige_after,
         ),
         limits=schemas.PvpLimitsOut(
             reset_at=get_reset_at(now),
-            attacks_used=daily_stats.attacks_used,
+            attacks_used=attacks_used,
             attacks_left=attacks_left,
-            prestige_gain_today=daily_stats.prestige_gain,
+            prestige_gain_today=prestige_gain,
             prestige_gain_left=gain_left,
-            prestige_loss_today=daily_stats.prestige_loss,
+            prestige_loss_today=prestige_loss,
             prestige_loss_left=loss_left,
         ),
         cooldowns=schemas.PvPCooldownsOut(
@@ -345,23 +337,240 @@ def attack(
         messages=message_codes,
     ).model_dump(mode="json")
 
-    idempotency.status = "completed"
-    idempotency.response_json = response_payload
-    idempotency.updated_at = now
+    # Every write of the attack goes out as a single statement of data-modifying
+    # CTEs; Postgres applies all of them or none.
+    cooldown_upsert = pg_insert(models.PvpAttackCooldown).values(
+        attacker_id=attacker_id, defender_id=defender_id, last_attack_at=now
+    )
+    write = (
+        update(models.PvpIdempotency)
+        .where(
+            models.PvpIdempotency.attacker_id == attacker_id,
+            models.PvpIdempotency.idempotency_key == idempotency_key,
+        )
+        .values(status="completed", response_json=response_payload, updated_at=now)
+        .add_cte(
+            update(models.User)
+            .where(models.User.id == attacker_id)
+            .values(prestige=prestige_after, last_pvp_at=now)
+            .cte("attacker_update")
+        )
+        .add_cte(
+            insert(models.AttackLog)
+            .values(
+                id=battle_id,
+                attacker_id=attacker_id,
+                defender_id=defender_id,
+                result=result,
+                prestige_delta_attacker=attacker_delta,
+                prestige_delta_defender=defender_delta,
+                attacker_prestige_before=prestige_before,
+                defender_prestige_before=context.defender_prestige,
+                expected_win=expected_win,
+                attacker_attack_power=attack_power,
+                defender_defense_power=defense_power,
+                created_at=now,
+            )
+            .cte("log_insert")
+        )
+        .add_cte(
+            update(models.PvpDailyStats)
+            .where(
+                models.PvpDailyStats.user_id == attacker_id,
+                models.PvpDailyStats.day == today,
+            )
+            .values(
+                attacks_used=attacks_used,
+                prestige_gain=prestige_gain,
+                prestige_loss=prestige_loss,
+                updated_at=now,
+            )
+            .cte("daily_stats_update")
+        )
+        .add_cte(
+            cooldown_upsert.on_conflict_do_update(
+                index_elements=[
+                    models.PvpAttackCooldown.attacker_id,
+                    models.PvpAttackCooldown.defender_id,
+                ],
+                set_={"last_attack_at": cooldown_upsert.excluded.last_attack_at},
+            ).cte("cooldown_upsert")
+        )
+    )
+    await db.execute(write)
+    return response_payload, False
+
+
+async def limiter_rejection(
+    db: AsyncSession,
+    attacker_id: UUID,
+    defender_id: UUID,
+    idempotency_key: str,
+    ignore_cooldowns: bool,
+) -> Optional[str]:
+    """The limiter's 429 detail, unless pvp_idempotency already has the key."""
+
+    async def key_known() -> bool:
+        status = await db.scalar(
+            select(models.PvpIdempotency.status).where(
+                models.PvpIdempotency.attacker_id == attacker_id,
+                models.PvpIdempotency.idempotency_key == idempotency_key,
+            )
+        )
+        return status is not None
+
+    return await pvp_limiter.check(
+        attacker_id,
+        defender_id,
+        idempotency_key,
+        datetime.now(SERVER_TZ),
+        ignore_cooldowns,
+        key_known=key_known,
+    )
+
+
+@router.post("/attack", response_model=schemas.PvPAttackResponseOut)
+async def attack(
+    payload: schemas.AttackRequest,
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    current_user_id: UUID = Depends(get_current_user_id),
+):
+    if payload.defender_id == current_user_id:
+        raise HTTPException(status_code=400, detail="Cannot attack yourself")
+
+    idempotency_key = request.headers.get("Idempotency-Key")
+    if not idempotency_key:
+        # An unknown defender has always been a 404 before the missing key;
+        # the lookup only runs on this error path.
+        defender = await db.scalar(
+            select(models.User.id).where(models.User.id == payload.defender_id)
+        )
+        if defender is None:
+            raise HTTPException(status_code=404, detail="Defender not found")
+        raise HTTPException(status_code=400, detail="Missing Idempotency-Key")
 
-    db.commit()
+    is_test_env = check_test_headers(request)
 
-    return response_payload
+    try:
+        # Cheap rejection of spammed attacks before the transaction starts.
+        rejected = await limiter_rejection(
+            db,
+            current_user_id,
+            payload.defender_id,
+            idempotency_key,
+            ignores_cooldowns(request, is_test_env),
+        )
+        if rejected:
+            raise HTTPException(status_code=429, detail=rejected)
+
+        response, replayed = await resolve_attack(
+            db, request, current_user_id, payload.defender_id, idempotency_key, is_test_env
+        )
+    except HTTPException as exc:
+        count_rejection(exc)
+        raise
+    if replayed:
+        await db.rollback()
+        count_attack(response, replayed)
+        return response
+    await db.commit()
+    count_attack(response, replayed)
+    if not isinstance(response, JSONResponse):
+        invalidate_rank_cache()
+        await pvp_limiter.record(current_user_id, idempotency_key, response)
+    return response
+
+
+@router.post("/attack/batch", response_model=schemas.PvPAttackBatchResponseOut)
+async def attack_batch(
+    payload: schemas.AttackBatchRequest,
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    current_user_id: UUID = Depends(get_current_user_id),
+):
+    """Resolve queued attacks in order, in one transaction.
+
+    The attacker row is locked by the first item and stays locked until the
+    commit; each item re-reads its gating inputs, so target cooldowns and caps
+    see the earlier items. The global cooldown is checked until one item is
+    accepted, since it spaces out requests, not the attacks queued in one.
+    Each item runs in a savepoint, so a rejected item leaves no trace and does
+    not stop the rest of the batch.
+    """
+    is_test_env = check_test_headers(request)
+
+    ignore_cooldowns = ignores_cooldowns(request, is_test_env)
+
+    results = []
+    accepted = []
+    outcomes = []
+    for item in payload.attacks:
+        status_code, body, error = 200, None, None
+        try:
+            if item.defender_id == current_user_id:
+                raise HTTPException(status_code=400, detail="Cannot attack yourself")
+            rejected = await limiter_rejection(
+                db, current_user_id, item.defender_id, item.idempotency_key, ignore_cooldowns
+            )
+            if rejected:
+                raise HTTPException(status_code=429, detail=rejected)
+            async with db.begin_nested():
+                response, replayed = await resolve_attack(
+                    db,
+                    request,
+                    current_user_id,
+                    item.defender_id,
+                    item.idempotency_key,
+                    is_test_env,
+                    check_global_cooldown=not accepted,
+                )
+        except HTTPException as exc:
+            status_code, error = exc.status_code, {"detail": exc.detail}
+            count_rejection(exc)
+        else:
+            outcomes.append((response, replayed))
+            if isinstance(response, JSONResponse):
+                status_code, error = response.status_code, json.loads(response.body)
+            else:
+                body = response
+                if not replayed:
+                    accepted.append((item.idempotency_key, response))
+        results.append(
+            schemas.PvPAttackBatchItemOut(
+                defender_id=item.defender_id,
+                idempotency_key=item.idempotency_key,
+                status_code=status_code,
+                response=body,
+                error=error,
+            )
+        )
+
+    await db.commit()
+    for response, replayed in outcomes:
+        count_attack(response, replayed)
+    if accepted:
+        invalidate_rank_cache()
+    for idempotency_key, response in accepted:
+        await pvp_limiter.record(current_user_id, idempotency_key, response)
+    return schemas.PvPAttackBatchResponseOut(results=results)
 
 
 @router.get("/limits", response_model=schemas.PvPLimitsResponseOut)
-def limits(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+async def limits(
+    db: AsyncSession = Depends(get_async_db),
+    current_user_id: UUID = Depends(get_current_user_id),
 ):
     now = datetime.now(SERVER_TZ)
     today = now.date()
-    stats = get_or_create_daily_stats(db, current_user.id, today, lock=False, create=False)
+    stats = (
+        await db.execute(
+            select(models.PvpDailyStats).where(
+                models.PvpDailyStats.user_id == current_user_id,
+                models.PvpDailyStats.day == today,
+            )
+        )
+    ).scalar_one_or_none()
 
     attacks_used = stats.attacks_used if stats else 0
     prestige_gain = stats.prestige_gain if stats else 0
@@ -380,39 +589,92 @@ def limits(
     return schemas.PvPLimitsResponseOut(limits=limits_out)
 
 
+def encode_log_cursor(entry: models.AttackLog) -> str:
+    """Opaque "<created_at in epoch microseconds>:<id>" cursor; URL-safe as is."""
+    return f"{(entry.created_at - LOG_CURSOR_EPOCH) // timedelta(microseconds=1)}:{entry.id}"
+
+
+def decode_log_cursor(cursor: str) -> tuple[datetime, UUID]:
+    try:
+        micros, log_id = cursor.split(":", 1)
+        return LOG_CURSOR_EPOCH + timedelta(microseconds=int(micros)), UUID(log_id)
+    except (ValueError, OverflowError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def log_side(side_column, user_id: UUID, before: Optional[tuple[datetime, UUID]], limit: int):
+    """One branch of the log: newest rows where side_column is the user.
+
+    Each branch is served by its (side_id, created_at) index. The plain
+    created_at bound lets the index scan start at the cursor; the tuple
+    comparison only breaks ties on the same timestamp.
+    """
+    query = select(models.AttackLog).where(side_column == user_id)
+    if before is not None:
+        before_at, before_id = before
+        query = query.where(
+            models.AttackLog.created_at <= before_at,
+            tuple_(models.AttackLog.created_at, models.AttackLog.id) < tuple_(before_at, before_id),
+        )
+    return (
+        query.order_by(models.AttackLog.created_at.desc(), models.AttackLog.id.desc())
+        .limit(limit)
+        .subquery()
+    )
+
+
 @router.get("/log", response_model=list[schemas.AttackLogEntry])
-def log(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+async def log(
+    response: Response,
+    before: Optional[str] = None,
+    limit: int = Query(LOG_DEFAULT_LIMIT, ge=1, le=LOG_MAX_LIMIT),
+    db: AsyncSession = Depends(get_async_db),
+    current_user_id: UUID = Depends(get_current_user_id),
 ):
-    attacker_alias = aliased(models.User)
-    defender_alias = aliased(models.User)
+    """Newest entries first. While more remain, the X-Next-Cursor header holds
+    the value to pass as before for the next page."""
+    cursor = decode_log_cursor(before) if before else None
+    attacker_side = log_side(models.AttackLog.attacker_id, current_user_id, cursor, limit + 1)
+    defender_side = log_side(models.AttackLog.defender_id, current_user_id, cursor, limit + 1)
+    merged = union_all(select(attacker_side), select(defender_side)).subquery()
+    entry = aliased(models.AttackLog, merged)
     logs = (
-        db.query(models.AttackLog, attacker_alias, defender_alias)
-        .join(attacker_alias, models.AttackLog.attacker_id == attacker_alias.id)
-        .join(defender_alias, models.AttackLog.defender_id == defender_alias.id)
-        .filter(
-            (models.AttackLog.attacker_id == current_user.id)
-            | (models.AttackLog.defender_id == current_user.id)
+        await db.execute(
+            select(entry).order_by(entry.created_at.desc(), entry.id.desc()).limit(limit + 1)
         )
-        .order_by(models.AttackLog.created_at.desc())
-        .limit(20)
-        .all()
+    ).scalars().all()
+
+    has_more = len(logs) > limit
+    logs = logs[:limit]
+    if not logs:
+        return []
+    if has_more:
+        response.headers[LOG_CURSOR_HEADER] = encode_log_cursor(logs[-1])
+
+    participant_ids = {log_entry.attacker_id for log_entry in logs} | {
+        log_entry.defender_id for log_entry in logs
+    }
+    emails = dict(
+        (
+            await db.execute(
+                select(models.User.id, models.User.email).where(
+                    models.User.id.in_(participant_ids)
+                )
+            )
+        ).all()
     )
 
-    results = []
-    for log_entry, attacker, defender in logs:
-        results.append(
-            schemas.AttackLogEntry(
-                id=log_entry.id,
-                attacker_id=attacker.id,
-                attacker_email=attacker.email,
-                defender_id=defender.id,
-                defender_email=defender.email,
-                result=log_entry.result,
-                prestige_delta_attacker=log_entry.prestige_delta_attacker,
-                prestige_delta_defender=log_entry.prestige_delta_defender,
-                created_at=log_entry.created_at,
-            )
+    return [
+        schemas.AttackLogEntry(
+            id=log_entry.id,
+            attacker_id=log_entry.attacker_id,
+            attacker_email=emails[log_entry.attacker_id],
+            defender_id=log_entry.defender_id,
+            defender_email=emails[log_entry.defender_id],
+            result=log_entry.result,
+            prestige_delta_attacker=log_entry.prestige_delta_attacker,
+            prestige_delta_defender=log_entry.prestige_delta_defender,
+            created_at=log_entry.created_at,
         )
-    return results
+        for log_entry in logs
+    ]
@@ -1,70 +1,206 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from typing import Optional
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app import models, schemas
-from app.db import get_db
-from app.routes.auth import get_current_user
+from app.cache import rank_top_cache
+from app.db import get_async_db
+from app.routes.auth import get_current_user_async
 
 router = APIRouter(prefix="/rank", tags=["rank"])
 
+NEAR_WINDOW = 3
+TOP_LIMIT = 10
+PAGE_DEFAULT_LIMIT = 50
+PAGE_MAX_LIMIT = 200
+
 
-def get_or_create_city(db: Session, user: models.User) -> models.City:
-    city = db.query(models.City).filter(models.City.user_id == user.id).first()
+async def get_or_create_city(db: AsyncSession, user: models.User) -> models.City:
+    city = (
+        await db.execute(select(models.City).where(models.City.user_id == user.id).limit(1))
+    ).scalar_one_or_none()
     if city:
         return city
 
     city = models.City(user_id=user.id)
     db.add(city)
-    db.commit()
-    db.refresh(city)
+    await db.commit()
+    await db.refresh(city)
     return city
 
 
-def fetch_ranked(db: Session) -> list[models.User]:
-    return db.query(models.User).order_by(models.User.prestige.desc()).all()
+def ranked_above(prestige: int, user_id: UUID):
+    """Users placed before (prestige, user_id) on the ladder.
+
+    The ladder is ordered by prestige desc with the user id as tie-breaker,
+    matching the ix_users_ladder index.
+    """
+    return or_(
+        models.User.prestige > prestige,
+        and_(models.User.prestige == prestige, models.User.id < user_id),
+    )
+
+
+def ranked_below(prestige: int, user_id: UUID):
+    return or_(
+        models.User.prestige < prestige,
+        and_(models.User.prestige == prestige, models.User.id > user_id),
+    )
+
+
+async def compute_rank(db: AsyncSession, prestige: int, user_id: UUID) -> int:
+    higher = (
+        await db.execute(
+            select(func.count(models.User.id)).where(ranked_above(prestige, user_id))
+        )
+    ).scalar_one()
+    return higher + 1
+
+
+def encode_cursor(user: models.User) -> str:
+    return f"{user.prestige}:{user.id}"
+
+
+def decode_cursor(cursor: str) -> tuple[int, UUID]:
+    try:
+        prestige, user_id = cursor.split(":", 1)
+        return int(prestige), UUID(user_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def to_entries(users: list[models.User], first_rank: int) -> list[schemas.RankEntry]:
+    return [
+        schemas.RankEntry(
+            rank=idx,
+            user_id=user.id,
+            email=user.email,
+            prestige=user.prestige,
+        )
+        for idx, user in enumerate(users, start=first_rank)
+    ]
+
+
+def snapshot_entries(rows: list[models.LeaderboardSnapshot]) -> list[schemas.RankEntry]:
+    return [
+        schemas.RankEntry(
+            rank=row.rank,
+            user_id=row.user_id,
+            email=row.email,
+            prestige=row.prestige,
+            snapshot_at=row.snapshot_at,
+        )
+        for row in rows
+    ]
+
+
+async def fetch_top(db: AsyncSession) -> list[schemas.RankEntry]:
+    snapshot = (
+        await db.execute(
+            select(models.LeaderboardSnapshot)
+            .order_by(models.LeaderboardSnapshot.rank)
+            .limit(TOP_LIMIT)
+        )
+    ).scalars().all()
+    if snapshot:
+        return snapshot_entries(snapshot)
+
+    ranked = (
+        await db.execute(
+            select(models.User)
+            .order_by(models.User.prestige.desc(), models.User.id.asc())
+            .limit(TOP_LIMIT)
+        )
+    ).scalars().all()
+    return to_entries(ranked, first_rank=1)
 
 
 @router.get("/top", response_model=list[schemas.RankEntry])
-def top_rank(db: Session = Depends(get_db)):
-    ranked = fetch_ranked(db)[:10]
-    results = []
-    for idx, user in enumerate(ranked, start=1):
-        results.append(
-            schemas.RankEntry(
-                rank=idx,
-                user_id=user.id,
-                email=user.email,
-                prestige=user.prestige,
-            )
+async def top_rank(db: AsyncSession = Depends(get_async_db)):
+    cached = rank_top_cache.get("top")
+    if cached is not None:
+        return cached
+
+    entries = await fetch_top(db)
+    rank_top_cache.set("top", entries)
+    return entries
+
+
+@router.get("/page", response_model=schemas.RankPageOut)
+async def rank_page(
+    cursor: Optional[str] = None,
+    limit: int = Query(PAGE_DEFAULT_LIMIT, ge=1, le=PAGE_MAX_LIMIT),
+    db: AsyncSession = Depends(get_async_db),
+):
+    query = select(models.User)
+    if cursor:
+        query = query.where(ranked_below(*decode_cursor(cursor)))
+    users = (
+        await db.execute(
+            query.order_by(models.User.prestige.desc(), models.User.id.asc()).limit(limit + 1)
         )
-    return results
+    ).scalars().all()
+
+    has_more = len(users) > limit
+    users = users[:limit]
+    if not users:
+        return schemas.RankPageOut(entries=[])
+
+    first_rank = await compute_rank(db, users[0].prestige, users[0].id)
+    return schemas.RankPageOut(
+        entries=to_entries(users, first_rank),
+        next_cursor=encode_cursor(users[-1]) if has_more else None,
+    )
 
 
 @router.get("/near", response_model=list[schemas.RankEntry])
-def near_rank(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+async def near_rank(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user_async),
 ):
-    get_or_create_city(db, current_user)
-    ranked = fetch_ranked(db)
-
-    user_index = 0
-    for idx, user in enumerate(ranked):
-        if user.id == current_user.id:
-            user_index = idx
-            break
-
-    start = max(user_index - 3, 0)
-    end = min(user_index + 4, len(ranked))
-
-    results = []
-    for idx, user in enumerate(ranked[start:end], start=start + 1):
-        results.append(
-            schemas.RankEntry(
-                rank=idx,
-                user_id=user.id,
-                email=user.email,
-                prestige=user.prestige,
+    await get_or_create_city(db, current_user)
+
+    # Users registered after the last refresh are not in the snapshot yet and
+    # fall through to the live ladder below.
+    snapshot_rank = (
+        select(models.LeaderboardSnapshot.rank)
+        .where(models.LeaderboardSnapshot.user_id == current_user.id)
+        .scalar_subquery()
+    )
+    snapshot = (
+        await db.execute(
+            select(models.LeaderboardSnapshot)
+            .where(
+                models.LeaderboardSnapshot.rank.between(
+                    snapshot_rank - NEAR_WINDOW, snapshot_rank + NEAR_WINDOW
+                )
             )
+            .order_by(models.LeaderboardSnapshot.rank)
+        )
+    ).scalars().all()
+    if snapshot:
+        return snapshot_entries(snapshot)
+
+    user_rank = await compute_rank(db, current_user.prestige, current_user.id)
+
+    above = (
+        await db.execute(
+            select(models.User)
+            .where(ranked_above(current_user.prestige, current_user.id))
+            .order_by(models.User.prestige.asc(), models.User.id.desc())
+            .limit(NEAR_WINDOW)
+        )
+    ).scalars().all()
+    below = (
+        await db.execute(
+            select(models.User)
+            .where(ranked_below(current_user.prestige, current_user.id))
+            .order_by(models.User.prestige.desc(), models.User.id.asc())
+            .limit(NEAR_WINDOW)
         )
-    return results
+    ).scalars().all()
+    window = list(reversed(above)) + [current_user] + below
+    return to_entries(window, first_rank=user_rank - len(above))
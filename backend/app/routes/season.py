@@ -6,6 +6,8 @@ from sqlalchemy.orm import Session
 
 from app import models, schemas
 from app.db import get_db
+from app.jobs.leaderboard_snapshot import refresh_leaderboard_snapshot
+from app.pvp_constants import SEASON_BASE_PRESTIGE, SEASON_LENGTH_DAYS
 from app.routes.auth import get_current_user
 
 router = APIRouter(prefix="/season", tags=["season"])
@@ -24,7 +26,7 @@ def start_season(
     season = models.Season(
         number=next_number,
         starts_at=now,
-        ends_at=now + timedelta(days=14),
+        ends_at=now + timedelta(days=SEASON_LENGTH_DAYS),
         is_active=True,
     )
 
@@ -32,8 +34,9 @@ def start_season(
         {models.Season.is_active: False}
     )
     db.add(season)
-    db.query(models.User).update({models.User.prestige: 1000})
+    db.query(models.User).update({models.User.prestige: SEASON_BASE_PRESTIGE})
     db.commit()
+    refresh_leaderboard_snapshot(db)
     db.refresh(season)
 
     return season
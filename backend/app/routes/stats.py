@@ -1,9 +1,12 @@
-from fastapi import APIRouter, Depends
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from app import models, schemas
 from app.db import get_db
-from app.routes.auth import get_current_user
+from app.routes.auth import get_current_user_id
 
 router = APIRouter(prefix="/stats", tags=["stats"])
 
@@ -12,45 +15,59 @@ WALL_BONUS = {1: 4, 2: 9, 3: 15}
 TOWER_BONUS = {1: 2, 2: 5, 3: 9}
 
 
-def get_or_create_city(db: Session, user: models.User) -> models.City:
-    city = db.query(models.City).filter(models.City.user_id == user.id).first()
+def get_or_create_city(db: Session, user_id: UUID) -> models.City:
+    city = db.query(models.City).filter(models.City.user_id == user_id).first()
     if city:
         return city
 
-    city = models.City(user_id=user.id)
+    city = models.City(user_id=user_id)
     db.add(city)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        # Stateless auth lets a token outlive its user; cities.user_id then
+        # fails its foreign key. A concurrent first request is the other cause.
+        db.rollback()
+        city = db.query(models.City).filter(models.City.user_id == user_id).first()
+        if not city:
+            raise HTTPException(status_code=401, detail="User not found")
+        return city
     db.refresh(city)
     return city
 
 
+def building_power(building_type: str, level: int) -> tuple[int, int]:
+    """Attack and defense one building contributes to its city.
+
+    Barracks count towards both, since defense is attack plus wall and tower
+    bonuses.
+    """
+    if building_type == "barracks":
+        attack = ATTACK_BONUS.get(level, 0)
+        return attack, attack
+    if building_type == "wall":
+        return 0, WALL_BONUS.get(level, 0)
+    if building_type == "tower":
+        return 0, TOWER_BONUS.get(level, 0)
+    return 0, 0
+
+
 def compute_stats(buildings: list[models.Building]) -> tuple[int, int]:
     attack = 0
-    defense_bonus = 0
+    defense = 0
 
     for building in buildings:
-        if building.type == "barracks":
-            attack += ATTACK_BONUS.get(building.level, 0)
-        elif building.type == "wall":
-            defense_bonus += WALL_BONUS.get(building.level, 0)
-        elif building.type == "tower":
-            defense_bonus += TOWER_BONUS.get(building.level, 0)
-
-    defense = attack + defense_bonus
+        building_attack, building_defense = building_power(building.type, building.level)
+        attack += building_attack
+        defense += building_defense
+
     return attack, defense
 
 
 @router.get("", response_model=schemas.StatsOut)
 def get_stats(
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    current_user_id: UUID = Depends(get_current_user_id),
 ):
-    city = get_or_create_city(db, current_user)
-    buildings = (
-        db.query(models.Building)
-        .filter(models.Building.city_id == city.id)
-        .all()
-    )
-
-    attack, defense = compute_stats(buildings)
-    return schemas.StatsOut(attack_power=attack, defense_power=defense)
+    city = get_or_create_city(db, current_user_id)
+    return schemas.StatsOut(attack_power=city.attack_power, defense_power=city.defense_power)
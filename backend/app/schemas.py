@@ -5,6 +5,8 @@ from uuid import UUID
 
 from pydantic import BaseModel, ConfigDict, EmailStr, Field
 
+from app.pvp_constants import DAILY_ATTACK_LIMIT
+
 
 class UserCreate(BaseModel):
     email: EmailStr
@@ -122,6 +124,27 @@ class PvPAttackResponseOut(BaseModel):
     messages: list[MessageCode]
 
 
+class AttackBatchItem(BaseModel):
+    defender_id: UUID
+    idempotency_key: str = Field(min_length=1, max_length=64)
+
+
+class AttackBatchRequest(BaseModel):
+    attacks: list[AttackBatchItem] = Field(min_length=1, max_length=DAILY_ATTACK_LIMIT)
+
+
+class PvPAttackBatchItemOut(BaseModel):
+    defender_id: UUID
+    idempotency_key: str
+    status_code: int
+    response: Optional[PvPAttackResponseOut] = None
+    error: Optional[dict] = None
+
+
+class PvPAttackBatchResponseOut(BaseModel):
+    results: list[PvPAttackBatchItemOut]
+
+
 class ArmyUnitOut(BaseModel):
     code: str
     qty: int = Field(ge=0)
@@ -166,6 +189,12 @@ class RankEntry(BaseModel):
     user_id: UUID
     email: EmailStr
     prestige: int
+    snapshot_at: Optional[datetime] = None
+
+
+class RankPageOut(BaseModel):
+    entries: list[RankEntry]
+    next_cursor: Optional[str] = None
 
 
 class AttackLogEntry(BaseModel):
@@ -187,3 +216,69 @@ class SeasonOut(BaseModel):
     ends_at: datetime
     is_active: bool
     model_config = ConfigDict(from_attributes=True)
+
+
+class CacheStatsOut(BaseModel):
+    hits: int
+    misses: int
+    size: int
+    maxsize: int
+    ttl_seconds: float
+
+
+class PasswordHasherStatsOut(BaseModel):
+    workers: int
+    max_pending: int
+    in_flight: int
+    queued: int
+    completed: int
+    failed: int
+    rejected: int
+    restarts: int
+
+
+class PvpLimiterStatsOut(BaseModel):
+    backend: str
+    checks: int
+    rejected: int
+    replays: int
+    errors: int
+    size: Optional[int] = None
+
+
+class IdempotencyStatsOut(BaseModel):
+    rows_estimate: int
+    table_bytes: int
+    index_bytes: int
+    total_bytes: int
+    oldest_created_at: Optional[datetime] = None
+    retention_hours: float
+
+
+class DbPoolStatsOut(BaseModel):
+    pool_class: str
+    size: Optional[int] = None
+    checked_out: Optional[int] = None
+    overflow: Optional[int] = None
+    checkouts: int
+    wait_seconds_total: float
+    wait_seconds_max: float
+    timeouts: int
+
+
+class RouteQueryStatsOut(BaseModel):
+    method: str
+    route: str
+    requests: int
+    statements_total: int
+    statements_max: int
+    db_seconds_total: float
+    db_seconds_max: float
+    slowest_statement_seconds: float
+    slowest_statement: Optional[str] = None
+
+
+class DbPoolsOut(BaseModel):
+    sync: DbPoolStatsOut
+    async_: DbPoolStatsOut = Field(alias="async")
+    model_config = ConfigDict(populate_by_name=True)
@@ -0,0 +1,64 @@
+"""Compare the scalar decay formula with the NumPy kernel.
+
+Run from backend/:  python -m benchmarks.decay_kernel --users 1000000
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from app.decay import calculate_inactive_days, compute_decay, decay_kernel, local_pvp_days
+from app.pvp_constants import SERVER_TZ
+
+
+def make_population(users: int, seed: int):
+    rng = np.random.default_rng(seed)
+    now = datetime.now(SERVER_TZ)
+    prestige = rng.integers(800, 4000, size=users)
+    ages = rng.integers(0, 30 * 24 * 3600, size=users).tolist()
+    never = rng.random(size=users) < 0.1
+    last_pvp_at = [
+        None if skip else now - timedelta(seconds=age) for skip, age in zip(never.tolist(), ages)
+    ]
+    return now, prestige, last_pvp_at
+
+
+def run_scalar(now: datetime, prestige: np.ndarray, last_pvp_at: list) -> list:
+    return [
+        compute_decay(p, calculate_inactive_days(now, seen))[0]
+        for p, seen in zip(prestige.tolist(), last_pvp_at)
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=200_000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    now, prestige, last_pvp_at = make_population(args.users, args.seed)
+
+    started = time.perf_counter()
+    scalar = run_scalar(now, prestige, last_pvp_at)
+    scalar_sec = time.perf_counter() - started
+
+    started = time.perf_counter()
+    last_pvp_day = local_pvp_days(last_pvp_at)
+    convert_sec = time.perf_counter() - started
+
+    started = time.perf_counter()
+    batch = decay_kernel(prestige, last_pvp_day, now.date())
+    kernel_sec = time.perf_counter() - started
+
+    assert batch.decay.tolist() == scalar, "kernel and scalar decay disagree"
+
+    print(f"users:            {args.users}")
+    print(f"scalar:           {scalar_sec * 1000:9.1f} ms")
+    print(f"kernel:           {kernel_sec * 1000:9.1f} ms")
+    print(f"datetime -> day:  {convert_sec * 1000:9.1f} ms (input conversion, not in kernel)")
+    print(f"speedup (kernel): {scalar_sec / max(kernel_sec, 1e-9):9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
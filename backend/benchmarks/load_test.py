@@ -0,0 +1,376 @@
+"""Drive the real API routes concurrently and record latency percentiles.
+
+Run from backend/ against a running server (uvicorn app.main:app ...):
+
+    python -m benchmarks.load_test seed --scale 10 --seed 7
+    python -m benchmarks.load_test run --concurrency 32 --duration 20
+    python -m benchmarks.load_test compare old.json new.json
+    python -m benchmarks.load_test drop
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import random
+import subprocess
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+from uuid import UUID, uuid4
+
+import httpx
+import numpy as np
+from sqlalchemy import text
+
+from app.db import SessionLocal
+from app.security import create_access_token
+from benchmarks.population import (
+    DEFAULT_TAG,
+    PopulationSize,
+    check_tag,
+    drop_population,
+    email_regex,
+    population_counts,
+    seed_population,
+)
+
+PERCENTILES = (50, 90, 99)
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+class Player(NamedTuple):
+    user_id: UUID
+    headers: Dict[str, str]
+
+
+class Call(NamedTuple):
+    method: str
+    path: str
+    headers: Dict[str, str]
+    json: Optional[dict] = None
+
+
+class Scenario:
+    """Hands out requests for one endpoint, spread over the population."""
+
+    def __init__(self, players: List[Player], seed: int) -> None:
+        self.players = players
+        self.rng = random.Random(seed)
+        # Round-robin attackers keep per-user cooldowns and daily caps from
+        # turning the run into a 429 benchmark.
+        self.turns = itertools.cycle(range(len(players)))
+
+    def player(self) -> Player:
+        return self.players[next(self.turns)]
+
+    def defender(self, attacker: Player) -> Player:
+        while True:
+            defender = self.rng.choice(self.players)
+            if defender.user_id != attacker.user_id:
+                return defender
+
+
+def get_call(path: str) -> Callable[[Scenario], Call]:
+    return lambda scenario: Call("GET", path, scenario.player().headers)
+
+
+def attack_call(scenario: Scenario) -> Call:
+    attacker = scenario.player()
+    return Call(
+        "POST",
+        "/pvp/attack",
+        {**attacker.headers, "Idempotency-Key": str(uuid4())},
+        {"defender_id": str(scenario.defender(attacker).user_id)},
+    )
+
+
+ENDPOINTS: Dict[str, Callable[[Scenario], Call]] = {
+    "pvp_attack": attack_call,
+    "pvp_limits": get_call("/pvp/limits"),
+    "pvp_log": get_call("/pvp/log"),
+    "rank_top": get_call("/rank/top"),
+    "rank_near": get_call("/rank/near"),
+    "rank_page": get_call("/rank/page"),
+    "city": get_call("/city"),
+    "army": get_call("/army"),
+    "stats": get_call("/stats"),
+}
+
+
+def load_players(tag: str, limit: int, seed: int) -> List[Player]:
+    """Sample benchmark users and sign tokens for them directly, skipping bcrypt."""
+    db = SessionLocal()
+    try:
+        db.execute(text("SELECT setseed(:seed)"), {"seed": (seed % 1000) / 1000})
+        ids = db.execute(
+            text("SELECT id FROM users WHERE email ~ :pattern ORDER BY random() LIMIT :limit"),
+            {"pattern": email_regex(tag), "limit": limit},
+        ).scalars().all()
+    finally:
+        db.close()
+    return [
+        Player(user_id, {"Authorization": f"Bearer {create_access_token(str(user_id))}"})
+        for user_id in ids
+    ]
+
+
+async def drive(
+    client: httpx.AsyncClient,
+    make_call: Callable[[Scenario], Call],
+    scenario: Scenario,
+    concurrency: int,
+    duration: float,
+    max_requests: Optional[int],
+) -> Tuple[List[float], Dict[str, int], float]:
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    issued = itertools.count()
+    deadline = time.perf_counter() + duration
+
+    async def worker() -> None:
+        while time.perf_counter() < deadline:
+            if max_requests is not None and next(issued) >= max_requests:
+                return
+            call = make_call(scenario)
+            started = time.perf_counter()
+            try:
+                response = await client.request(
+                    call.method, call.path, headers=call.headers, json=call.json
+                )
+                status = str(response.status_code)
+            except httpx.HTTPError as exc:
+                status = type(exc).__name__
+            latencies.append(time.perf_counter() - started)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, statuses, time.perf_counter() - started
+
+
+def summarize_endpoint(latencies: List[float], statuses: Dict[str, int], elapsed: float) -> dict:
+    samples = np.array(latencies) * 1000
+    errors = sum(count for status, count in statuses.items() if not status.startswith("2"))
+    summary = {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "statuses": dict(sorted(statuses.items())),
+    }
+    if samples.size:
+        percentiles = np.percentile(samples, PERCENTILES)
+        summary["latency_ms"] = {
+            **{f"p{p}": round(float(v), 3) for p, v in zip(PERCENTILES, percentiles)},
+            "mean": round(float(samples.mean()), 3),
+            "max": round(float(samples.max()), 3),
+        }
+    return summary
+
+
+async def run_load(
+    base_url: str,
+    endpoints: List[str],
+    players: List[Player],
+    concurrency: int,
+    duration: float,
+    max_requests: Optional[int],
+    seed: int,
+) -> Dict[str, dict]:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    results = {}
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30.0) as client:
+        (await client.get("/health")).raise_for_status()
+        for name in endpoints:
+            latencies, statuses, elapsed = await drive(
+                client,
+                ENDPOINTS[name],
+                Scenario(players, seed),
+                concurrency,
+                duration,
+                max_requests,
+            )
+            results[name] = summarize_endpoint(latencies, statuses, elapsed)
+            print(format_line(name, results[name]))
+    return results
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=os.path.dirname(__file__),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def format_line(name: str, result: dict) -> str:
+    latency = result.get("latency_ms", {})
+    return (
+        f"{name:<12}{result['requests']:>8}{result['throughput_rps']:>10.1f}"
+        f"{latency.get('p50', 0):>10.2f}{latency.get('p90', 0):>10.2f}"
+        f"{latency.get('p99', 0):>10.2f}{result['errors']:>8}"
+    )
+
+
+def compare(old: dict, new: dict) -> str:
+    lines = [
+        f"{old['meta'].get('commit')} -> {new['meta'].get('commit')}",
+        "endpoint      rps_old   rps_new   p50_old   p50_new   p99_old   p99_new",
+    ]
+    for name in new["endpoints"]:
+        if name not in old["endpoints"]:
+            continue
+        before, after = old["endpoints"][name], new["endpoints"][name]
+        row = [before["throughput_rps"], after["throughput_rps"]]
+        for p in ("p50", "p99"):
+            row += [before.get("latency_ms", {}).get(p, 0), after.get("latency_ms", {}).get(p, 0)]
+        lines.append(f"{name:<12}" + "".join(f"{value:>10.2f}" for value in row))
+    return "\n".join(lines)
+
+
+def run_command(args: argparse.Namespace) -> None:
+    endpoints = args.endpoints.split(",") if args.endpoints else list(ENDPOINTS)
+    unknown = [name for name in endpoints if name not in ENDPOINTS]
+    if unknown:
+        raise SystemExit(f"Unknown endpoints: {', '.join(unknown)}")
+
+    players = load_players(args.tag, args.players, args.seed)
+    if len(players) < 2:
+        raise SystemExit(f"No '{args.tag}' population found; run the seed command first.")
+
+    db = SessionLocal()
+    try:
+        population = population_counts(db, args.tag)
+    finally:
+        db.close()
+
+    print(f"{'endpoint':<12}{'requests':>8}{'rps':>10}{'p50_ms':>10}{'p90_ms':>10}{'p99_ms':>10}{'errors':>8}")
+    results = asyncio.run(
+        run_load(
+            args.base_url,
+            endpoints,
+            players,
+            args.concurrency,
+            args.duration,
+            args.requests,
+            args.seed,
+        )
+    )
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "base_url": args.base_url,
+            "concurrency": args.concurrency,
+            "duration_sec": args.duration,
+            "max_requests": args.requests,
+            "players": len(players),
+            "population": population,
+            "python": platform.python_version(),
+        },
+        "endpoints": results,
+    }
+    output = args.output or os.path.join(
+        RESULTS_DIR,
+        f"load-{report['meta']['commit'] or 'unknown'}-{int(time.time())}.json",
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as handle:
+        json.dump(report, handle, indent=2)
+    print(f"Saved {output}")
+
+
+def tag_argument(value: str) -> str:
+    try:
+        return check_tag(value)
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(str(exc))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    defaults = PopulationSize()
+    seed = commands.add_parser("seed", help="Insert a benchmark population.")
+    seed.add_argument(
+        "--scale", type=float, default=1.0, help="Multiplies --users and --attack-logs."
+    )
+    seed.add_argument("--users", type=int, default=defaults.users)
+    seed.add_argument("--buildings-per-city", type=int, default=defaults.buildings_per_city)
+    seed.add_argument("--attack-logs", type=int, default=defaults.attack_logs)
+    seed.add_argument("--log-days", type=int, default=defaults.log_days)
+    seed.add_argument(
+        "--anchor",
+        type=datetime.fromisoformat,
+        default=None,
+        help="ISO timestamp the seeded history ends at (default: now); fixes rows with --seed.",
+    )
+
+    run = commands.add_parser("run", help="Load the API and save a JSON report.")
+    run.add_argument("--base-url", default="http://127.0.0.1:8000")
+    run.add_argument(
+        "--endpoints", default=None, help=f"Comma-separated subset of: {', '.join(ENDPOINTS)}."
+    )
+    run.add_argument("--concurrency", type=int, default=16)
+    run.add_argument("--duration", type=float, default=10.0, help="Seconds per endpoint.")
+    run.add_argument("--requests", type=int, default=None, help="Stop an endpoint after N requests.")
+    run.add_argument("--players", type=int, default=5000, help="Users sampled for tokens.")
+    run.add_argument("--output", default=None, help="Report path (default: benchmarks/results/).")
+
+    drop = commands.add_parser("drop", help="Delete the benchmark population.")
+
+    compare_parser = commands.add_parser("compare", help="Compare two saved reports.")
+    compare_parser.add_argument("old")
+    compare_parser.add_argument("new")
+
+    for command in (seed, run, drop):
+        command.add_argument(
+            "--tag",
+            type=tag_argument,
+            default=DEFAULT_TAG,
+            help="Email prefix of the population (lowercase letters and digits).",
+        )
+    for command in (seed, run):
+        command.add_argument("--seed", type=int, default=42)
+
+    args = parser.parse_args()
+    if args.command == "compare":
+        with open(args.old) as old, open(args.new) as new:
+            print(compare(json.load(old), json.load(new)))
+        return
+
+    if args.command == "run":
+        run_command(args)
+        return
+
+    db = SessionLocal()
+    try:
+        if args.command == "seed":
+            size = PopulationSize(
+                users=args.users,
+                buildings_per_city=args.buildings_per_city,
+                attack_logs=args.attack_logs,
+                log_days=args.log_days,
+            ).scaled(args.scale)
+            anchor = args.anchor
+            if anchor is not None and anchor.tzinfo is None:
+                anchor = anchor.replace(tzinfo=timezone.utc)
+            started = time.perf_counter()
+            counts = seed_population(db, size, args.tag, args.seed, anchor)
+            print(f"Seeded {counts} in {time.perf_counter() - started:.1f}s")
+        else:
+            print(f"Dropped {drop_population(db, args.tag)} users.")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
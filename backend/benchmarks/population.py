@@ -0,0 +1,376 @@
+"""Seed and drop a synthetic benchmark population.
+
+Rows are generated with NumPy in chunks and streamed into Postgres with
+COPY FROM STDIN instead of going through /auth/register (bcrypt per user) or
+the ORM; most of the remaining time is Postgres maintaining indexes and
+foreign keys. Every chunk draws from its own generator seeded with
+(seed, tag, table, chunk), so the same seed, tag and anchor produce the same
+rows. Every benchmark user shares one password hash and an email of the form
+<tag>_<n>@example.com, which is how the population is found again. Tags are
+lowercase letters and digits only, so no tag's emails match another tag.
+"""
+import io
+import re
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.config import ATTACK_LOG_PARTITIONS_AHEAD
+from app.jobs.attack_log_partitions import ensure_partitions, month_start
+from app.pvp_constants import SEASON_BASE_PRESTIGE
+from app.pvp_formulas import (
+    expected_win_kernel,
+    prestige_delta_kernel,
+    roll_power_kernel,
+)
+from app.routes.city import ALLOWED_BUILDINGS
+from app.routes.stats import building_power
+from app.security import hash_password
+
+DEFAULT_TAG = "bench"
+TAG_PATTERN = re.compile(r"^[a-z0-9]+$")
+BENCH_PASSWORD = "BenchPass123!"
+GRID_SIZE = 12
+BUILDING_TYPES = tuple(sorted(ALLOWED_BUILDINGS))
+BUILDING_LEVELS = (1, 2, 3)
+# Fixed so that chunk boundaries, and therefore the rows, depend only on the seed.
+CHUNK_ROWS = 50_000
+NULL = "\\N"
+
+# Stream ids for the per-chunk generators.
+USERS, ATTACK_LOGS = 1, 2
+
+
+class PopulationSize(NamedTuple):
+    users: int = 10_000
+    buildings_per_city: int = 8
+    attack_logs: int = 100_000
+    log_days: int = 14
+
+    def scaled(self, scale: float) -> "PopulationSize":
+        """Scale row counts linearly; scale 1 is the default population."""
+        return self._replace(
+            users=max(2, round(self.users * scale)),
+            attack_logs=round(self.attack_logs * scale),
+        )
+
+
+def check_tag(tag: str) -> str:
+    if not TAG_PATTERN.match(tag):
+        raise ValueError(f"Invalid tag {tag!r}: use lowercase letters and digits only")
+    return tag
+
+
+def email_regex(tag: str) -> str:
+    """Postgres regex matching exactly the emails of one population."""
+    return f"^{check_tag(tag)}_[0-9]+@example\\.com$"
+
+
+def chunk_rng(seed: int, tag: str, stream: int, chunk: int) -> np.random.Generator:
+    # The tag is part of the seed so populations under other tags get other ids.
+    return np.random.default_rng([seed, zlib.crc32(tag.encode()), stream, chunk])
+
+
+def random_uuids(rng: np.random.Generator, count: int) -> List[str]:
+    """Version 4 UUID strings drawn from rng."""
+    raw = np.frombuffer(rng.bytes(16 * count), dtype=np.uint8).reshape(count, 16).copy()
+    raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40
+    raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80
+    out = []
+    for row in raw:
+        h = row.tobytes().hex()
+        out.append(f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}")
+    return out
+
+
+def timestamps(anchor: datetime, seconds_before: np.ndarray) -> np.ndarray:
+    """anchor minus seconds_before, as timestamptz literals in UTC."""
+    base = np.datetime64(anchor.astimezone(timezone.utc).replace(tzinfo=None), "us")
+    values = base - (seconds_before * 1_000_000).astype("timedelta64[us]")
+    return np.char.add(np.datetime_as_string(values, unit="us"), "+00")
+
+
+def power_tables() -> tuple[np.ndarray, np.ndarray]:
+    """Attack and defense per (type index, level), taken from building_power."""
+    attack = np.zeros((len(BUILDING_TYPES), max(BUILDING_LEVELS) + 1), dtype=np.int64)
+    defense = np.zeros_like(attack)
+    for type_index, building_type in enumerate(BUILDING_TYPES):
+        for level in BUILDING_LEVELS:
+            attack[type_index, level], defense[type_index, level] = building_power(
+                building_type, level
+            )
+    return attack, defense
+
+
+def copy_rows(db: Session, table: str, columns: Sequence[str], rows: Iterable[str]) -> None:
+    """Stream tab-separated rows into table with COPY FROM STDIN."""
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write(row)
+        buffer.write("\n")
+    buffer.seek(0)
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", buffer)
+    finally:
+        cursor.close()
+
+
+def load_unit_type_ids(db: Session) -> List[int]:
+    return db.execute(text("SELECT id FROM unit_types ORDER BY id")).scalars().all()
+
+
+class SeededUsers(NamedTuple):
+    ids: List[str]
+    prestige: np.ndarray
+    attack_power: np.ndarray
+    defense_power: np.ndarray
+
+
+def seed_users(
+    db: Session,
+    size: PopulationSize,
+    tag: str,
+    seed: int,
+    anchor: datetime,
+    unit_type_ids: List[int],
+) -> SeededUsers:
+    """COPY users with their cities, grid buildings, barracks and units."""
+    password_hash = hash_password(BENCH_PASSWORD)
+    attack_table, defense_table = power_tables()
+    per_city = min(size.buildings_per_city, GRID_SIZE * GRID_SIZE)
+    log_seconds = size.log_days * 86400
+    ids: List[str] = []
+    prestige_parts, attack_parts, defense_parts = [], [], []
+
+    for chunk, start in enumerate(range(0, size.users, CHUNK_ROWS)):
+        count = min(CHUNK_ROWS, size.users - start)
+        rng = chunk_rng(seed, tag, USERS, chunk)
+        user_ids = random_uuids(rng, count)
+        city_ids = random_uuids(rng, count)
+        barracks_ids = random_uuids(rng, count)
+        building_ids = random_uuids(rng, count * per_city)
+
+        prestige = rng.integers(SEASON_BASE_PRESTIGE - 200, SEASON_BASE_PRESTIGE + 2200, count)
+        seen = rng.random(count) < 0.8
+        last_pvp_at = timestamps(anchor, rng.uniform(0, log_seconds, count))
+        created_at = timestamps(anchor, rng.uniform(log_seconds, 4 * log_seconds, count))
+        gold = rng.integers(0, 5000, count)
+
+        types = rng.integers(0, len(BUILDING_TYPES), (count, per_city))
+        levels = rng.integers(1, max(BUILDING_LEVELS) + 1, (count, per_city))
+        # The cached city power /city/build would have accumulated.
+        attack_power = attack_table[types, levels].sum(axis=1)
+        defense_power = defense_table[types, levels].sum(axis=1)
+        units = rng.integers(10, 60, (count, len(unit_type_ids)))
+
+        # Plain Python values format several times faster than NumPy scalars.
+        prestige_list, gold_list = prestige.tolist(), gold.tolist()
+        attack_list, defense_list = attack_power.tolist(), defense_power.tolist()
+        seen_list, units_list = seen.tolist(), units.tolist()
+        last_pvp_list, created_list = last_pvp_at.tolist(), created_at.tolist()
+        types_list, levels_list = types.tolist(), levels.tolist()
+
+        copy_rows(
+            db,
+            "users",
+            ("id", "email", "password_hash", "prestige", "last_pvp_at", "created_at"),
+            (
+                f"{user_ids[i]}\t{tag}_{start + i + 1}@example.com\t{password_hash}\t"
+                f"{prestige_list[i]}\t{last_pvp_list[i] if seen_list[i] else NULL}\t"
+                f"{created_list[i]}"
+                for i in range(count)
+            ),
+        )
+        copy_rows(
+            db,
+            "cities",
+            (
+                "id", "user_id", "grid_size", "gold", "prestige",
+                "attack_power", "defense_power", "last_collected_at",
+            ),
+            (
+                f"{city_ids[i]}\t{user_ids[i]}\t{GRID_SIZE}\t{gold_list[i]}\t"
+                f"{prestige_list[i]}\t{attack_list[i]}\t{defense_list[i]}\t{last_pvp_list[i]}"
+                for i in range(count)
+            ),
+        )
+        copy_rows(
+            db,
+            "buildings",
+            ("id", "city_id", "type", "level", "x", "y", "placed_at"),
+            (
+                f"{building_ids[i * per_city + slot]}\t{city_ids[i]}\t"
+                f"{BUILDING_TYPES[types_list[i][slot]]}\t{levels_list[i][slot]}\t"
+                f"{slot % GRID_SIZE}\t{slot // GRID_SIZE}\t{created_list[i]}"
+                for i in range(count)
+                for slot in range(per_city)
+            ),
+        )
+        copy_rows(
+            db,
+            "user_buildings",
+            ("id", "user_id", "building_type", "level", "created_at"),
+            (
+                f"{barracks_ids[i]}\t{user_ids[i]}\tbarracks\t1\t{created_list[i]}"
+                for i in range(count)
+            ),
+        )
+        copy_rows(
+            db,
+            "user_units",
+            ("user_id", "unit_type_id", "qty"),
+            (
+                f"{user_ids[i]}\t{unit_type_id}\t{units_list[i][column]}"
+                for i in range(count)
+                for column, unit_type_id in enumerate(unit_type_ids)
+            ),
+        )
+        db.commit()
+
+        ids.extend(user_ids)
+        prestige_parts.append(prestige)
+        attack_parts.append(attack_power)
+        defense_parts.append(defense_power)
+
+    return SeededUsers(
+        ids=ids,
+        prestige=np.concatenate(prestige_parts),
+        attack_power=np.concatenate(attack_parts),
+        defense_power=np.concatenate(defense_parts),
+    )
+
+
+def seed_attack_logs(
+    db: Session,
+    size: PopulationSize,
+    users: SeededUsers,
+    tag: str,
+    seed: int,
+    anchor: datetime,
+) -> None:
+    """COPY fights resolved with the live PvP formulas over the seeded users."""
+    today = anchor.date()
+    first_month = month_start(today - timedelta(days=size.log_days))
+    months = (today.year - first_month.year) * 12 + today.month - first_month.month
+    # Past months need partitions too, or the rows land in attack_logs_default.
+    ensure_partitions(db, first_month, months + ATTACK_LOG_PARTITIONS_AHEAD)
+
+    population = len(users.ids)
+    prestige = users.prestige.tolist()
+    attack_power, defense_power = users.attack_power.tolist(), users.defense_power.tolist()
+    for chunk, start in enumerate(range(0, size.attack_logs, CHUNK_ROWS)):
+        count = min(CHUNK_ROWS, size.attack_logs - start)
+        rng = chunk_rng(seed, tag, ATTACK_LOGS, chunk)
+        log_ids = random_uuids(rng, count)
+        attackers = rng.integers(0, population, count)
+        defenders = rng.integers(0, population - 1, count)
+        defenders += defenders >= attackers
+
+        won = roll_power_kernel(users.attack_power[attackers], rng) >= roll_power_kernel(
+            users.defense_power[defenders], rng
+        )
+        expected_win = expected_win_kernel(users.prestige[attackers], users.prestige[defenders])
+        delta = prestige_delta_kernel(expected_win, won)
+        created_at = timestamps(anchor, rng.uniform(0, size.log_days * 86400, count))
+
+        rows = zip(
+            log_ids,
+            attackers.tolist(),
+            defenders.tolist(),
+            won.tolist(),
+            delta.tolist(),
+            expected_win.tolist(),
+            created_at.tolist(),
+        )
+        copy_rows(
+            db,
+            "attack_logs",
+            (
+                "id", "attacker_id", "defender_id", "result",
+                "prestige_delta_attacker", "prestige_delta_defender",
+                "attacker_prestige_before", "defender_prestige_before", "expected_win",
+                "attacker_attack_power", "defender_defense_power", "created_at",
+            ),
+            (
+                f"{log_id}\t{users.ids[a]}\t{users.ids[d]}\t{'win' if win else 'loss'}\t"
+                f"{log_delta}\t0\t{prestige[a]}\t{prestige[d]}\t{expected!r}\t"
+                f"{attack_power[a]}\t{defense_power[d]}\t{at}"
+                for log_id, a, d, win, log_delta, expected, at in rows
+            ),
+        )
+        db.commit()
+
+
+def seed_population(
+    db: Session,
+    size: PopulationSize,
+    tag: str = DEFAULT_TAG,
+    seed: int = 42,
+    anchor: Optional[datetime] = None,
+) -> dict:
+    """Insert users with cities, buildings, barracks, units and attack logs.
+
+    Timestamps are placed relative to anchor (default: now); pass the same
+    seed, tag and anchor to reproduce a population row for row.
+    """
+    check_tag(tag)
+    anchor = anchor or datetime.now(timezone.utc)
+    users = seed_users(db, size, tag, seed, anchor, load_unit_type_ids(db))
+    if size.attack_logs:
+        seed_attack_logs(db, size, users, tag, seed, anchor)
+
+    for table in ("users", "cities", "buildings", "user_buildings", "user_units", "attack_logs"):
+        db.execute(text(f"ANALYZE {table}"))
+    db.commit()
+    return population_counts(db, tag)
+
+
+def population_counts(db: Session, tag: str = DEFAULT_TAG) -> dict:
+    row = db.execute(
+        text(
+            """
+            WITH pop AS (SELECT id FROM users WHERE email ~ :pattern)
+            SELECT
+                (SELECT count(*) FROM pop) AS users,
+                (SELECT count(*) FROM cities WHERE user_id IN (SELECT id FROM pop)) AS cities,
+                (SELECT count(*) FROM buildings b JOIN cities c ON c.id = b.city_id
+                  WHERE c.user_id IN (SELECT id FROM pop)) AS buildings,
+                (SELECT count(*) FROM user_units WHERE user_id IN (SELECT id FROM pop))
+                    AS user_units,
+                (SELECT count(*) FROM attack_logs WHERE attacker_id IN (SELECT id FROM pop))
+                    AS attack_logs
+            """
+        ),
+        {"pattern": email_regex(tag)},
+    ).one()
+    return row._asdict()
+
+
+def drop_population(db: Session, tag: str = DEFAULT_TAG) -> int:
+    """Delete the population and every row that references it."""
+    params = {"pattern": email_regex(tag)}
+    pop = "SELECT id FROM users WHERE email ~ :pattern"
+    statements = [
+        f"DELETE FROM attack_logs WHERE attacker_id IN ({pop}) OR defender_id IN ({pop})",
+        f"DELETE FROM pvp_idempotency WHERE attacker_id IN ({pop})",
+        f"DELETE FROM pvp_attack_cooldowns WHERE attacker_id IN ({pop}) OR defender_id IN ({pop})",
+        f"DELETE FROM pvp_daily_stats WHERE user_id IN ({pop})",
+        f"DELETE FROM prestige_decay_log WHERE user_id IN ({pop})",
+        f"DELETE FROM leaderboard_snapshot WHERE user_id IN ({pop})",
+        f"DELETE FROM training_jobs WHERE user_id IN ({pop})",
+        f"DELETE FROM user_units WHERE user_id IN ({pop})",
+        f"DELETE FROM user_buildings WHERE user_id IN ({pop})",
+        "DELETE FROM buildings WHERE city_id IN "
+        f"(SELECT id FROM cities WHERE user_id IN ({pop}))",
+        f"DELETE FROM cities WHERE user_id IN ({pop})",
+    ]
+    for statement in statements:
+        db.execute(text(statement), params)
+    deleted = db.execute(text("DELETE FROM users WHERE email ~ :pattern"), params).rowcount
+    db.commit()
+    return deleted
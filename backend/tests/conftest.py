@@ -1,6 +1,33 @@
+import os
+import re
+
 import pytest
 
+# TestClient runs every request on its own event loop.
+os.environ.setdefault("ASYNC_DB_POOL", "null")
+
 
 @pytest.fixture
 def anyio_backend():
     return "asyncio"
+
+
+@pytest.fixture
+def query_budget():
+    """Fails a test when a response ran more statements than its budget.
+
+    Reads the count QueryMetricsMiddleware puts in the Server-Timing header.
+    """
+
+    def check(response, max_statements: int) -> int:
+        header = response.headers.get("server-timing", "")
+        match = re.search(r'db;dur=[\d.]+;desc="(\d+) queries"', header)
+        assert match, f"no db entry in Server-Timing: {header!r}"
+        statements = int(match.group(1))
+        request = f"{response.request.method} {response.request.url.path}"
+        assert statements <= max_statements, (
+            f"{request} ran {statements} statements, budget is {max_statements} ({header})"
+        )
+        return statements
+
+    return check
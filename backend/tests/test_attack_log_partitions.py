@@ -0,0 +1,87 @@
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy import text
+
+from app import models
+from app.db import SessionLocal
+from app.jobs.attack_log_partitions import ensure_partitions, list_partitions, prune_partitions
+
+
+def test_partitions_are_created_ahead_and_archived_after_retention() -> None:
+    db = SessionLocal()
+    seasons = [
+        models.Season(
+            number=10_000_000 + offset,
+            starts_at=datetime(1995 + 5 * offset, 1, 1, tzinfo=timezone.utc),
+            ends_at=datetime(1995 + 5 * offset, 1, 1, tzinfo=timezone.utc) + timedelta(days=14),
+            is_active=False,
+        )
+        for offset in range(2)
+    ]
+    try:
+        created = ensure_partitions(db, date(1990, 1, 15), months_ahead=1)
+        assert created == ["attack_logs_p1990_01", "attack_logs_p1990_02"]
+        assert ensure_partitions(db, date(1990, 1, 15), months_ahead=1) == []
+        assert {date(1990, 1, 1), date(1990, 2, 1)} <= set(list_partitions(db))
+
+        db.add_all(seasons)
+        db.commit()
+
+        # Both 1990 months end before the older of the two newest seasons (1995).
+        pruned = prune_partitions(db, retain_seasons=2)
+        assert pruned == ["attack_logs_archive_1990_01", "attack_logs_archive_1990_02"]
+        assert not {date(1990, 1, 1), date(1990, 2, 1)} & set(list_partitions(db))
+        assert prune_partitions(db, retain_seasons=3) == []
+    finally:
+        db.rollback()
+        for season in seasons:
+            db.query(models.Season).filter(models.Season.number == season.number).delete()
+        for name in (
+            "attack_logs_p1990_01",
+            "attack_logs_p1990_02",
+            "attack_logs_archive_1990_01",
+            "attack_logs_archive_1990_02",
+        ):
+            db.execute(text(f"DROP TABLE IF EXISTS {name}"))
+        db.commit()
+        db.close()
+
+
+def test_multi_month_partition_is_respected_and_archived_by_its_bounds() -> None:
+    db = SessionLocal()
+    season = models.Season(
+        number=10_000_100,
+        starts_at=datetime(1987, 1, 1, tzinfo=timezone.utc),
+        ends_at=datetime(1987, 1, 15, tzinfo=timezone.utc),
+        is_active=False,
+    )
+    try:
+        # Stands in for attack_logs_legacy: one partition holding many months.
+        db.execute(
+            text(
+                "CREATE TABLE attack_logs_history PARTITION OF attack_logs "
+                "FOR VALUES FROM ('1985-01-01 00:00:00+00') TO ('1986-01-01 00:00:00+00')"
+            )
+        )
+        db.commit()
+        assert ensure_partitions(db, date(1985, 11, 20), months_ahead=2) == [
+            "attack_logs_p1986_01"
+        ]
+
+        db.add(season)
+        db.commit()
+        # Only partitions ending by the 1987 cutoff go, whatever their names.
+        pruned = prune_partitions(db, retain_seasons=1)
+        assert {"attack_logs_archive_history", "attack_logs_archive_1986_01"} <= set(pruned)
+    finally:
+        db.rollback()
+        db.query(models.Season).filter(models.Season.number == season.number).delete()
+        for name in (
+            "attack_logs_history",
+            "attack_logs_archive_history",
+            "attack_logs_p1986_01",
+            "attack_logs_archive_1986_01",
+        ):
+            db.execute(text(f"DROP TABLE IF EXISTS {name}"))
+        db.commit()
+        db.close()
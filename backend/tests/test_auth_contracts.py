@@ -0,0 +1,145 @@
+import inspect
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import models
+from app.db import SessionLocal
+from app.main import app
+from app.routes.auth import get_current_user_id
+from app.security import PasswordHasher, create_access_token, hash_password, password_hasher
+
+
+def register_user(client: TestClient, email: str, password: str) -> str:
+    response = client.post("/auth/register", json={"email": email, "password": password})
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+def login_user(client: TestClient, email: str, password: str) -> str:
+    response = client.post(
+        "/auth/login",
+        data={"username": email, "password": password},
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+    )
+    assert response.status_code == 200
+    return response.json()["access_token"]
+
+
+def cleanup_user(user_id: str) -> None:
+    db = SessionLocal()
+    try:
+        db.query(models.UserBuilding).filter(models.UserBuilding.user_id == user_id).delete()
+        db.query(models.City).filter(models.City.user_id == user_id).delete()
+        db.query(models.User).filter(models.User.id == user_id).delete()
+        db.commit()
+    finally:
+        db.close()
+
+
+def test_me_is_served_from_profile_cache() -> None:
+    client = TestClient(app)
+    suffix = uuid.uuid4().hex[:8]
+    email = f"me_{suffix}@example.com"
+    password = "TestPass123!"
+
+    user_id = register_user(client, email, password)
+    token = login_user(client, email, password)
+    headers = {"Authorization": f"Bearer {token}"}
+
+    try:
+        before = client.get("/metrics/user-cache").json()
+        first = client.get("/auth/me", headers=headers)
+        second = client.get("/auth/me", headers=headers)
+        after = client.get("/metrics/user-cache").json()
+
+        assert first.status_code == 200, first.text
+        assert first.json() == second.json()
+        assert first.json()["id"] == user_id
+        assert after["misses"] - before["misses"] == 1
+        assert after["hits"] - before["hits"] == 1
+    finally:
+        cleanup_user(user_id)
+
+
+def test_stateless_endpoints_reject_invalid_token() -> None:
+    client = TestClient(app)
+    headers = {"Authorization": "Bearer not-a-token"}
+
+    for path in ("/pvp/limits", "/stats", "/pvp/log", "/army"):
+        response = client.get(path, headers=headers)
+        assert response.status_code == 401, path
+
+
+def test_register_race_on_same_email_returns_400(monkeypatch) -> None:
+    client = TestClient(app)
+    email = f"register_race_{uuid.uuid4().hex[:8]}@example.com"
+    user_id = register_user(client, email, "TestPass123!")
+    # The second request passed its email check before the first one committed.
+    monkeypatch.setattr("app.routes.auth.find_user_by_email", lambda db, email: None)
+
+    try:
+        response = client.post("/auth/register", json={"email": email, "password": "Other123!"})
+        assert response.status_code == 400, response.text
+        assert response.json()["detail"] == "Email already registered"
+    finally:
+        cleanup_user(user_id)
+
+
+def test_token_dependency_runs_on_the_event_loop() -> None:
+    # FastAPI sends sync dependencies to the threadpool, even for async routes.
+    assert inspect.iscoroutinefunction(get_current_user_id)
+
+
+def test_stats_rejects_token_of_unknown_user() -> None:
+    client = TestClient(app)
+    headers = {"Authorization": f"Bearer {create_access_token(str(uuid.uuid4()))}"}
+
+    response = client.get("/stats", headers=headers)
+    assert response.status_code == 401, response.text
+    assert response.json()["detail"] == "User not found"
+
+
+def test_login_returns_503_when_hasher_queue_is_full() -> None:
+    client = TestClient(app)
+    suffix = uuid.uuid4().hex[:8]
+    email = f"busy_{suffix}@example.com"
+    password = "TestPass123!"
+
+    user_id = register_user(client, email, password)
+    max_pending = password_hasher.max_pending
+    password_hasher.max_pending = 0
+    try:
+        response = client.post(
+            "/auth/login",
+            data={"username": email, "password": password},
+            headers={"Content-Type": "application/x-www-form-urlencoded"},
+        )
+        assert response.status_code == 503
+        assert response.headers["Retry-After"]
+
+        stats = client.get("/metrics/password-hasher").json()
+        assert stats["rejected"] >= 1
+    finally:
+        password_hasher.max_pending = max_pending
+        cleanup_user(user_id)
+
+
+@pytest.mark.anyio
+async def test_password_hasher_replaces_a_broken_pool() -> None:
+    hasher = PasswordHasher(workers=1, max_pending=4)
+    try:
+        assert await hasher.run(hash_password, "TestPass123!")
+        for process in list(hasher._executor._processes.values()):
+            process.kill()
+            process.join()
+
+        assert await hasher.run(hash_password, "TestPass123!")
+        stats = hasher.stats()
+        assert stats["restarts"] == 1
+        assert stats["completed"] == 2
+        assert stats["failed"] == 0
+    finally:
+        if hasher._executor is not None:
+            hasher._executor.shutdown()
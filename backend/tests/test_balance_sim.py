@@ -0,0 +1,167 @@
+import numpy as np
+
+from app import balance_sim, pvp_formulas
+from app.balance_sim import DAILY_KPIS, SimConfig, run_simulation, summarize
+from app.decay import DEFAULT_PARAMS, compute_decay, decay_kernel
+from app.pvp_constants import ATTACK_ROLL_MAX, ATTACK_ROLL_MIN, PRESTIGE_GAIN_CAP, PRESTIGE_LOSS_CAP
+from app.pvp_formulas import (
+    apply_daily_caps,
+    compute_expected_win,
+    compute_prestige_delta,
+    daily_caps_kernel,
+    expected_win_kernel,
+    prestige_delta_kernel,
+    roll_power,
+    roll_power_kernel,
+)
+
+
+def test_pvp_kernels_match_scalar_formulas() -> None:
+    # Wide enough to hit both expected_win clamps and every rounding boundary.
+    attacker, defender = np.meshgrid(np.arange(0, 4000, 17), np.arange(0, 4000, 23))
+    attacker, defender = attacker.ravel(), defender.ravel()
+    expected = expected_win_kernel(attacker, defender)
+    wins = prestige_delta_kernel(expected, np.ones(attacker.size, dtype=bool))
+    losses = prestige_delta_kernel(expected, np.zeros(attacker.size, dtype=bool))
+
+    for index, (a, d) in enumerate(zip(attacker.tolist(), defender.tolist())):
+        scalar = compute_expected_win(a, d)
+        assert expected[index] == scalar
+        assert wins[index] == compute_prestige_delta(scalar, "win")
+        assert losses[index] == compute_prestige_delta(scalar, "loss")
+
+
+def test_daily_caps_kernel_matches_scalar() -> None:
+    raw, gain, loss = np.meshgrid(
+        np.arange(-60, 61, 7),
+        np.arange(0, PRESTIGE_GAIN_CAP + 40, 13),
+        np.arange(0, PRESTIGE_LOSS_CAP + 40, 11),
+    )
+    raw, gain, loss = raw.ravel(), gain.ravel(), loss.ravel()
+    capped = daily_caps_kernel(raw, gain, loss)
+    for index in range(raw.size):
+        assert capped[index] == apply_daily_caps(
+            int(raw[index]), int(gain[index]), int(loss[index])
+        )
+
+
+def test_roll_stays_within_bounds() -> None:
+    rolled = roll_power_kernel(np.full(10_000, 100), np.random.default_rng(3))
+    assert rolled.min() >= 100 * ATTACK_ROLL_MIN
+    assert rolled.max() < 100 * ATTACK_ROLL_MAX
+
+
+def test_simulation_is_reproducible_and_reports_kpis() -> None:
+    config = SimConfig(users=500, seasons=2, season_days=3)
+    first = run_simulation(config, replicas=2, seed=11)
+    second = run_simulation(config, replicas=2, seed=11)
+
+    assert set(first) == set(DAILY_KPIS)
+    for name in DAILY_KPIS:
+        assert first[name].shape == (2, 6)
+        np.testing.assert_array_equal(first[name], second[name])
+    assert (first["battles"] > 0).all()
+    assert (first["gain_cap_pct"] <= 100).all()
+
+    summary = summarize(first, config)
+    assert 0 <= summary["decay_to_gain_pct"]
+    assert isinstance(summary["triggers"], list)
+
+
+def test_worker_processes_reproduce_the_serial_series() -> None:
+    config = SimConfig(users=300, seasons=1, season_days=3)
+    serial = run_simulation(config, replicas=2, workers=1, seed=5)
+    parallel = run_simulation(config, replicas=2, workers=2, seed=5)
+
+    for name in DAILY_KPIS:
+        np.testing.assert_array_equal(parallel[name], serial[name])
+
+
+def test_top10_growth_is_measured_from_the_end_of_the_first_week() -> None:
+    config = SimConfig(users=300, seasons=1, season_days=14)
+    series = {name: np.ones((1, 14)) for name in DAILY_KPIS}
+    # The range climbs from zero after the reset, then holds steady.
+    series["top10_range"][0] = [0, 20, 40, 60, 80, 100, 120] + [120] * 7
+
+    summary = summarize(series, config)
+    assert summary["top10_range_growth_pct"] == 0.0
+    assert "top10 range grows every week after the first" not in summary["triggers"]
+
+    series["top10_range"][0, 7:] = 180
+    summary = summarize(series, config)
+    assert summary["top10_range_growth_pct"] == 50.0
+    assert "top10 range grows every week after the first" in summary["triggers"]
+
+
+class ReplayedDraws:
+    """Stands in for the random module so roll_power reuses the kernel's draws."""
+
+    def __init__(self, draws: np.ndarray):
+        self.draws = iter(draws.tolist())
+
+    def uniform(self, low: float, high: float) -> float:
+        assert (low, high) == (ATTACK_ROLL_MIN, ATTACK_ROLL_MAX)
+        return next(self.draws)
+
+
+def test_simulation_kernels_match_scalar_formulas_on_simulated_inputs(monkeypatch) -> None:
+    """Every kernel call of a real run is checked against the scalar formula."""
+    calls = {name: 0 for name in ("roll", "expected_win", "delta", "caps", "decay")}
+
+    def checked_roll(power, rng):
+        replay = np.random.default_rng()
+        replay.bit_generator.state = rng.bit_generator.state
+        rolled = roll_power_kernel(power, rng)
+        draws = replay.uniform(ATTACK_ROLL_MIN, ATTACK_ROLL_MAX, size=np.shape(power))
+        with monkeypatch.context() as patch:
+            patch.setattr(pvp_formulas, "random", ReplayedDraws(draws))
+            assert rolled.tolist() == [roll_power(value) for value in power.tolist()]
+        calls["roll"] += 1
+        return rolled
+
+    def checked_expected_win(attacker, defender):
+        expected = expected_win_kernel(attacker, defender)
+        assert expected.tolist() == [
+            compute_expected_win(a, d) for a, d in zip(attacker.tolist(), defender.tolist())
+        ]
+        calls["expected_win"] += 1
+        return expected
+
+    def checked_delta(expected, won):
+        delta = prestige_delta_kernel(expected, won)
+        assert delta.tolist() == [
+            compute_prestige_delta(e, "win" if w else "loss")
+            for e, w in zip(expected.tolist(), won.tolist())
+        ]
+        calls["delta"] += 1
+        return delta
+
+    def checked_caps(raw, gain, loss):
+        capped = daily_caps_kernel(raw, gain, loss)
+        assert capped.tolist() == [
+            apply_daily_caps(r, g, l) for r, g, l in zip(raw.tolist(), gain.tolist(), loss.tolist())
+        ]
+        calls["caps"] += 1
+        return capped
+
+    def checked_decay(prestige, last_pvp_day, today, params):
+        # compute_decay reads the live constants.
+        assert params == DEFAULT_PARAMS
+        batch = decay_kernel(prestige, last_pvp_day, today, params)
+        assert batch.decay.tolist() == [
+            compute_decay(p, days)[0]
+            for p, days in zip(prestige.tolist(), batch.inactive_days.tolist())
+        ]
+        calls["decay"] += 1
+        return batch
+
+    monkeypatch.setattr(balance_sim, "roll_power_kernel", checked_roll)
+    monkeypatch.setattr(balance_sim, "expected_win_kernel", checked_expected_win)
+    monkeypatch.setattr(balance_sim, "prestige_delta_kernel", checked_delta)
+    monkeypatch.setattr(balance_sim, "daily_caps_kernel", checked_caps)
+    monkeypatch.setattr(balance_sim, "decay_kernel", checked_decay)
+
+    # A full season, so prestige spreads well past the decay threshold.
+    series = run_simulation(SimConfig(users=300, seasons=1), seed=3)
+    assert all(calls.values())
+    assert series["above_threshold_pct"].max() > 0
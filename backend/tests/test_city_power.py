@@ -0,0 +1,60 @@
+import uuid
+
+from fastapi.testclient import TestClient
+
+from app import models
+from app.db import SessionLocal
+from app.main import app
+from app.routes.stats import compute_stats
+
+
+def register_user(client: TestClient, email: str, password: str) -> str:
+    response = client.post("/auth/register", json={"email": email, "password": password})
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+def login_user(client: TestClient, email: str, password: str) -> str:
+    response = client.post(
+        "/auth/login",
+        data={"username": email, "password": password},
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+    )
+    assert response.status_code == 200
+    return response.json()["access_token"]
+
+
+def test_build_keeps_cached_power_in_sync() -> None:
+    client = TestClient(app)
+    suffix = uuid.uuid4().hex[:8]
+    email = f"power_{suffix}@example.com"
+    password = "TestPass123!"
+
+    user_id = register_user(client, email, password)
+    token = login_user(client, email, password)
+    headers = {"Authorization": f"Bearer {token}"}
+
+    for building_type, x in (("barracks", 0), ("wall", 1), ("tower", 2), ("house", 3)):
+        response = client.post(
+            "/city/build", json={"type": building_type, "x": x, "y": 0}, headers=headers
+        )
+        assert response.status_code == 201, response.text
+
+    stats = client.get("/stats", headers=headers)
+    assert stats.status_code == 200, stats.text
+
+    db = SessionLocal()
+    try:
+        city = db.query(models.City).filter(models.City.user_id == user_id).one()
+        buildings = db.query(models.Building).filter(models.Building.city_id == city.id).all()
+        attack, defense = compute_stats(buildings)
+        assert stats.json() == {"attack_power": attack, "defense_power": defense}
+        assert (attack, defense) == (3, 9)
+
+        db.query(models.Building).filter(models.Building.city_id == city.id).delete()
+        db.query(models.UserBuilding).filter(models.UserBuilding.user_id == user_id).delete()
+        db.query(models.City).filter(models.City.user_id == user_id).delete()
+        db.query(models.User).filter(models.User.id == user_id).delete()
+        db.commit()
+    finally:
+        db.close()
@@ -0,0 +1,40 @@
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+
+from app.decay import calculate_inactive_days, compute_decay, decay_kernel, local_pvp_days
+from app.pvp_constants import SERVER_TZ
+
+
+def test_decay_kernel_matches_scalar_formula() -> None:
+    now = datetime(2025, 3, 30, 12, 0, tzinfo=SERVER_TZ)
+    today = now.date()
+    # Straddles the DST switch and local midnight, where UTC and server days differ.
+    last_seen = [
+        None,
+        now,
+        datetime(2025, 3, 29, 23, 30, tzinfo=timezone.utc),
+        datetime(2025, 3, 28, 22, 59, tzinfo=timezone.utc),
+        now - timedelta(days=2),
+        now - timedelta(days=400),
+    ]
+    prestige = np.arange(900, 2400, 7)
+
+    rows = [(p, seen) for p in prestige.tolist() for seen in last_seen]
+    batch = decay_kernel(
+        np.array([p for p, _ in rows]),
+        local_pvp_days([seen for _, seen in rows]),
+        today,
+    )
+
+    for index, (p, seen) in enumerate(rows):
+        inactive_days = calculate_inactive_days(now, seen)
+        decay, rate = compute_decay(p, inactive_days)
+        assert batch.inactive_days[index] == inactive_days
+        assert batch.rate[index] == rate
+        assert batch.decay[index] == decay
+
+
+def test_decay_kernel_handles_empty_batch() -> None:
+    batch = decay_kernel(np.array([], dtype=np.int64), local_pvp_days([]), date(2025, 1, 1))
+    assert batch.decay.shape == (0,)
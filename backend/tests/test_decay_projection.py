@@ -0,0 +1,73 @@
+import uuid
+from datetime import date, datetime, timedelta
+
+from app import models
+from app.db import SessionLocal
+from app.decay import DecayParams, calculate_inactive_days, compute_decay
+from app.jobs.decay_projection import project_decay
+from app.pvp_constants import SERVER_TZ
+
+
+def test_projection_matches_scalar_nights_and_writes_nothing() -> None:
+    first_night = date(2025, 6, 1)
+    nights = 5
+    suffix = uuid.uuid4().hex[:8]
+    last_pvp_at = datetime(2025, 5, 31, 21, 0, tzinfo=SERVER_TZ)
+    cases = [900_000_000, 900_000_000, 899_999_000]
+
+    db = SessionLocal()
+    try:
+        users = [
+            models.User(
+                email=f"projection_{index}_{suffix}@example.com",
+                password_hash="x",
+                prestige=prestige,
+                last_pvp_at=last_pvp_at,
+            )
+            for index, prestige in enumerate(cases)
+        ]
+        db.add_all(users)
+        db.flush()
+        log_count = db.query(models.PrestigeDecayLog).count()
+
+        projection = project_decay(db, first_night, nights, top_n=3, chunk_size=2)
+
+        expected = []
+        for prestige in cases:
+            for night in range(nights):
+                now = datetime.combine(first_night + timedelta(days=night), datetime.min.time())
+                inactive_days = calculate_inactive_days(now.replace(tzinfo=SERVER_TZ), last_pvp_at)
+                prestige -= compute_decay(prestige, inactive_days)[0]
+            expected.append(prestige)
+
+        by_id = sorted(users, key=lambda user: user.id)
+        tied = [user for user in by_id if user.prestige == 900_000_000]
+        assert [email for _, _, email in projection.top] == [
+            tied[0].email,
+            tied[1].email,
+            users[2].email,
+        ]
+        assert [prestige for _, prestige, _ in projection.top] == sorted(expected, reverse=True)
+        assert projection.users >= len(cases)
+
+        db.expire_all()
+        assert [db.get(models.User, user.id).prestige for user in users] == cases
+        assert db.query(models.PrestigeDecayLog).count() == log_count
+    finally:
+        db.rollback()
+        db.close()
+
+
+def test_projection_uses_overridden_params() -> None:
+    db = SessionLocal()
+    try:
+        baseline = project_decay(db, date(2025, 6, 1), 2, top_n=0)
+        no_decay = project_decay(
+            db, date(2025, 6, 1), 2, DecayParams(threshold=10**9), top_n=0
+        )
+        assert no_decay.users == baseline.users
+        assert no_decay.decay_per_night.tolist() == [0, 0]
+        assert no_decay.histogram_after.tolist() == no_decay.histogram_before.tolist()
+    finally:
+        db.rollback()
+        db.close()
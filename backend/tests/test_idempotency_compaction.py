@@ -0,0 +1,62 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from fastapi.testclient import TestClient
+
+from app import models
+from app.db import SessionLocal
+from app.jobs.idempotency_compaction import compact_idempotency, retention_cutoff
+from app.main import app
+
+
+def test_compaction_deletes_only_expired_rows_in_batches() -> None:
+    now = datetime.now(timezone.utc)
+    cutoff = retention_cutoff(now)
+    suffix = uuid.uuid4().hex[:8]
+
+    db = SessionLocal()
+    user = models.User(email=f"compaction_{suffix}@example.com", password_hash="x")
+    db.add(user)
+    db.flush()
+    try:
+        expired = [f"old-{index}" for index in range(5)]
+        for key in expired:
+            db.add(
+                models.PvpIdempotency(
+                    attacker_id=user.id,
+                    idempotency_key=key,
+                    status="completed",
+                    response_json={"ok": True},
+                    created_at=cutoff - timedelta(minutes=1),
+                )
+            )
+        db.add(
+            models.PvpIdempotency(
+                attacker_id=user.id, idempotency_key="fresh", status="completed"
+            )
+        )
+        db.commit()
+
+        deleted = compact_idempotency(db, cutoff, batch_size=2)
+        assert deleted >= len(expired)
+
+        remaining = [
+            row.idempotency_key
+            for row in db.query(models.PvpIdempotency).filter(
+                models.PvpIdempotency.attacker_id == user.id
+            )
+        ]
+        assert remaining == ["fresh"]
+
+        stats = TestClient(app).get("/metrics/idempotency")
+        assert stats.status_code == 200, stats.text
+        body = stats.json()
+        assert body["total_bytes"] >= body["table_bytes"] > 0
+        assert body["oldest_created_at"] is not None
+    finally:
+        db.query(models.PvpIdempotency).filter(
+            models.PvpIdempotency.attacker_id == user.id
+        ).delete()
+        db.query(models.User).filter(models.User.id == user.id).delete()
+        db.commit()
+        db.close()
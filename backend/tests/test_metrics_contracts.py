@@ -0,0 +1,38 @@
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+
+def test_db_pool_metrics_report_both_engines() -> None:
+    client = TestClient(app)
+
+    client.get("/rank/top")
+    response = client.get("/metrics/db-pool")
+    assert response.status_code == 200, response.text
+    body = response.json()
+
+    assert set(body) == {"sync", "async"}
+    for pool in body.values():
+        assert pool["checkouts"] >= 0
+        assert pool["timeouts"] >= 0
+        assert pool["wait_seconds_max"] <= pool["wait_seconds_total"] or pool["checkouts"] == 0
+    assert body["async"]["checkouts"] >= 1
+    assert body["sync"]["size"] is not None
+
+
+def test_query_metrics_aggregate_per_route_template() -> None:
+    client = TestClient(app)
+
+    response = client.get("/rank/page")
+    assert response.status_code == 200, response.text
+    assert response.headers["server-timing"].startswith("db;dur=")
+
+    response = client.get("/metrics/queries")
+    assert response.status_code == 200, response.text
+    routes = {(entry["method"], entry["route"]): entry for entry in response.json()}
+
+    rank_page = routes[("GET", "/rank/page")]
+    assert rank_page["requests"] >= 1
+    assert rank_page["statements_max"] <= rank_page["statements_total"]
+    assert rank_page["db_seconds_max"] <= rank_page["db_seconds_total"]
+    assert rank_page["slowest_statement"]
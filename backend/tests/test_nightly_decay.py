@@ -0,0 +1,330 @@
+import uuid
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+
+from app import models
+from app.db import SessionLocal
+from app.decay import decay_kernel, local_pvp_days
+from app.jobs.leaderboard_snapshot import refresh_leaderboard_snapshot
+from app.jobs.nightly_decay import (
+    apply_decay,
+    decay_chunk,
+    lock_tick,
+    partition_bounds,
+    partition_tick_name,
+    run_nightly_decay,
+)
+from app.pvp_constants import SERVER_TZ
+
+
+def test_set_based_decay_matches_decay_kernel() -> None:
+    now = datetime.now(SERVER_TZ)
+    suffix = uuid.uuid4().hex[:8]
+    cases = [
+        (1000, now),
+        (1200, None),
+        (1201, now),
+        (1225, now - timedelta(days=1)),
+        (1250, now - timedelta(days=2)),
+        (1817, None),
+        (5000, now - timedelta(days=30)),
+    ]
+
+    db = SessionLocal()
+    try:
+        users = [
+            models.User(
+                email=f"decay_{index}_{suffix}@example.com",
+                password_hash="x",
+                prestige=prestige,
+                last_pvp_at=last_pvp_at,
+            )
+            for index, (prestige, last_pvp_at) in enumerate(cases)
+        ]
+        db.add_all(users)
+        db.flush()
+
+        apply_decay(db, now.date())
+        expected = decay_kernel(
+            [prestige for prestige, _ in cases],
+            local_pvp_days([last_pvp_at for _, last_pvp_at in cases]),
+            now.date(),
+        )
+
+        for index, (user, (prestige, _)) in enumerate(zip(users, cases)):
+            db.refresh(user)
+            decay = int(expected.decay[index])
+            inactive_days = int(expected.inactive_days[index])
+            rate = float(expected.rate[index])
+            assert user.prestige == prestige - decay
+
+            logs = (
+                db.query(models.PrestigeDecayLog)
+                .filter(models.PrestigeDecayLog.user_id == user.id)
+                .all()
+            )
+            if decay == 0:
+                assert logs == []
+                continue
+            assert len(logs) == 1
+            log = logs[0]
+            assert (log.prestige_before, log.prestige_after) == (prestige, prestige - decay)
+            assert log.decay_amount == decay
+            assert log.inactive_days == inactive_days
+            assert log.rate_used == rate
+    finally:
+        db.rollback()
+        db.close()
+
+
+def test_set_based_decay_matches_decay_kernel_on_generated_population() -> None:
+    # The DST switch day, so local days and UTC days disagree around midnight.
+    today = date(2025, 3, 30)
+    anchor = datetime(2025, 3, 30, 12, 0, tzinfo=timezone.utc)
+    rng = np.random.default_rng(14)
+    # Every excess up to past the DAILY_DECAY_MAX clamp, plus a random tail.
+    prestige = np.concatenate(
+        [np.arange(1150, 2400), rng.integers(2400, 50_000, size=250)]
+    ).tolist()
+    offsets = rng.integers(0, 6 * 24 * 3600, size=len(prestige)).tolist()
+    never = (rng.random(len(prestige)) < 0.15).tolist()
+    last_pvp_at = [
+        None if skip else anchor - timedelta(seconds=offset)
+        for offset, skip in zip(offsets, never)
+    ]
+    # A private id range, so apply_decay can be bounded to these users.
+    base = uuid.uuid4().int >> 1
+    suffix = uuid.uuid4().hex[:8]
+
+    db = SessionLocal()
+    try:
+        users = [
+            models.User(
+                id=uuid.UUID(int=base + index),
+                email=f"decay_gen_{index}_{suffix}@example.com",
+                password_hash="x",
+                prestige=value,
+                last_pvp_at=seen,
+            )
+            for index, (value, seen) in enumerate(zip(prestige, last_pvp_at))
+        ]
+        db.add_all(users)
+        db.flush()
+
+        apply_decay(db, today, uuid.UUID(int=base - 1), uuid.UUID(int=base + len(users)))
+        expected = decay_kernel(prestige, local_pvp_days(last_pvp_at), today)
+
+        after = dict(
+            db.query(models.User.id, models.User.prestige).filter(
+                models.User.id.in_([user.id for user in users])
+            )
+        )
+        logs = {
+            log.user_id: log
+            for log in db.query(models.PrestigeDecayLog).filter(
+                models.PrestigeDecayLog.day == today,
+                models.PrestigeDecayLog.user_id.in_(list(after)),
+            )
+        }
+        assert np.count_nonzero(expected.decay) == len(logs)
+        for index, user in enumerate(users):
+            decay = int(expected.decay[index])
+            assert after[user.id] == prestige[index] - decay
+            if decay:
+                log = logs[user.id]
+                assert log.decay_amount == decay
+                assert log.inactive_days == int(expected.inactive_days[index])
+                assert log.rate_used == float(expected.rate[index])
+    finally:
+        db.rollback()
+        db.close()
+
+
+def test_chunked_decay_resumes_from_checkpoint() -> None:
+    today = date(1999, 1, 1)
+    suffix = uuid.uuid4().hex[:8]
+
+    db = SessionLocal()
+    try:
+        users = [
+            models.User(
+                email=f"decay_chunk_{index}_{suffix}@example.com",
+                password_hash="x",
+                prestige=2000,
+            )
+            for index in range(5)
+        ]
+        db.add_all(users)
+        db.flush()
+
+        tick = lock_tick(db, today)
+        decay_chunk(db, tick, today, chunk_size=2)
+        checkpoint = tick.checkpoint_user_id
+        assert checkpoint is not None
+        assert tick.completed_at is None
+
+        # A fresh lock (as after a crash and rerun) sees the same checkpoint.
+        db.flush()
+        db.expire_all()
+        tick = lock_tick(db, today)
+        assert tick.checkpoint_user_id == checkpoint
+
+        done = False
+        while not done:
+            _, done = decay_chunk(db, tick, today, chunk_size=2)
+        db.flush()
+        assert tick.completed_at is not None
+
+        for user in users:
+            logs = (
+                db.query(models.PrestigeDecayLog)
+                .filter(
+                    models.PrestigeDecayLog.user_id == user.id,
+                    models.PrestigeDecayLog.day == today,
+                )
+                .count()
+            )
+            assert logs == 1
+    finally:
+        db.rollback()
+        db.close()
+
+
+def test_partitions_cover_each_user_exactly_once() -> None:
+    today = date(1999, 1, 2)
+    suffix = uuid.uuid4().hex[:8]
+    partitions = 4
+
+    bounds = partition_bounds(partitions)
+    assert bounds[0][0] is None and bounds[-1][1] is None
+    for (_, through_id), (start_after, _) in zip(bounds, bounds[1:]):
+        assert through_id == start_after
+
+    db = SessionLocal()
+    try:
+        users = [
+            models.User(
+                id=uuid.UUID(int=(index * (1 << 128)) // 8),
+                email=f"decay_part_{index}_{suffix}@example.com",
+                password_hash="x",
+                prestige=2000,
+            )
+            for index in range(8)
+        ]
+        db.add_all(users)
+        db.flush()
+
+        for index, (start_after, through_id) in enumerate(bounds):
+            tick = lock_tick(db, today, partition_tick_name(index, partitions), start_after)
+            done = False
+            while not done:
+                _, done = decay_chunk(db, tick, today, chunk_size=1, through_id=through_id)
+            db.flush()
+
+        for user in users:
+            logs = (
+                db.query(models.PrestigeDecayLog)
+                .filter(
+                    models.PrestigeDecayLog.user_id == user.id,
+                    models.PrestigeDecayLog.day == today,
+                )
+                .count()
+            )
+            assert logs == 1
+    finally:
+        db.rollback()
+        db.close()
+
+
+def decay_results(user_ids: list, day: date) -> dict:
+    db = SessionLocal()
+    try:
+        prestige = dict(
+            db.query(models.User.id, models.User.prestige).filter(models.User.id.in_(user_ids))
+        )
+        logs = {
+            log.user_id: (
+                log.prestige_before,
+                log.prestige_after,
+                log.decay_amount,
+                log.inactive_days,
+                log.rate_used,
+            )
+            for log in db.query(models.PrestigeDecayLog).filter(
+                models.PrestigeDecayLog.day == day,
+                models.PrestigeDecayLog.user_id.in_(user_ids),
+            )
+        }
+        return {"prestige": prestige, "logs": logs}
+    finally:
+        db.close()
+
+
+def undo_decay_day(day: date) -> None:
+    """Put back every user the job decayed on day and forget that the day ran."""
+    db = SessionLocal()
+    try:
+        log = models.PrestigeDecayLog
+        db.query(models.User).filter(models.User.id == log.user_id, log.day == day).update(
+            {models.User.prestige: log.prestige_before}, synchronize_session=False
+        )
+        db.query(log).filter(log.day == day).delete()
+        db.query(models.SystemTick).filter(models.SystemTick.tick_day == day).delete()
+        db.commit()
+    finally:
+        db.close()
+
+
+def test_parallel_run_matches_serial_run() -> None:
+    # A day long past, so its ticks and logs belong to this test only. The job
+    # decays every user in the database; undo_decay_day restores them.
+    day = date(1999, 1, 3)
+    suffix = uuid.uuid4().hex[:8]
+    last_seen = [
+        None,
+        datetime(1999, 1, 2, 23, 30, tzinfo=SERVER_TZ),
+        datetime(1998, 12, 1, tzinfo=timezone.utc),
+    ]
+    user_count = 40
+
+    db = SessionLocal()
+    try:
+        users = [
+            models.User(
+                # Spread over the id space so every partition gets users.
+                id=uuid.UUID(int=(index * (1 << 128)) // user_count + index + 1),
+                email=f"decay_par_{index}_{suffix}@example.com",
+                password_hash="x",
+                prestige=1200 + 97 * index,
+                last_pvp_at=last_seen[index % 3],
+            )
+            for index in range(user_count)
+        ]
+        db.add_all(users)
+        db.commit()
+        user_ids = [user.id for user in users]
+    finally:
+        db.close()
+
+    try:
+        results = []
+        for workers in (1, 2):
+            run_nightly_decay(chunk_size=7, workers=workers, today=day)
+            results.append(decay_results(user_ids, day))
+            undo_decay_day(day)
+
+        serial, parallel = results
+        assert len(serial["logs"]) == user_count - 1
+        assert parallel == serial
+    finally:
+        undo_decay_day(day)
+        db = SessionLocal()
+        try:
+            db.query(models.User).filter(models.User.id.in_(user_ids)).delete(
+                synchronize_session=False
+            )
+            db.commit()
+            refresh_leaderboard_snapshot(db)
+        finally:
+            db.close()
@@ -0,0 +1,192 @@
+import json
+import os
+import re
+import threading
+import uuid
+
+from fastapi.testclient import TestClient
+
+os.environ["APP_ENV"] = "test"
+
+from app import models
+from app.db import SessionLocal
+from app.main import app
+from app.prometheus import Counter, Gauge, Histogram, Registry
+from app.pvp_constants import PRESTIGE_GAIN_CAP
+
+SAMPLE = re.compile(r"^(\w+)(\{.*\})? (\S+)$")
+
+
+def register_user(client: TestClient, email: str, password: str) -> str:
+    response = client.post("/auth/register", json={"email": email, "password": password})
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+def login_user(client: TestClient, email: str, password: str) -> str:
+    response = client.post(
+        "/auth/login",
+        data={"username": email, "password": password},
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+    )
+    assert response.status_code == 200
+    return response.json()["access_token"]
+
+
+def scrape(client: TestClient) -> dict[str, float]:
+    response = client.get("/metrics")
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    samples = {}
+    for line in response.text.splitlines():
+        if line.startswith("#"):
+            continue
+        match = SAMPLE.match(line)
+        assert match, line
+        samples[match.group(1) + (match.group(2) or "")] = float(match.group(3))
+    return samples
+
+
+def test_registry_sums_thread_shards_and_renders_text_format() -> None:
+    registry = Registry()
+    hits = registry.register(Counter("hits_total", "Hits.", ("kind",)))
+    latency = registry.register(
+        Histogram("latency_seconds", "Latency.", ("route",), buckets=(0.1, 1.0))
+    )
+
+    def work() -> None:
+        for _ in range(1000):
+            hits.inc("a")
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    hits.inc('quo"te')
+    for value in (0.05, 0.5, 5.0):
+        latency.observe(value, "/x")
+
+    text = registry.render()
+    assert "# TYPE hits_total counter" in text
+    assert 'hits_total{kind="a"} 4000' in text
+    assert 'hits_total{kind="quo\\"te"} 1' in text
+    assert 'latency_seconds_bucket{route="/x",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{route="/x",le="1"} 2' in text
+    assert 'latency_seconds_bucket{route="/x",le="+Inf"} 3' in text
+    assert 'latency_seconds_count{route="/x"} 3' in text
+    assert 'latency_seconds_sum{route="/x"} 5.55' in text
+    # Exited threads are folded into one retired shard.
+    assert len(hits._shards) == 1
+
+
+def test_registry_merges_worker_files_and_drops_gauges_of_dead_workers(tmp_path) -> None:
+    registry = Registry()
+    hits = registry.register(Counter("hits_total", "Hits."))
+    in_flight = registry.register(Gauge("in_flight", "In flight."))
+    hits.inc()
+    in_flight.inc()
+
+    dead_pid = 2**22 + 1
+    for pid in (os.getppid(), dead_pid):
+        (tmp_path / f"{pid}.json").write_text(
+            json.dumps({"pid": pid, "metrics": {"hits_total": [[[], 2]], "in_flight": [[[], 3]]}})
+        )
+    registry.flush(str(tmp_path))
+    assert (tmp_path / f"{os.getpid()}.json").exists()
+
+    text = registry.render(str(tmp_path))
+    assert "hits_total 5" in text
+    assert "in_flight 4" in text
+
+
+def test_metrics_endpoint_reports_routes_and_pvp_outcomes() -> None:
+    client = TestClient(app)
+    suffix = uuid.uuid4().hex[:8]
+    password = "TestPass123!"
+    attacker_id = register_user(client, f"prom_attacker_{suffix}@example.com", password)
+    defender_id = register_user(client, f"prom_defender_{suffix}@example.com", password)
+    token = login_user(client, f"prom_attacker_{suffix}@example.com", password)
+
+    try:
+        before = scrape(client)
+        headers = {
+            "Authorization": f"Bearer {token}",
+            "X-Test-Ignore-Cooldowns": "true",
+            "X-Test-Force-Result": "win",
+            "X-Test-Force-Delta": str(PRESTIGE_GAIN_CAP),
+        }
+        payload = {"defender_id": defender_id}
+
+        no_army = client.post(
+            "/pvp/attack", json=payload, headers={**headers, "Idempotency-Key": str(uuid.uuid4())}
+        )
+        assert no_army.status_code == 403
+
+        seed_units(attacker_id, 10)
+        key = str(uuid.uuid4())
+        for _ in range(2):
+            response = client.post(
+                "/pvp/attack", json=payload, headers={**headers, "Idempotency-Key": key}
+            )
+            assert response.status_code == 200, response.text
+
+        after = scrape(client)
+    finally:
+        cleanup_test_data(attacker_id, defender_id)
+
+    def delta(sample: str) -> float:
+        return after.get(sample, 0) - before.get(sample, 0)
+
+    assert delta("pvp_attacks_accepted_total") == 1
+    assert delta('pvp_attacks_rejected_total{reason="insufficient_army"}') == 1
+    assert delta('pvp_attacks_rejected_total{reason="idempotency_replay"}') == 1
+    assert delta('pvp_cap_hits_total{cap="gain"}') == 1
+    assert (
+        delta('http_request_duration_seconds_count{method="POST",route="/pvp/attack",status="200"}')
+        == 2
+    )
+    assert (
+        delta('http_request_duration_seconds_count{method="POST",route="/pvp/attack",status="403"}')
+        == 1
+    )
+    # The scrape itself is the only request in flight.
+    assert after['http_requests_in_flight{method="GET"}'] == 1
+
+
+def cleanup_test_data(attacker_id, defender_id):
+    db = SessionLocal()
+    try:
+        db.query(models.PvpIdempotency).filter(
+            models.PvpIdempotency.attacker_id == attacker_id
+        ).delete()
+        db.query(models.PvpAttackCooldown).filter(
+            models.PvpAttackCooldown.attacker_id == attacker_id
+        ).delete()
+        db.query(models.PvpDailyStats).filter(
+            models.PvpDailyStats.user_id == attacker_id
+        ).delete()
+        db.query(models.AttackLog).filter(
+            models.AttackLog.attacker_id == attacker_id
+        ).delete()
+        db.query(models.UserUnit).filter(models.UserUnit.user_id == attacker_id).delete()
+        db.query(models.UserBuilding).filter(
+            models.UserBuilding.user_id.in_([attacker_id, defender_id])
+        ).delete()
+        db.query(models.City).filter(models.City.user_id.in_([attacker_id, defender_id])).delete()
+        db.query(models.User).filter(models.User.id.in_([attacker_id, defender_id])).delete()
+        db.commit()
+    finally:
+        db.close()
+
+
+def seed_units(user_id, qty):
+    db = SessionLocal()
+    try:
+        unit_type = db.query(models.UnitType).filter(models.UnitType.code == "raider").first()
+        if not unit_type:
+            raise AssertionError("Unit type 'raider' missing")
+        db.add(models.UserUnit(user_id=user_id, unit_type_id=unit_type.id, qty=qty))
+        db.commit()
+    finally:
+        db.close()
@@ -0,0 +1,228 @@
+from datetime import datetime
+import os
+import uuid
+
+from fastapi.testclient import TestClient
+
+os.environ["APP_ENV"] = "test"
+
+from app import models
+from app.db import SessionLocal
+from app.main import app
+from app.pvp_constants import PRESTIGE_GAIN_CAP, SERVER_TZ
+
+
+def register_user(client: TestClient, email: str, password: str) -> str:
+    response = client.post("/auth/register", json={"email": email, "password": password})
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+def login_user(client: TestClient, email: str, password: str) -> str:
+    response = client.post(
+        "/auth/login",
+        data={"username": email, "password": password},
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+    )
+    assert response.status_code == 200
+    return response.json()["access_token"]
+
+
+def seed_units(user_id, qty):
+    db = SessionLocal()
+    try:
+        unit_type = db.query(models.UnitType).filter(models.UnitType.code == "raider").first()
+        if not unit_type:
+            raise AssertionError("Unit type 'raider' missing")
+        db.add(models.UserUnit(user_id=user_id, unit_type_id=unit_type.id, qty=qty))
+        db.commit()
+    finally:
+        db.close()
+
+
+def cleanup(attacker_id, user_ids):
+    db = SessionLocal()
+    try:
+        db.query(models.PvpIdempotency).filter(
+            models.PvpIdempotency.attacker_id == attacker_id
+        ).delete()
+        db.query(models.PvpAttackCooldown).filter(
+            models.PvpAttackCooldown.attacker_id == attacker_id
+        ).delete()
+        db.query(models.PvpDailyStats).filter(
+            models.PvpDailyStats.user_id == attacker_id
+        ).delete()
+        db.query(models.AttackLog).filter(models.AttackLog.attacker_id == attacker_id).delete()
+        db.query(models.City).filter(models.City.user_id.in_(user_ids)).delete()
+        db.query(models.User).filter(models.User.id.in_(user_ids)).delete()
+        db.commit()
+    finally:
+        db.close()
+
+
+def create_players(client: TestClient, defenders: int):
+    suffix = uuid.uuid4().hex[:8]
+    password = "TestPass123!"
+    attacker_email = f"batch_attacker_{suffix}@example.com"
+    attacker_id = register_user(client, attacker_email, password)
+    defender_ids = [
+        register_user(client, f"batch_defender_{idx}_{suffix}@example.com", password)
+        for idx in range(defenders)
+    ]
+    seed_units(attacker_id, 10)
+    token = login_user(client, attacker_email, password)
+    return attacker_id, defender_ids, {"Authorization": f"Bearer {token}"}
+
+
+def batch(attacks):
+    return {
+        "attacks": [
+            {"defender_id": defender_id, "idempotency_key": key} for defender_id, key in attacks
+        ]
+    }
+
+
+def test_batch_applies_target_cooldown_between_items():
+    client = TestClient(app)
+    attacker_id, (first, second), headers = create_players(client, 2)
+    first_key, second_key = str(uuid.uuid4()), str(uuid.uuid4())
+
+    try:
+        response = client.post(
+            "/pvp/attack/batch",
+            json=batch(
+                [
+                    (first, first_key),
+                    (second, second_key),
+                    (attacker_id, str(uuid.uuid4())),
+                    (first, first_key),
+                    (first, str(uuid.uuid4())),
+                ]
+            ),
+            headers=headers,
+        )
+        assert response.status_code == 200, response.text
+        results = response.json()["results"]
+
+        assert [item["status_code"] for item in results] == [200, 200, 400, 200, 429]
+        # A repeated key inside the batch replays the stored response.
+        assert results[3]["response"] == results[0]["response"]
+        assert results[4]["error"] == {"detail": "Target on cooldown"}
+        assert results[4]["response"] is None
+
+        db = SessionLocal()
+        try:
+            today = datetime.now(SERVER_TZ).date()
+            stats = db.get(models.PvpDailyStats, (attacker_id, today))
+            assert stats.attacks_used == 2
+            keys = {
+                row.idempotency_key: row.status
+                for row in db.query(models.PvpIdempotency).filter(
+                    models.PvpIdempotency.attacker_id == attacker_id
+                )
+            }
+            # The rejected item's savepoint was rolled back, key claim included.
+            assert keys == {first_key: "completed", second_key: "completed"}
+        finally:
+            db.close()
+    finally:
+        cleanup(attacker_id, [attacker_id, first, second])
+
+
+def test_batch_spends_several_attacks_on_distinct_defenders():
+    client = TestClient(app)
+    attacker_id, defenders, headers = create_players(client, 5)
+
+    try:
+        response = client.post(
+            "/pvp/attack/batch",
+            json=batch([(defender_id, str(uuid.uuid4())) for defender_id in defenders]),
+            headers=headers,
+        )
+        assert response.status_code == 200, response.text
+        results = response.json()["results"]
+
+        assert [item["status_code"] for item in results] == [200] * len(defenders)
+        assert [item["response"]["limits"]["attacks_used"] for item in results] == [1, 2, 3, 4, 5]
+    finally:
+        cleanup(attacker_id, [attacker_id, *defenders])
+
+
+def test_batch_honours_global_cooldown_from_an_earlier_request():
+    client = TestClient(app)
+    attacker_id, (first, second, third), headers = create_players(client, 3)
+
+    try:
+        single = client.post(
+            "/pvp/attack",
+            json={"defender_id": first},
+            headers={**headers, "Idempotency-Key": str(uuid.uuid4())},
+        )
+        assert single.status_code == 200, single.text
+
+        response = client.post(
+            "/pvp/attack/batch",
+            json=batch([(second, str(uuid.uuid4())), (third, str(uuid.uuid4()))]),
+            headers=headers,
+        )
+        assert response.status_code == 200, response.text
+        results = response.json()["results"]
+        assert [item["status_code"] for item in results] == [429, 429]
+        assert {item["error"]["detail"] for item in results} == {"Global attack cooldown"}
+    finally:
+        cleanup(attacker_id, [attacker_id, first, second, third])
+
+
+def test_batch_items_see_caps_from_earlier_items():
+    client = TestClient(app)
+    attacker_id, defenders, headers = create_players(client, 3)
+    headers.update(
+        {
+            "X-Test-Ignore-Cooldowns": "true",
+            "X-Test-Force-Result": "win",
+            "X-Test-Force-Delta": "200",
+        }
+    )
+
+    try:
+        response = client.post(
+            "/pvp/attack/batch",
+            json={
+                "attacks": [
+                    {"defender_id": defender_id, "idempotency_key": str(uuid.uuid4())}
+                    for defender_id in defenders
+                ]
+            },
+            headers=headers,
+        )
+        assert response.status_code == 200, response.text
+        bodies = [item["response"] for item in response.json()["results"]]
+
+        assert [body["prestige"]["delta"] for body in bodies] == [200, 100, 0]
+        assert [body["limits"]["attacks_used"] for body in bodies] == [1, 2, 3]
+        assert bodies[-1]["limits"]["prestige_gain_today"] == PRESTIGE_GAIN_CAP
+        assert bodies[1]["prestige"]["attacker_before"] == bodies[0]["prestige"]["attacker_after"]
+    finally:
+        cleanup(attacker_id, [attacker_id, *defenders])
+
+
+def test_batch_rejects_empty_and_oversized_lists():
+    client = TestClient(app)
+    attacker_id, (defender_id,), headers = create_players(client, 1)
+
+    try:
+        empty = client.post("/pvp/attack/batch", json={"attacks": []}, headers=headers)
+        assert empty.status_code == 422
+        oversized = client.post(
+            "/pvp/attack/batch",
+            json={
+                "attacks": [
+                    {"defender_id": defender_id, "idempotency_key": str(uuid.uuid4())}
+                    for _ in range(21)
+                ]
+            },
+            headers=headers,
+        )
+        assert oversized.status_code == 422
+    finally:
+        cleanup(attacker_id, [attacker_id, defender_id])
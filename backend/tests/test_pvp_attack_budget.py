@@ -0,0 +1,138 @@
+import os
+import statistics
+import time
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+os.environ["APP_ENV"] = "test"
+
+from app import models
+from app.db import SessionLocal
+from app.main import app
+
+# Statements issued by one accepted attack (COMMIT is not a cursor execute).
+ATTACK_STATEMENT_BUDGET = 3
+# Median end-to-end latency through TestClient against a local Postgres.
+# Wall-clock numbers depend on the host, so this check only runs when
+# RUN_LATENCY_BUDGETS=1.
+ATTACK_LATENCY_BUDGET_MS = 100
+RUN_LATENCY_BUDGETS = os.getenv("RUN_LATENCY_BUDGETS") == "1"
+LATENCY_SAMPLES = 10
+
+
+def register_user(client: TestClient, email: str, password: str) -> str:
+    response = client.post("/auth/register", json={"email": email, "password": password})
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+def login_user(client: TestClient, email: str, password: str) -> str:
+    response = client.post(
+        "/auth/login",
+        data={"username": email, "password": password},
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+    )
+    assert response.status_code == 200
+    return response.json()["access_token"]
+
+
+def attack_headers(token: str) -> dict:
+    return {
+        "Authorization": f"Bearer {token}",
+        "Idempotency-Key": str(uuid.uuid4()),
+        "X-Test-Ignore-Cooldowns": "true",
+        "X-Test-Force-Result": "win",
+        "X-Test-Force-Delta": "0",
+    }
+
+
+def attack_pair(client: TestClient):
+    suffix = uuid.uuid4().hex[:8]
+    attacker_email = f"budget_attacker_{suffix}@example.com"
+    defender_email = f"budget_defender_{suffix}@example.com"
+    password = "TestPass123!"
+
+    attacker_id = register_user(client, attacker_email, password)
+    defender_id = register_user(client, defender_email, password)
+    token = login_user(client, attacker_email, password)
+    seed_units(attacker_id, 10)
+    return attacker_id, defender_id, token
+
+
+def test_pvp_attack_statement_budget(query_budget):
+    client = TestClient(app)
+    attacker_id, defender_id, token = attack_pair(client)
+
+    try:
+        response = client.post(
+            "/pvp/attack", json={"defender_id": defender_id}, headers=attack_headers(token)
+        )
+        assert response.status_code == 200, response.text
+        query_budget(response, ATTACK_STATEMENT_BUDGET)
+    finally:
+        cleanup_test_data(attacker_id, defender_id)
+
+
+@pytest.mark.skipif(not RUN_LATENCY_BUDGETS, reason="set RUN_LATENCY_BUDGETS=1")
+def test_pvp_attack_latency_budget():
+    client = TestClient(app)
+    attacker_id, defender_id, token = attack_pair(client)
+
+    try:
+        samples = []
+        for _ in range(LATENCY_SAMPLES):
+            started = time.perf_counter()
+            response = client.post(
+                "/pvp/attack", json={"defender_id": defender_id}, headers=attack_headers(token)
+            )
+            samples.append((time.perf_counter() - started) * 1000)
+            assert response.status_code == 200, response.text
+        assert statistics.median(samples) <= ATTACK_LATENCY_BUDGET_MS, samples
+    finally:
+        cleanup_test_data(attacker_id, defender_id)
+
+
+def cleanup_test_data(attacker_id, defender_id):
+    db = SessionLocal()
+    try:
+        db.query(models.PvpIdempotency).filter(
+            models.PvpIdempotency.attacker_id == attacker_id
+        ).delete()
+        db.query(models.PvpAttackCooldown).filter(
+            models.PvpAttackCooldown.attacker_id == attacker_id
+        ).delete()
+        db.query(models.PvpDailyStats).filter(
+            models.PvpDailyStats.user_id == attacker_id
+        ).delete()
+        db.query(models.AttackLog).filter(
+            models.AttackLog.attacker_id == attacker_id
+        ).delete()
+        db.query(models.UserUnit).filter(models.UserUnit.user_id == attacker_id).delete()
+        db.query(models.UserBuilding).filter(
+            models.UserBuilding.user_id.in_([attacker_id, defender_id])
+        ).delete()
+        db.query(models.City).filter(models.City.user_id.in_([attacker_id, defender_id])).delete()
+        db.query(models.User).filter(models.User.id.in_([attacker_id, defender_id])).delete()
+        db.commit()
+    finally:
+        db.close()
+
+
+def seed_units(user_id, qty):
+    db = SessionLocal()
+    try:
+        unit_type = db.query(models.UnitType).filter(models.UnitType.code == "raider").first()
+        if not unit_type:
+            raise AssertionError("Unit type 'raider' missing")
+        db.add(
+            models.UserUnit(
+                user_id=user_id,
+                unit_type_id=unit_type.id,
+                qty=qty,
+            )
+        )
+        db.commit()
+    finally:
+        db.close()
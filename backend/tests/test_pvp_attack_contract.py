@@ -8,6 +8,7 @@ os.environ["APP_ENV"] = "test"
 from app import models
 from app.db import SessionLocal
 from app.main import app
+from app.security import create_access_token
 
 
 def register_user(client: TestClient, email: str, password: str) -> str:
@@ -71,6 +72,48 @@ def test_pvp_attack_matches_contract_shape() -> None:
     cleanup_test_data(attacker_id, defender_id)
 
 
+def test_unknown_defender_is_404_before_missing_idempotency_key() -> None:
+    client = TestClient(app)
+    suffix = uuid.uuid4().hex[:8]
+    attacker_email = f"order_attacker_{suffix}@example.com"
+    defender_email = f"order_defender_{suffix}@example.com"
+    password = "TestPass123!"
+
+    attacker_id = register_user(client, attacker_email, password)
+    defender_id = register_user(client, defender_email, password)
+    headers = {"Authorization": f"Bearer {login_user(client, attacker_email, password)}"}
+
+    try:
+        unknown = client.post(
+            "/pvp/attack", json={"defender_id": str(uuid.uuid4())}, headers=headers
+        )
+        assert unknown.status_code == 404, unknown.text
+        assert unknown.json()["detail"] == "Defender not found"
+
+        missing_key = client.post("/pvp/attack", json={"defender_id": defender_id}, headers=headers)
+        assert missing_key.status_code == 400, missing_key.text
+        assert missing_key.json()["detail"] == "Missing Idempotency-Key"
+    finally:
+        cleanup_test_data(attacker_id, defender_id)
+
+
+def test_token_of_deleted_attacker_is_401() -> None:
+    client = TestClient(app)
+    suffix = uuid.uuid4().hex[:8]
+    defender_id = register_user(client, f"gone_defender_{suffix}@example.com", "TestPass123!")
+    headers = {
+        "Authorization": f"Bearer {create_access_token(str(uuid.uuid4()))}",
+        "Idempotency-Key": str(uuid.uuid4()),
+    }
+
+    try:
+        response = client.post("/pvp/attack", json={"defender_id": defender_id}, headers=headers)
+        assert response.status_code == 401, response.text
+        assert response.json()["detail"] == "User not found"
+    finally:
+        cleanup_test_data(defender_id, defender_id)
+
+
 def cleanup_test_data(attacker_id, defender_id):
     db = SessionLocal()
     try:
@@ -0,0 +1,242 @@
+import asyncio
+from datetime import datetime, timedelta
+import os
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+os.environ["APP_ENV"] = "test"
+
+from app import models
+from app.db import SessionLocal
+from app.main import app
+from app.pvp_constants import DAILY_ATTACK_LIMIT, SERVER_TZ
+from app.pvp_limiter import MemoryPvpLimiter, RedisPvpLimiter, pvp_limiter
+
+
+def register_user(client: TestClient, email: str, password: str) -> str:
+    response = client.post("/auth/register", json={"email": email, "password": password})
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+def login_user(client: TestClient, email: str, password: str) -> str:
+    response = client.post(
+        "/auth/login",
+        data={"username": email, "password": password},
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+    )
+    assert response.status_code == 200
+    return response.json()["access_token"]
+
+
+def seed_units(user_id, qty):
+    db = SessionLocal()
+    try:
+        unit_type = db.query(models.UnitType).filter(models.UnitType.code == "raider").first()
+        if not unit_type:
+            raise AssertionError("Unit type 'raider' missing")
+        db.add(models.UserUnit(user_id=user_id, unit_type_id=unit_type.id, qty=qty))
+        db.commit()
+    finally:
+        db.close()
+
+
+def accepted_response(defender_id: uuid.UUID, now: datetime, attacks_used: int) -> dict:
+    reset_at = datetime.combine(now.date() + timedelta(days=1), datetime.min.time(), SERVER_TZ)
+    return {
+        "defender_id": str(defender_id),
+        "limits": {"reset_at": reset_at.isoformat(), "attacks_used": attacks_used},
+        "cooldowns": {
+            "global_available_at": (now + timedelta(seconds=30)).isoformat(),
+            "same_target_available_at": (now + timedelta(minutes=30)).isoformat(),
+        },
+    }
+
+
+def test_limiter_rejects_cooldown_spam_before_the_database():
+    client = TestClient(app)
+    suffix = uuid.uuid4().hex[:8]
+    password = "TestPass123!"
+    attacker_email = f"limiter_attacker_{suffix}@example.com"
+    attacker_id = register_user(client, attacker_email, password)
+    defender_id = register_user(client, f"limiter_defender_{suffix}@example.com", password)
+    seed_units(attacker_id, 10)
+    token = login_user(client, attacker_email, password)
+    first_key = str(uuid.uuid4())
+
+    try:
+        first = client.post(
+            "/pvp/attack",
+            json={"defender_id": defender_id},
+            headers={"Authorization": f"Bearer {token}", "Idempotency-Key": first_key},
+        )
+        assert first.status_code == 200, first.text
+
+        before = client.get("/metrics/pvp-limiter").json()
+        spam = client.post(
+            "/pvp/attack",
+            json={"defender_id": defender_id},
+            headers={"Authorization": f"Bearer {token}", "Idempotency-Key": str(uuid.uuid4())},
+        )
+        assert spam.status_code == 429
+        assert spam.json()["detail"] == "Global attack cooldown"
+
+        replay = client.post(
+            "/pvp/attack",
+            json={"defender_id": defender_id},
+            headers={"Authorization": f"Bearer {token}", "Idempotency-Key": first_key},
+        )
+        assert replay.status_code == 200
+        assert replay.json() == first.json()
+
+        after = client.get("/metrics/pvp-limiter").json()
+        assert after["backend"] == pvp_limiter.name
+        assert after["rejected"] == before["rejected"] + 1
+        assert after["replays"] == before["replays"] + 1
+    finally:
+        cleanup(attacker_id, defender_id)
+
+
+def cleanup(attacker_id, defender_id):
+    db = SessionLocal()
+    try:
+        db.query(models.PvpIdempotency).filter(
+            models.PvpIdempotency.attacker_id == attacker_id
+        ).delete()
+        db.query(models.PvpAttackCooldown).filter(
+            models.PvpAttackCooldown.attacker_id == attacker_id
+        ).delete()
+        db.query(models.PvpDailyStats).filter(
+            models.PvpDailyStats.user_id == attacker_id
+        ).delete()
+        db.query(models.AttackLog).filter(models.AttackLog.attacker_id == attacker_id).delete()
+        db.query(models.UserUnit).filter(models.UserUnit.user_id == attacker_id).delete()
+        db.query(models.City).filter(models.City.user_id.in_([attacker_id, defender_id])).delete()
+        db.query(models.User).filter(models.User.id.in_([attacker_id, defender_id])).delete()
+        db.commit()
+    finally:
+        db.close()
+
+
+def fake_redis_limiter() -> RedisPvpLimiter:
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    return RedisPvpLimiter(client=fakeredis.FakeAsyncRedis(decode_responses=True))
+
+
+LIMITERS = [
+    pytest.param(MemoryPvpLimiter, id="memory"),
+    pytest.param(fake_redis_limiter, id="redis"),
+]
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("make_limiter", LIMITERS)
+async def test_limiter_windows_and_daily_cap(make_limiter):
+    limiter = make_limiter()
+    attacker_id, defender_id, other_id = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    now = datetime.now(SERVER_TZ)
+
+    assert await limiter.check(attacker_id, defender_id, "k1", now) is None
+    await limiter.record(attacker_id, "k1", accepted_response(defender_id, now, 1))
+
+    assert await limiter.check(attacker_id, other_id, "k2", now) == "Global attack cooldown"
+    later = now + timedelta(seconds=31)
+    assert await limiter.check(attacker_id, defender_id, "k2", later) == "Target on cooldown"
+    assert await limiter.check(attacker_id, other_id, "k2", later) is None
+    # The accepted key itself always reaches the database for its replay.
+    assert await limiter.check(attacker_id, defender_id, "k1", now) is None
+
+    await limiter.record(
+        attacker_id, "k3", accepted_response(other_id, now, DAILY_ATTACK_LIMIT)
+    )
+    await limiter.record(attacker_id, "k0", accepted_response(other_id, now, 5))
+    assert (
+        await limiter.check(attacker_id, uuid.uuid4(), "k4", later, ignore_cooldowns=True)
+        == "Daily attack limit reached"
+    )
+    assert limiter.stats()["rejected"] == 3
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("make_limiter", LIMITERS)
+async def test_limiter_ignores_records_that_arrive_out_of_order(make_limiter):
+    limiter = make_limiter()
+    attacker_id, defender_id = uuid.uuid4(), uuid.uuid4()
+    now = datetime.now(SERVER_TZ)
+    earlier = now - timedelta(minutes=10)
+
+    await limiter.record(attacker_id, "k5", accepted_response(defender_id, now, 5))
+    # Another worker commits an older attack and records it afterwards.
+    await limiter.record(attacker_id, "k3", accepted_response(defender_id, earlier, 3))
+
+    later = now + timedelta(seconds=31)
+    assert await limiter.check(attacker_id, uuid.uuid4(), "k", now) == "Global attack cooldown"
+    assert await limiter.check(attacker_id, defender_id, "k", later) == "Target on cooldown"
+
+    await limiter.record(
+        attacker_id, "k20", accepted_response(uuid.uuid4(), now, DAILY_ATTACK_LIMIT)
+    )
+    await limiter.record(attacker_id, "k4", accepted_response(uuid.uuid4(), earlier, 4))
+    assert (
+        await limiter.check(attacker_id, uuid.uuid4(), "k", later, ignore_cooldowns=True)
+        == "Daily attack limit reached"
+    )
+
+
+@pytest.mark.anyio
+async def test_redis_limiter_fails_open_when_unreachable():
+    pytest.importorskip("redis")
+
+    limiter = RedisPvpLimiter("redis://127.0.0.1:1/0")
+    now = datetime.now(SERVER_TZ)
+    assert await limiter.check(uuid.uuid4(), uuid.uuid4(), "k1", now) is None
+    await limiter.record(uuid.uuid4(), "k1", accepted_response(uuid.uuid4(), now, 1))
+    assert limiter.stats()["errors"] == 2
+
+
+def test_limiter_lets_through_a_replay_it_never_recorded(monkeypatch):
+    client = TestClient(app)
+    suffix = uuid.uuid4().hex[:8]
+    password = "TestPass123!"
+    attacker_email = f"limiter_replay_{suffix}@example.com"
+    attacker_id = register_user(client, attacker_email, password)
+    defender_id = register_user(client, f"limiter_replay_def_{suffix}@example.com", password)
+    seed_units(attacker_id, 10)
+    headers = {
+        "Authorization": f"Bearer {login_user(client, attacker_email, password)}",
+        "Idempotency-Key": str(uuid.uuid4()),
+    }
+
+    try:
+        first = client.post("/pvp/attack", json={"defender_id": defender_id}, headers=headers)
+        assert first.status_code == 200, first.text
+
+        # Another worker's limiter: it only saw a later attack that used up the day.
+        limiter = MemoryPvpLimiter()
+        now = datetime.now(SERVER_TZ)
+        asyncio.run(
+            limiter.record(
+                uuid.UUID(attacker_id),
+                "later",
+                accepted_response(uuid.uuid4(), now, DAILY_ATTACK_LIMIT),
+            )
+        )
+        monkeypatch.setattr("app.routes.pvp.pvp_limiter", limiter)
+
+        replay = client.post("/pvp/attack", json={"defender_id": defender_id}, headers=headers)
+        assert replay.status_code == 200
+        assert replay.json() == first.json()
+
+        fresh = client.post(
+            "/pvp/attack",
+            json={"defender_id": defender_id},
+            headers={**headers, "Idempotency-Key": str(uuid.uuid4())},
+        )
+        assert fresh.status_code == 429
+        assert limiter.stats()["replays"] == 1
+        assert limiter.stats()["rejected"] == 1
+    finally:
+        cleanup(attacker_id, defender_id)
@@ -0,0 +1,121 @@
+from datetime import datetime, timedelta, timezone
+import uuid
+
+from fastapi.testclient import TestClient
+
+from app import models
+from app.db import SessionLocal
+from app.main import app
+
+
+def register_user(client: TestClient, email: str, password: str) -> str:
+    response = client.post("/auth/register", json={"email": email, "password": password})
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+def login_user(client: TestClient, email: str, password: str) -> str:
+    response = client.post(
+        "/auth/login",
+        data={"username": email, "password": password},
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+    )
+    assert response.status_code == 200
+    return response.json()["access_token"]
+
+
+def seed_logs(player_id, other_ids, base: datetime) -> list[str]:
+    """Six entries alternating sides; pairs share a timestamp to exercise ties."""
+    db = SessionLocal()
+    try:
+        logs = []
+        for idx in range(6):
+            other = uuid.UUID(other_ids[idx % len(other_ids)])
+            attacker, defender = (player_id, other) if idx % 2 else (other, player_id)
+            logs.append(
+                models.AttackLog(
+                    id=uuid.uuid4(),
+                    attacker_id=attacker,
+                    defender_id=defender,
+                    result="win",
+                    prestige_delta_attacker=10,
+                    prestige_delta_defender=-10,
+                    created_at=base - timedelta(minutes=idx // 2),
+                )
+            )
+        # A fight between two other players must not show up.
+        logs.append(
+            models.AttackLog(
+                id=uuid.uuid4(),
+                attacker_id=uuid.UUID(other_ids[0]),
+                defender_id=uuid.UUID(other_ids[1]),
+                result="loss",
+                prestige_delta_attacker=-5,
+                prestige_delta_defender=5,
+                created_at=base,
+            )
+        )
+        db.add_all(logs)
+        db.commit()
+        expected = sorted(logs[:6], key=lambda log: (log.created_at, log.id), reverse=True)
+        return [str(log.id) for log in expected]
+    finally:
+        db.close()
+
+
+def cleanup(user_ids):
+    db = SessionLocal()
+    try:
+        db.query(models.AttackLog).filter(models.AttackLog.attacker_id.in_(user_ids)).delete()
+        db.query(models.City).filter(models.City.user_id.in_(user_ids)).delete()
+        db.query(models.User).filter(models.User.id.in_(user_ids)).delete()
+        db.commit()
+    finally:
+        db.close()
+
+
+def test_log_pages_through_both_sides_with_before_cursor():
+    client = TestClient(app)
+    suffix = uuid.uuid4().hex[:8]
+    password = "TestPass123!"
+    player_email = f"log_player_{suffix}@example.com"
+    player_id = register_user(client, player_email, password)
+    other_emails = [f"log_other_{idx}_{suffix}@example.com" for idx in range(2)]
+    other_ids = [register_user(client, email, password) for email in other_emails]
+    user_ids = [player_id, *other_ids]
+    headers = {"Authorization": f"Bearer {login_user(client, player_email, password)}"}
+
+    try:
+        expected = seed_logs(
+            uuid.UUID(player_id), other_ids, datetime.now(timezone.utc) + timedelta(days=1)
+        )
+        emails = dict(zip(user_ids, [player_email, *other_emails]))
+
+        seen = []
+        pages = 0
+        params = {"limit": 3}
+        while True:
+            response = client.get("/pvp/log", params=params, headers=headers)
+            assert response.status_code == 200
+            page = response.json()
+            pages += 1
+            for entry in page:
+                assert player_id in (entry["attacker_id"], entry["defender_id"])
+                assert entry["attacker_email"] == emails[entry["attacker_id"]]
+                assert entry["defender_email"] == emails[entry["defender_id"]]
+            seen.extend(entry["id"] for entry in page)
+            cursor = response.headers.get("X-Next-Cursor")
+            if cursor is None:
+                break
+            # The cursor goes into the query string without any escaping.
+            assert cursor.replace(":", "").replace("-", "").isalnum()
+            params["before"] = cursor
+
+        # Six entries in pages of three: no empty trailing page is needed.
+        assert pages == 2
+        assert seen == expected
+
+        response = client.get("/pvp/log", params={"before": "not-a-cursor"}, headers=headers)
+        assert response.status_code == 400
+    finally:
+        cleanup(user_ids)
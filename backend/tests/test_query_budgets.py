@@ -0,0 +1,74 @@
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import models
+from app.db import SessionLocal
+from app.main import app
+
+# Statements per request for a fresh player, as reported in Server-Timing.
+# /army runs one query per unit type on top of the unit type list.
+QUERY_BUDGETS = {
+    "/city": 3,
+    "/army": 3,
+    "/stats": 1,
+    "/pvp/limits": 1,
+    "/pvp/log": 1,
+    "/rank/top": 2,
+    "/rank/near": 6,
+    "/rank/page": 2,
+}
+
+
+def register_user(client: TestClient, email: str, password: str) -> str:
+    response = client.post("/auth/register", json={"email": email, "password": password})
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+def login_user(client: TestClient, email: str, password: str) -> str:
+    response = client.post(
+        "/auth/login",
+        data={"username": email, "password": password},
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+    )
+    assert response.status_code == 200
+    return response.json()["access_token"]
+
+
+@pytest.fixture(scope="module")
+def player():
+    client = TestClient(app)
+    email = f"budget_{uuid.uuid4().hex[:8]}@example.com"
+    password = "TestPass123!"
+    user_id = register_user(client, email, password)
+    token = login_user(client, email, password)
+    yield client, {"Authorization": f"Bearer {token}"}
+    cleanup_test_data(user_id)
+
+
+@pytest.mark.parametrize("path", sorted(QUERY_BUDGETS))
+def test_read_endpoints_stay_within_query_budget(player, query_budget, path) -> None:
+    client, headers = player
+    response = client.get(path, headers=headers)
+    assert response.status_code == 200, response.text
+    query_budget(response, QUERY_BUDGETS[path])
+
+
+def test_routes_without_database_work_report_zero_statements(query_budget) -> None:
+    client = TestClient(app)
+    response = client.get("/health")
+    assert response.status_code == 200
+    assert query_budget(response, 0) == 0
+
+
+def cleanup_test_data(user_id):
+    db = SessionLocal()
+    try:
+        db.query(models.UserBuilding).filter(models.UserBuilding.user_id == user_id).delete()
+        db.query(models.City).filter(models.City.user_id == user_id).delete()
+        db.query(models.User).filter(models.User.id == user_id).delete()
+        db.commit()
+    finally:
+        db.close()
@@ -0,0 +1,195 @@
+import uuid
+
+from fastapi.testclient import TestClient
+
+from app import models
+from app.cache import invalidate_rank_cache
+from app.db import SessionLocal
+from app.jobs.leaderboard_snapshot import refresh_leaderboard_snapshot
+from app.main import app
+
+
+def register_user(client: TestClient, email: str, password: str) -> str:
+    response = client.post("/auth/register", json={"email": email, "password": password})
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+def login_user(client: TestClient, email: str, password: str) -> str:
+    response = client.post(
+        "/auth/login",
+        data={"username": email, "password": password},
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+    )
+    assert response.status_code == 200
+    return response.json()["access_token"]
+
+
+def set_prestige(user_ids: list[str], prestige: int) -> None:
+    db = SessionLocal()
+    try:
+        db.query(models.User).filter(models.User.id.in_(user_ids)).update(
+            {models.User.prestige: prestige}, synchronize_session=False
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def full_ladder() -> list[str]:
+    db = SessionLocal()
+    try:
+        users = (
+            db.query(models.User.id)
+            .order_by(models.User.prestige.desc(), models.User.id.asc())
+            .all()
+        )
+        return [str(user.id) for user in users]
+    finally:
+        db.close()
+
+
+def clear_snapshot() -> None:
+    db = SessionLocal()
+    try:
+        db.query(models.LeaderboardSnapshot).delete()
+        db.commit()
+    finally:
+        db.close()
+    invalidate_rank_cache()
+
+
+def cleanup_users(user_ids: list[str]) -> None:
+    db = SessionLocal()
+    try:
+        db.query(models.UserBuilding).filter(models.UserBuilding.user_id.in_(user_ids)).delete()
+        db.query(models.City).filter(models.City.user_id.in_(user_ids)).delete()
+        db.query(models.User).filter(models.User.id.in_(user_ids)).delete()
+        db.commit()
+    finally:
+        db.close()
+
+
+def test_rank_near_matches_full_ladder_with_ties() -> None:
+    client = TestClient(app)
+    suffix = uuid.uuid4().hex[:8]
+    password = "TestPass123!"
+
+    user_ids = [
+        register_user(client, f"rank_{idx}_{suffix}@example.com", password)
+        for idx in range(5)
+    ]
+    set_prestige(user_ids, 987_654)
+    token = login_user(client, f"rank_2_{suffix}@example.com", password)
+
+    try:
+        response = client.get("/rank/near", headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 200, response.text
+        body = response.json()
+
+        ladder = full_ladder()
+        caller_index = ladder.index(user_ids[2])
+        start = max(caller_index - 3, 0)
+        expected = ladder[start : caller_index + 4]
+
+        assert [entry["user_id"] for entry in body] == expected
+        assert [entry["rank"] for entry in body] == list(
+            range(start + 1, start + 1 + len(expected))
+        )
+    finally:
+        cleanup_users(user_ids)
+
+
+def test_rank_page_walks_full_ladder() -> None:
+    client = TestClient(app)
+    suffix = uuid.uuid4().hex[:8]
+    password = "TestPass123!"
+
+    user_ids = [
+        register_user(client, f"page_{idx}_{suffix}@example.com", password)
+        for idx in range(3)
+    ]
+    set_prestige(user_ids[:2], 876_543)
+
+    try:
+        ladder = full_ladder()
+        walked = []
+        ranks = []
+        cursor = None
+        while True:
+            params = {"limit": 2}
+            if cursor:
+                params["cursor"] = cursor
+            response = client.get("/rank/page", params=params)
+            assert response.status_code == 200, response.text
+            body = response.json()
+            walked.extend(entry["user_id"] for entry in body["entries"])
+            ranks.extend(entry["rank"] for entry in body["entries"])
+            cursor = body["next_cursor"]
+            if cursor is None:
+                break
+
+        assert walked == ladder
+        assert ranks == list(range(1, len(ladder) + 1))
+
+        clear_snapshot()
+        top = client.get("/rank/top").json()
+        assert [entry["user_id"] for entry in top] == ladder[:10]
+
+        invalid = client.get("/rank/page", params={"cursor": "not-a-cursor"})
+        assert invalid.status_code == 400
+    finally:
+        cleanup_users(user_ids)
+
+
+def test_rank_reads_snapshot_after_refresh() -> None:
+    client = TestClient(app)
+    suffix = uuid.uuid4().hex[:8]
+    password = "TestPass123!"
+
+    user_ids = [
+        register_user(client, f"snap_{idx}_{suffix}@example.com", password)
+        for idx in range(2)
+    ]
+    token = login_user(client, f"snap_0_{suffix}@example.com", password)
+    headers = {"Authorization": f"Bearer {token}"}
+
+    db = SessionLocal()
+    try:
+        refreshed = refresh_leaderboard_snapshot(db)
+    finally:
+        db.close()
+
+    try:
+        ladder = full_ladder()
+        assert refreshed == len(ladder)
+
+        top = client.get("/rank/top").json()
+        assert [entry["user_id"] for entry in top] == ladder[:10]
+        assert all(entry["snapshot_at"] for entry in top)
+
+        # Live prestige changes are not visible until the next refresh.
+        set_prestige([user_ids[0]], 765_432)
+        near = client.get("/rank/near", headers=headers).json()
+        caller = next(entry for entry in near if entry["user_id"] == user_ids[0])
+        assert caller["rank"] == ladder.index(user_ids[0]) + 1
+        assert caller["prestige"] != 765_432
+        assert caller["snapshot_at"] is not None
+    finally:
+        clear_snapshot()
+        cleanup_users(user_ids)
+
+
+def test_rank_top_cache_counts_hits_and_misses() -> None:
+    client = TestClient(app)
+    invalidate_rank_cache()
+
+    before = client.get("/metrics/rank-cache").json()
+    first = client.get("/rank/top")
+    second = client.get("/rank/top")
+    after = client.get("/metrics/rank-cache").json()
+
+    assert first.json() == second.json()
+    assert after["misses"] - before["misses"] == 1
+    assert after["hits"] - before["hits"] == 1
+    assert after["size"] == 1
@@ -0,0 +1,100 @@
+from datetime import datetime, timezone
+import uuid
+
+from sqlalchemy import text
+
+from app.db import SessionLocal
+from app.pvp_formulas import compute_expected_win, compute_prestige_delta
+from app.routes.stats import compute_stats
+from app import models
+import pytest
+
+from benchmarks.population import (
+    PopulationSize,
+    check_tag,
+    drop_population,
+    email_regex,
+    population_counts,
+    seed_population,
+)
+
+ANCHOR = datetime(2025, 6, 15, 12, 0, tzinfo=timezone.utc)
+SIZE = PopulationSize(users=60, buildings_per_city=5, attack_logs=200, log_days=3)
+
+
+def snapshot(db, tag: str):
+    return db.execute(
+        text(
+            "SELECT u.id, u.email, u.prestige, u.last_pvp_at, c.attack_power, c.defense_power "
+            "FROM users u JOIN cities c ON c.user_id = u.id "
+            "WHERE u.email ~ :pattern ORDER BY u.email"
+        ),
+        {"pattern": email_regex(tag)},
+    ).all()
+
+
+def test_seed_population_is_reproducible_and_consistent():
+    tag = f"seedtest{uuid.uuid4().hex[:8]}"
+    db = SessionLocal()
+    try:
+        counts = seed_population(db, SIZE, tag, seed=5, anchor=ANCHOR)
+        assert counts["users"] == SIZE.users
+        assert counts["cities"] == SIZE.users
+        assert counts["buildings"] == SIZE.users * SIZE.buildings_per_city
+        assert counts["attack_logs"] == SIZE.attack_logs
+        first = snapshot(db, tag)
+
+        # Cached city power matches the buildings, as /city/build maintains it.
+        for city in db.query(models.City).join(models.User).filter(
+            models.User.email.regexp_match(email_regex(tag))
+        ):
+            buildings = db.query(models.Building).filter(models.Building.city_id == city.id).all()
+            assert (city.attack_power, city.defense_power) == compute_stats(buildings)
+
+        # Logged fights follow the live PvP formulas.
+        logs = (
+            db.query(models.AttackLog)
+            .join(models.User, models.User.id == models.AttackLog.attacker_id)
+            .filter(models.User.email.regexp_match(email_regex(tag)))
+            .all()
+        )
+        for log in logs:
+            expected = compute_expected_win(
+                log.attacker_prestige_before, log.defender_prestige_before
+            )
+            assert log.expected_win == expected
+            assert log.prestige_delta_attacker == compute_prestige_delta(expected, log.result)
+
+        drop_population(db, tag)
+        seed_population(db, SIZE, tag, seed=5, anchor=ANCHOR)
+        assert snapshot(db, tag) == first
+    finally:
+        drop_population(db, tag)
+        db.close()
+
+
+def test_drop_only_touches_its_own_tag():
+    tag = f"droptest{uuid.uuid4().hex[:8]}"
+    small = PopulationSize(users=3, buildings_per_city=1, attack_logs=0, log_days=1)
+    db = SessionLocal()
+    # Shares the tag prefix but is not <tag>_<n>@example.com.
+    bystander = models.User(email=f"{tag}_admin@example.com", password_hash="x")
+    try:
+        with pytest.raises(ValueError):
+            check_tag(f"{tag}_2")
+        seed_population(db, small, tag, seed=1, anchor=ANCHOR)
+        seed_population(db, small, f"{tag}2", seed=1, anchor=ANCHOR)
+        db.add(bystander)
+        db.commit()
+
+        assert population_counts(db, tag)["users"] == small.users
+        assert drop_population(db, tag) == small.users
+        assert population_counts(db, f"{tag}2")["users"] == small.users
+        assert db.query(models.User).filter(models.User.email == bystander.email).count() == 1
+    finally:
+        db.rollback()
+        drop_population(db, tag)
+        drop_population(db, f"{tag}2")
+        db.query(models.User).filter(models.User.email == bystander.email).delete()
+        db.commit()
+        db.close()